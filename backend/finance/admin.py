@@ -4,13 +4,17 @@ from .models import User
 # Register your models here.
 admin.site.register(User)
 from django.contrib import admin
-from .models import Income, Expense, Category, Budget, Transaction, Test
+from .models import Income, Expense, Category, Budget, BudgetAlert, Transaction, Test, ImportJob, Tombstone, OutboundEmail
 
 # Register the Category model without customization
 admin.site.register(Category)
 admin.site.register(Test)
 # Register the Budget model without customization
 admin.site.register(Budget)
+admin.site.register(BudgetAlert)
+admin.site.register(ImportJob)
+admin.site.register(Tombstone)
+admin.site.register(OutboundEmail)
 
 
 # Customize the Income admin display
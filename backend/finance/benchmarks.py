@@ -0,0 +1,227 @@
+"""
+Benchmark suite for the hot paths, run against data from generate_synthetic_data.
+
+Each case is timed ``repeat`` times after one warm-up run. Cases that write
+(the GPay import and the recurrence job) run inside a transaction that is
+rolled back, so every run and every suite sees the same data. Results are
+plain dicts, written out as JSON by the run_benchmarks command and compared
+against an earlier run with compare().
+"""
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import contextmanager
+from datetime import date
+
+import django
+import psycopg
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import synthetic
+from .importers import gpay
+from .models import Expense, Income, Transaction, User
+from .renderers import FastJSONRenderer, orjson
+from .rowformat import formatter_for
+from .serializers import ExpenseSerializer, IncomeSerializer, TransactionSerializer
+from .tasks import add_recurring_income
+
+LIST_ENDPOINTS = {
+    "incomes": "income-list-create",
+    "expenses": "expense-list-create",
+    "transactions": "transaction-list-create",
+}
+SERIALIZERS = {
+    "incomes": (Income, IncomeSerializer),
+    "expenses": (Expense, ExpenseSerializer),
+    "transactions": (Transaction, TransactionSerializer),
+}
+
+
+@contextmanager
+def rolled_back():
+    with transaction.atomic():
+        yield
+        transaction.set_rollback(True)
+
+
+@contextmanager
+def quiet_request_log():
+    # RequestMetricsMiddleware logs a line per request, thousands of them over a suite
+    request_logger = logging.getLogger("finance.requests")
+    level = request_logger.level
+    request_logger.setLevel(logging.ERROR)
+    try:
+        yield
+    finally:
+        request_logger.setLevel(level)
+
+
+def measure(function, repeat):
+    """Time ``function`` ``repeat`` times after one warm-up call; it returns the rows it handled."""
+    rows = function()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    median = statistics.median(timings)
+    return {
+        "runs": repeat,
+        "rows": rows,
+        "min_ms": round(timings[0], 3),
+        "median_ms": round(median, 3),
+        "p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "max_ms": round(timings[-1], 3),
+        "rows_per_second": round(rows / median * 1000) if rows and median else None,
+    }
+
+
+def benchmark_user():
+    """The synthetic user with the most income rows, so list pages are full and deep."""
+    return (
+        User.objects.filter(email__endswith=f"@{synthetic.SYNTHETIC_EMAIL_DOMAIN}")
+        .annotate(rows=Count("income"))
+        .order_by("-rows", "pk")
+        .first()
+    )
+
+
+def list_cases(user, page_sizes):
+    client = APIClient()
+    client.force_authenticate(user)
+    for kind, url_name in LIST_ENDPOINTS.items():
+        for page_size in page_sizes:
+            url = f"{reverse(url_name)}?page_size={page_size}"
+
+            def run(url=url):
+                response = client.get(url)
+                assert response.status_code == 200, response.status_code
+                return len(response.data["results"])
+            yield f"list.{kind}", {"page_size": page_size}, run
+
+
+def serializer_cases(user, rows):
+    for kind, (model, serializer_class) in SERIALIZERS.items():
+        queryset = model.objects.filter(user=user).order_by("-date", "id")[:rows]
+        formatter = formatter_for(serializer_class)
+
+        def drf(queryset=queryset, serializer_class=serializer_class):
+            data = serializer_class(queryset, many=True, context={}).data
+            JSONRenderer().render(data)
+            return len(data)
+
+        def fast(queryset=queryset, formatter=formatter):
+            data = formatter.format(list(queryset.values(*formatter.columns)), {})
+            FastJSONRenderer().render(data)
+            return len(data)
+        yield f"serialize.{kind}.drf", {"rows": rows}, drf
+        yield f"serialize.{kind}.rowformat", {"rows": rows}, fast
+
+
+def gpay_cases(user, paths):
+    for path in paths:
+        params = {"file": os.path.basename(path), "bytes": os.path.getsize(path)}
+
+        def parse(path=path):
+            with open(path, "rb") as source:
+                return sum(1 for record in gpay.parse(source) if record is not None)
+
+        def import_file(path=path):
+            with rolled_back(), open(path, "rb") as source:
+                stats = gpay.parse_gpay_html(source, date(1970, 1, 1), date(2999, 12, 31), user)
+            return stats["scanned"]
+        yield "gpay.parse", params, parse
+        yield "gpay.parse_gpay_html", params, import_file
+
+
+def recurrence_cases():
+    def run():
+        with rolled_back():
+            return add_recurring_income()
+    yield "tasks.add_recurring_income", {}, run
+
+
+def run_suite(repeat=5, page_sizes=(100, 1000), serializer_rows=10000, gpay_paths=(), only=None, progress=None):
+    """Run every case (or those whose name starts with one of ``only``) and return the results document."""
+    user = benchmark_user()
+    if user is None:
+        raise LookupError("No synthetic users; run generate_synthetic_data first")
+
+    cases = [
+        *list_cases(user, page_sizes),
+        *serializer_cases(user, serializer_rows),
+        *gpay_cases(user, gpay_paths),
+        *recurrence_cases(),
+    ]
+    results = []
+    with quiet_request_log():
+        for name, params, function in cases:
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            result = {"name": name, "params": params, **measure(function, repeat)}
+            results.append(result)
+            if progress:
+                progress(result)
+    return {"environment": environment(), "dataset": dataset(user), "results": results}
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=5,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "commit": commit,
+        "python": platform.python_version(),
+        "django": django.get_version(),
+        "postgresql": connection.pg_version,
+        "psycopg": f"{psycopg.__version__} ({psycopg.pq.__impl__})",
+        "orjson": orjson is not None,
+        "host": platform.node(),
+    }
+
+
+def dataset(user):
+    synthetic_users = User.objects.filter(email__endswith=f"@{synthetic.SYNTHETIC_EMAIL_DOMAIN}")
+    return {
+        "synthetic_users": synthetic_users.count(),
+        "benchmark_user": user.email,
+        **{
+            kind: {
+                "total": model.objects.filter(user__in=synthetic_users).count(),
+                "benchmark_user": model.objects.filter(user=user).count(),
+            }
+            for kind, (model, _) in SERIALIZERS.items()
+        },
+    }
+
+
+def compare(baseline, current, max_regression):
+    """
+    ``(name, params, baseline ms, current ms, ratio, regressed)`` for each case present in both result documents.
+
+    A case regresses when its median grew by more than ``max_regression`` (0.2 = 20%).
+    """
+    before = {(r["name"], tuple(sorted(r["params"].items()))): r for r in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        key = (result["name"], tuple(sorted(result["params"].items())))
+        if key not in before:
+            continue
+        old, new = before[key]["median_ms"], result["median_ms"]
+        ratio = new / old if old else float("inf")
+        rows.append((result["name"], result["params"], old, new, ratio, ratio > 1 + max_regression))
+    return rows
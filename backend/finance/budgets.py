@@ -0,0 +1,99 @@
+"""Spend-vs-budget figures for Budget rows, computed in the database."""
+from decimal import Decimal
+
+from django.db import router
+from django.db.models import Case, DecimalField, F, FilteredRelation, Q, Sum, Value, When, sql
+from django.db.models.constants import OnConflict
+from django.db.models.functions import Coalesce, Round
+
+from .models import Budget, BudgetAlert
+
+ALERT_BATCH_SIZE = 1000
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def with_utilisation(queryset):
+    """
+    Annotate ``spent``, ``remaining`` and ``pct_used`` onto a Budget queryset.
+
+    The budget's expenses are joined once through a FilteredRelation, so the
+    user and date window sit in the join condition and the whole list is
+    aggregated in a single grouped query served by the (user, date) index.
+    """
+    return queryset.annotate(
+        period_expenses=FilteredRelation(
+            "category__expense",
+            condition=Q(
+                category__expense__user=F("user"),
+                category__expense__date__gte=F("date_from"),
+                category__expense__date__lte=F("date_to"),
+            ),
+        ),
+    ).annotate(
+        spent=Coalesce(Sum("period_expenses__amount"), Value(Decimal("0")), output_field=MONEY),
+    ).annotate(
+        remaining=F("amount") - F("spent"),
+        pct_used=Case(
+            When(amount__gt=0, then=Round(F("spent") * 100 / F("amount"), 2)),
+            default=None,
+            output_field=DecimalField(max_digits=10, decimal_places=2),
+        ),
+    )
+
+
+def evaluate_alerts(today, thresholds, batch_size=ALERT_BATCH_SIZE):
+    """
+    Record a BudgetAlert for every threshold newly crossed by a budget active on ``today``.
+
+    Budgets are read in primary-key batches, each with its utilisation and
+    already-raised alerts fetched in two queries. Returns only the alerts this
+    call inserted, so a crossing is never notified twice.
+    """
+    active = (
+        with_utilisation(Budget.objects.filter(date_from__lte=today, date_to__gte=today, amount__gt=0))
+        .select_related("user", "category")
+        .order_by("pk")
+    )
+    created = []
+    last_pk = 0
+    while True:
+        batch = list(active.filter(pk__gt=last_pk)[:batch_size])
+        if not batch:
+            break
+        last_pk = batch[-1].pk
+        raised = set(BudgetAlert.objects.filter(budget__in=batch).values_list("budget_id", "threshold"))
+        alerts = [
+            BudgetAlert(budget=budget, threshold=threshold, spent=budget.spent)
+            for budget in batch
+            for threshold in thresholds
+            if budget.pct_used >= threshold and (budget.pk, threshold) not in raised
+        ]
+        # The unique (budget, threshold) constraint settles a race with an overlapping run
+        created.extend(insert_new(alerts))
+    return created
+
+
+def insert_new(alerts):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING id, and return the ``alerts`` that were actually written.
+
+    bulk_create(ignore_conflicts=True) hands back every object, including the
+    ones a conflict dropped, so the insert query is built directly.
+    """
+    if not alerts:
+        return []
+    opts = BudgetAlert._meta
+    fields = [field for field in opts.concrete_fields if not field.primary_key]
+    query = sql.InsertQuery(BudgetAlert, on_conflict=OnConflict.IGNORE)
+    query.insert_values(fields, alerts)
+    returned = query.get_compiler(using=router.db_for_write(BudgetAlert)).execute_sql(
+        returning_fields=[opts.pk, opts.get_field("budget"), opts.get_field("threshold")]
+    )
+    written = {(budget_id, threshold): pk for pk, budget_id, threshold in returned}
+    created = []
+    for alert in alerts:
+        pk = written.get((alert.budget_id, alert.threshold))
+        if pk is not None:
+            alert.pk = pk
+            created.append(alert)
+    return created
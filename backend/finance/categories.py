@@ -0,0 +1,79 @@
+"""Process-wide cache of the Category table, invalidated through a version key in Redis."""
+import copy
+import time
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .models import Category
+
+CATALOGUE_VERSION_KEY = "finance:categories:version"
+CATALOGUE_CONTEXT_KEY = "category_catalogue"
+
+# The catalogue _load() built last; async readers use it without a thread hop while it is current
+_latest = None
+
+
+class CategoryCatalogue:
+    """An immutable snapshot of every Category, tagged with the version it was loaded for."""
+
+    def __init__(self, version, categories):
+        self.version = version
+        self.categories = categories
+        self.by_id = {category.pk: category for category in categories}
+        self.etag = f'"categories-{version}"'
+        self.last_modified = version // 1_000_000_000  # Versions are time.time_ns() stamps
+
+    def get(self, pk, category_type=None):
+        """A private copy of category ``pk``, or None if it is unknown or not of ``category_type``."""
+        category = self.by_id.get(pk)
+        if category is None or (category_type is not None and category.type != category_type):
+            return None
+        return copy.copy(category)
+
+
+def get_catalogue():
+    """
+    The current catalogue, loaded from the database only when the version key has moved.
+
+    Every process keeps the last few versions in an LRU cache, so a read
+    costs one cache lookup and no queries until a Category is written.
+    """
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        # Key evicted or never set; add() lets concurrent first readers agree on one version
+        cache.add(CATALOGUE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = cache.get(CATALOGUE_VERSION_KEY)
+    return _load(version)
+
+
+async def aget_catalogue():
+    """get_catalogue() for async views, checking the version key through the async cache API."""
+    version = await cache.aget(CATALOGUE_VERSION_KEY)
+    if version is None:
+        await cache.aadd(CATALOGUE_VERSION_KEY, time.time_ns(), timeout=None)
+        version = await cache.aget(CATALOGUE_VERSION_KEY)
+    catalogue = _latest
+    if catalogue is None or catalogue.version != version:
+        # A miss reads the table, which the ORM only does outside the event loop
+        catalogue = await sync_to_async(_load)(version)
+    return catalogue
+
+
+@lru_cache(maxsize=2)
+def _load(version):
+    global _latest
+    _latest = CategoryCatalogue(version, tuple(Category.objects.order_by("id")))
+    return _latest
+
+
+def from_context(context):
+    """get_catalogue(), memoised in a serializer context so a list response checks the version key once."""
+    if CATALOGUE_CONTEXT_KEY not in context:
+        context[CATALOGUE_CONTEXT_KEY] = get_catalogue()
+    return context[CATALOGUE_CONTEXT_KEY]
+
+
+def bump_version():
+    cache.set(CATALOGUE_VERSION_KEY, time.time_ns(), timeout=None)
@@ -0,0 +1,49 @@
+"""Connection reuse settings and psycopg pool statistics for this process."""
+import os
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Counters psycopg_pool only reports once they are non-zero
+POOL_COUNTERS = [
+    "requests_num", "requests_queued", "requests_wait_ms", "requests_errors", "usage_ms", "returns_bad",
+    "connections_num", "connections_ms", "connections_errors", "connections_lost",
+]
+
+
+def pool_stats(alias=DEFAULT_DB_ALIAS):
+    """
+    How ``alias`` reuses connections in this process and, when pooled, the pool's counters.
+
+    Every web or worker process has its own pool, so the numbers describe
+    the process that answered. Wait time and saturation are derived from the
+    raw counters: a pool that is often saturated, or whose requests queue,
+    needs a larger ``DB_POOL_MAX_SIZE`` or fewer processes.
+    """
+    connection = connections[alias]
+    stats = {
+        "alias": alias,
+        "pid": os.getpid(),
+        "conn_max_age": connection.settings_dict["CONN_MAX_AGE"],
+        "conn_health_checks": connection.settings_dict["CONN_HEALTH_CHECKS"],
+        "pooled": False,
+    }
+    pool = getattr(connection, "pool", None)
+    if pool is None:
+        return stats
+
+    raw = pool.get_stats()
+    counters = {name: raw.get(name, 0) for name in POOL_COUNTERS}
+    in_use = raw["pool_size"] - raw["pool_available"]
+    stats.update(
+        pooled=True,
+        min_size=raw["pool_min"],
+        max_size=raw["pool_max"],
+        size=raw["pool_size"],
+        available=raw["pool_available"],
+        in_use=in_use,
+        waiting=raw.get("requests_waiting", 0),
+        saturation=round(in_use / raw["pool_max"], 3),
+        avg_wait_ms=round(counters["requests_wait_ms"] / counters["requests_num"], 3) if counters["requests_num"] else 0,
+        **counters,
+    )
+    return stats
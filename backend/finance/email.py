@@ -1,10 +1,14 @@
 # myapp/email.py
 
+from djoser import email as djoser_email
 from djoser.email import ActivationEmail
-from .tasks import send_email_async
+from . import outbox
 from django.contrib.auth.tokens import default_token_generator
 from django.contrib.sites.shortcuts import get_current_site
 from django.urls import reverse
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class CustomActivationEmail(ActivationEmail):
@@ -17,7 +21,7 @@ class CustomActivationEmail(ActivationEmail):
         current_site = get_current_site(self.request)
         protocol = 'https' if self.request.is_secure() else 'http'
         domain = current_site.domain
-        print("domain",domain)
+        logger.debug("Activation email for %s on %s", user.pk, domain)
         uid = context['uid']
         token = context['token']
 
@@ -40,9 +44,39 @@ class CustomActivationEmail(ActivationEmail):
         The GoalCrest Team
         """
         
-        send_email_async.delay(
+        outbox.enqueue(subject=self.subject, body=email_body, to=to)
+
+
+class OutboxEmailMixin:
+    """Queues a djoser email in the outbox instead of sending it over SMTP during the request."""
+
+    def send(self, to, *args, **kwargs):
+        self.render()
+        outbox.enqueue(
             subject=self.subject,
-            body=email_body,
-            to=to
-        ),
+            body=self.body,
+            html_body=self.html,
+            from_email=kwargs.get("from_email"),
+            to=to,
+        )
+
+
+class ConfirmationEmail(OutboxEmailMixin, djoser_email.ConfirmationEmail):
+    pass
+
+
+class PasswordResetEmail(OutboxEmailMixin, djoser_email.PasswordResetEmail):
+    pass
+
+
+class PasswordChangedConfirmationEmail(OutboxEmailMixin, djoser_email.PasswordChangedConfirmationEmail):
+    pass
+
+
+class UsernameChangedConfirmationEmail(OutboxEmailMixin, djoser_email.UsernameChangedConfirmationEmail):
+    pass
+
+
+class UsernameResetEmail(OutboxEmailMixin, djoser_email.UsernameResetEmail):
+    pass
 
@@ -0,0 +1,25 @@
+"""
+Bank statement importers.
+
+Each format module exposes ``parse(source)``, a generator of normalised
+records read from a binary file-like object. The records feed the shared
+filter -> dedupe -> batched write pipeline in ``pipeline``. A format whose
+files can be split for parallel parsing also provides
+``shard_boundaries(path, shards)`` and ``parse_shard(path, start, end)``.
+"""
+from . import csvfile, gpay, ofx
+from .pipeline import BATCH_SIZE, import_records, transaction_fingerprint
+
+# Keys match ImportJob.FORMAT_CHOICES
+IMPORTERS = {
+    "gpay": gpay,
+    "csv": csvfile,
+    "ofx": ofx,
+}
+
+
+def import_statement(source, statement_format, start_date, end_date, user, exclude_gt=None, exclude_lt=None,
+                     batch_size=BATCH_SIZE, progress=None):
+    """Parse ``source`` as ``statement_format`` and run it through the pipeline, returning the run's counters."""
+    records = IMPORTERS[statement_format].parse(source)
+    return import_records(records, start_date, end_date, user, exclude_gt, exclude_lt, batch_size, progress)
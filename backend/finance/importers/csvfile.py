@@ -0,0 +1,149 @@
+"""Streaming parser for bank statement CSV downloads."""
+import codecs
+import csv
+import io
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from dateutil import parser as date_parser
+
+from .pipeline import make_record
+
+# Lower-cased header names recognised for each field, in order of preference
+DATE_COLUMNS = ("date", "transaction date", "txn date", "posting date", "posted date", "value date")
+AMOUNT_COLUMNS = ("amount", "transaction amount")
+DEBIT_COLUMNS = ("debit", "debit amount", "withdrawal", "withdrawal amt.", "withdrawal amount", "paid out")
+CREDIT_COLUMNS = ("credit", "credit amount", "deposit", "deposit amt.", "deposit amount", "paid in")
+DIRECTION_COLUMNS = ("type", "cr/dr", "dr/cr", "debit/credit")
+COUNTERPARTY_COLUMNS = ("payee", "name", "counterparty", "merchant", "beneficiary")
+DESCRIPTION_COLUMNS = ("description", "narration", "details", "particulars", "memo", "remarks")
+REFERENCE_COLUMNS = ("reference", "ref no.", "ref no", "chq./ref.no.", "transaction id", "reference number")
+
+CREDIT_MARKERS = {"cr", "credit", "c", "deposit"}
+DEBIT_MARKERS = {"dr", "debit", "d", "withdrawal"}
+NON_NUMERIC = re.compile(r"[^\d.\-]")
+
+
+def _find(header, names):
+    for name in names:
+        if name in header:
+            return header.index(name)
+    return None
+
+
+def _columns(header):
+    header = [name.strip().lower() for name in header]
+    columns = {
+        "date": _find(header, DATE_COLUMNS),
+        "amount": _find(header, AMOUNT_COLUMNS),
+        "debit": _find(header, DEBIT_COLUMNS),
+        "credit": _find(header, CREDIT_COLUMNS),
+        "direction": _find(header, DIRECTION_COLUMNS),
+        "counterparty": _find(header, COUNTERPARTY_COLUMNS),
+        "description": _find(header, DESCRIPTION_COLUMNS),
+        "reference": _find(header, REFERENCE_COLUMNS),
+    }
+    if columns["date"] is None or (columns["amount"] is None and columns["debit"] is None
+                                   and columns["credit"] is None):
+        raise ValueError("CSV header needs a date column and an amount or debit/credit columns")
+    return columns
+
+
+def _cell(row, index):
+    if index is None or index >= len(row):
+        return ""
+    return row[index].strip()
+
+
+def _amount(text):
+    """Parse '1,234.50', '-12', '(12.00)' or '₹ 99' into a Decimal; None when empty or unreadable."""
+    if not text:
+        return None
+    negative = text.startswith("(") and text.endswith(")")
+    try:
+        value = Decimal(NON_NUMERIC.sub("", text))
+    except InvalidOperation:
+        return None
+    return -value if negative else value
+
+
+def _timestamp(text, dayfirst):
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        pass
+    try:
+        return date_parser.parse(text, dayfirst=dayfirst)
+    except (ValueError, OverflowError):
+        return None
+
+
+def _text(source):
+    if isinstance(source, str):
+        return io.StringIO(source, newline="")
+    return codecs.getreader("utf-8-sig")(source)
+
+
+def parse(source, dayfirst=True):
+    """
+    Yield a record (or None) for every data row of a statement CSV.
+
+    Columns are found by their header names. Either a signed ``amount``
+    (optionally with a CR/DR column) or separate debit/credit columns decide
+    the direction. ``dayfirst`` resolves dates such as 03/04/2024. Most
+    statements only give a date, so repeats of an identical row on the same
+    day get an ordinal reference to keep them apart in dedupe.
+    """
+    reader = csv.reader(_text(source))
+    header = next(reader, None)
+    if header is None:
+        return
+    columns = _columns(header)
+    seen = {}
+
+    for row in reader:
+        if not any(cell.strip() for cell in row):
+            continue
+        yield _parse_row(row, columns, seen, dayfirst)
+
+
+def _parse_row(row, columns, seen, dayfirst):
+    timestamp = _timestamp(_cell(row, columns["date"]), dayfirst)
+    if timestamp is None:
+        return None
+
+    amount = _amount(_cell(row, columns["amount"]))
+    if amount is not None:
+        direction = _cell(row, columns["direction"]).lower()
+        if direction in CREDIT_MARKERS:
+            amount = abs(amount)
+        elif direction in DEBIT_MARKERS:
+            amount = -abs(amount)
+    else:
+        debit = _amount(_cell(row, columns["debit"]))
+        credit = _amount(_cell(row, columns["credit"]))
+        if debit:
+            amount = -abs(debit)
+        elif credit:
+            amount = abs(credit)
+        else:
+            return None
+
+    if amount > 0:
+        transaction_type = "income"
+    elif amount < 0:
+        transaction_type = "expense"
+    else:
+        transaction_type = "unknown"
+
+    description = _cell(row, columns["description"]) or ", ".join(cell.strip() for cell in row if cell.strip())
+    counterparty = _cell(row, columns["counterparty"]) or _cell(row, columns["description"])
+    reference = _cell(row, columns["reference"]) or None
+    if reference is None:
+        key = (timestamp, amount, counterparty)
+        occurrence = seen.get(key, 0)
+        seen[key] = occurrence + 1
+        reference = f"#{occurrence}" if occurrence else None
+
+    return make_record(timestamp, transaction_type, abs(amount), counterparty, description, reference)
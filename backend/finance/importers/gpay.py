@@ -0,0 +1,197 @@
+"""Streaming parser for Google Pay Takeout activity exports."""
+import io
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from itertools import chain
+
+import django
+from lxml import etree
+
+from .pipeline import BATCH_SIZE, import_records, make_record
+
+OUTER_CELL_CLASS = "outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp"
+CONTENT_CELL_CLASS = "content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1"
+
+OUTER_CELL_MARKER = f'<div class="{OUTER_CELL_CLASS}"'.encode()
+
+CHUNK_SIZE = 64 * 1024
+SHARD_MIN_BYTES = 4 * 1024 * 1024  # Smaller exports are not worth fanning out
+
+DATE_PATTERN = re.compile(r'\d{1,2} \w{3,4} \d{4}, \d{2}:\d{2}:\d{2}')
+AMOUNT_PATTERN = re.compile(r'₹([\d,]+(\.\d{1,2})?)')
+
+
+def iter_activity_details(source, chunk_size=CHUNK_SIZE):
+    """Yield the text of each activity cell, feeding the parser chunk by chunk."""
+    if isinstance(source, str):
+        source = io.BytesIO(source.encode("utf-8"))
+
+    parser = etree.HTMLPullParser(events=("end",), tag="div", encoding="utf-8")
+    while True:
+        chunk = source.read(chunk_size)
+        if isinstance(chunk, str):
+            chunk = chunk.encode("utf-8")
+        if chunk:
+            parser.feed(chunk)
+        else:
+            parser.close()
+
+        for _, element in parser.read_events():
+            if element.get("class") != OUTER_CELL_CLASS:
+                continue
+            details = _content_text(element)
+
+            # Drop the finished cell and its already-seen siblings so the tree never grows
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+            if details is not None:
+                yield details
+
+        if not chunk:
+            break
+
+
+def _content_text(outer_cell):
+    for cell in outer_cell.iter("div"):
+        if cell.get("class") == CONTENT_CELL_CLASS:
+            return "".join(cell.itertext()).strip()
+    return None
+
+
+def parse_activity(details):
+    """Turn the text of one activity cell into a record, or None if it has no valid date."""
+    date_match = DATE_PATTERN.search(details)
+    if not date_match:
+        return None
+
+    date_text = date_match.group(0).replace("Sept", "Sep")
+    try:
+        timestamp = datetime.strptime(date_text, '%d %b %Y, %H:%M:%S')
+    except ValueError:
+        return None
+
+    # Determine transaction type
+    if "Received" in details:
+        transaction_type = "income"
+    elif "Paid" in details or "Sent" in details:
+        transaction_type = "expense"
+    else:
+        transaction_type = "unknown"
+
+    # Extract amount
+    amount_match = AMOUNT_PATTERN.search(details)
+    amount = Decimal(amount_match.group(1).replace(',', '')) if amount_match else Decimal("0")
+
+    # Extract recipient or source
+    if transaction_type == "income":
+        counterparty = "Received from"
+    elif "to" in details:
+        counterparty = details.split(' to ')[1].split('\n')[0].strip()
+    elif "using" in details:
+        counterparty = details.split(' using ')[0].split(' ')[-1].strip()
+    else:
+        counterparty = "Unknown"
+
+    return make_record(timestamp, transaction_type, amount, counterparty, details)
+
+
+def parse(source):
+    """Yield a record (or None) for every activity cell in an export."""
+    return (parse_activity(details) for details in iter_activity_details(source))
+
+
+def shard_boundaries(path, shards, min_bytes=SHARD_MIN_BYTES):
+    """
+    Split the export at ``path`` into at most ``shards`` ``(start, end)`` byte ranges.
+
+    Every range after the first starts exactly at an activity cell, so each one
+    can be parsed on its own and the results concatenated in order.
+    """
+    size = os.path.getsize(path)
+    shards = max(1, min(shards, size // min_bytes))
+    if shards == 1:
+        return [(0, size)]
+
+    offsets = [0]
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for i in range(1, shards):
+            position = mm.find(OUTER_CELL_MARKER, max(size * i // shards, offsets[-1] + 1))
+            if position == -1:
+                break
+            offsets.append(position)
+    offsets.append(size)
+    return list(zip(offsets, offsets[1:]))
+
+
+class _ByteRange:
+    """Read-only file-like view over ``[start, end)`` of a binary file."""
+
+    def __init__(self, fileobj, start, end):
+        fileobj.seek(start)
+        self.fileobj = fileobj
+        self.remaining = end - start
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.fileobj.read(size)
+        self.remaining -= len(data)
+        return data
+
+
+def parse_shard(path, start, end):
+    """Parse one byte range of an export into a list of records."""
+    with open(path, "rb") as f:
+        return list(parse(_ByteRange(f, start, end)))
+
+
+def import_shard(path, start, end, start_date, end_date, user, exclude_gt=None, exclude_lt=None,
+                 batch_size=BATCH_SIZE, progress=None):
+    """
+    Import one byte range of an export on its own and return its counters.
+
+    Every shard commits separately; a record that also appears in another
+    shard is caught by the fingerprint constraint and counted as a duplicate.
+    """
+    with open(path, "rb") as f:
+        records = parse(_ByteRange(f, start, end))
+        return import_records(records, start_date, end_date, user, exclude_gt, exclude_lt, batch_size, progress)
+
+
+def parse_gpay_html(source, start_date, end_date, user, exclude_gt=None, exclude_lt=None,
+                    batch_size=BATCH_SIZE, progress=None):
+    """
+    Import a Takeout export for ``user`` and return counters describing the run.
+
+    ``source`` may be the decoded HTML or any binary file-like object.
+    """
+    return import_records(parse(source), start_date, end_date, user, exclude_gt, exclude_lt, batch_size, progress)
+
+
+def parse_gpay_file(path, start_date, end_date, user, exclude_gt=None, exclude_lt=None, workers=None,
+                    batch_size=BATCH_SIZE, progress=None):
+    """
+    Import the export at ``path``, parsing shards of it in a pool of ``workers`` processes.
+
+    The parsed shards are merged back in file order before writing, so the
+    result is identical to parse_gpay_html() on the same file. Celery prefork
+    workers cannot start child processes; tasks fan out parse_gpay_shard
+    subtasks that each write their own shard through import_shard().
+    """
+    workers = workers or os.cpu_count() or 1
+    shards = shard_boundaries(path, workers * 4)
+    if workers == 1 or len(shards) == 1:
+        with open(path, "rb") as source:
+            return parse_gpay_html(source, start_date, end_date, user, exclude_gt, exclude_lt, batch_size, progress)
+
+    starts, ends = zip(*shards)
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as executor:
+        records = chain.from_iterable(executor.map(parse_shard, [path] * len(shards), starts, ends))
+        return import_records(records, start_date, end_date, user, exclude_gt, exclude_lt, batch_size, progress)
+
@@ -0,0 +1,106 @@
+"""Streaming parser for OFX / QFX statement downloads, both SGML (1.x) and XML (2.x)."""
+import codecs
+import html
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+from .pipeline import make_record
+
+CHUNK_SIZE = 64 * 1024
+START_TAG = "<STMTTRN>"
+END_TAG = "</STMTTRN>"
+
+# SGML leaves leaf elements unclosed, so read each value up to the next tag or line break;
+# "<" and "&" inside a value are escaped as entities, so the value is unescaped afterwards
+FIELD_PATTERN = re.compile(r"<([A-Z0-9.]+)>([^<\r\n]*)")
+CHARSET_PATTERN = re.compile(rb"CHARSET:\s*(\d+)|encoding=[\"']([\w-]+)[\"']", re.IGNORECASE)
+
+
+def _decoder(head):
+    match = CHARSET_PATTERN.search(head)
+    if match and match.group(1) == b"1252":
+        return codecs.getincrementaldecoder("cp1252")(errors="replace")
+    if match and match.group(2):
+        try:
+            return codecs.getincrementaldecoder(match.group(2).decode("ascii"))(errors="replace")
+        except LookupError:
+            pass
+    return codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+
+def iter_transactions(source, chunk_size=CHUNK_SIZE):
+    """Yield the fields of each <STMTTRN> block as a dict, reading ``chunk_size`` bytes at a time."""
+    if isinstance(source, str):
+        chunks, decoder = iter([source, ""]), None
+    else:
+        head = source.read(chunk_size)
+        decoder = _decoder(head)
+        chunks = _read_chunks(source, head, chunk_size)
+
+    buffer = ""
+    for chunk in chunks:
+        if decoder is not None:
+            chunk = decoder.decode(chunk, final=not chunk)
+        buffer += chunk
+        while True:
+            start = buffer.find(START_TAG)
+            if start == -1:
+                # Keep a possible partial start tag for the next chunk
+                buffer = buffer[-len(START_TAG):]
+                break
+            end = buffer.find(END_TAG, start)
+            if end == -1:
+                buffer = buffer[start:]
+                break
+            block = buffer[start + len(START_TAG):end]
+            yield {tag: html.unescape(value.strip()) for tag, value in FIELD_PATTERN.findall(block)}
+            buffer = buffer[end + len(END_TAG):]
+
+
+def _read_chunks(source, head, chunk_size):
+    chunk = head
+    while chunk:
+        yield chunk
+        chunk = source.read(chunk_size)
+    yield b""
+
+
+def parse_timestamp(value):
+    """OFX dates are YYYYMMDD[HHMMSS[.XXX]][[offset:TZ]]; keep the local date and time."""
+    digits = value[:14]
+    for fmt, length in (("%Y%m%d%H%M%S", 14), ("%Y%m%d%H%M", 12), ("%Y%m%d", 8)):
+        if len(digits) >= length and digits[:length].isdigit():
+            try:
+                return datetime.strptime(digits[:length], fmt)
+            except ValueError:
+                return None
+    return None
+
+
+def parse_transaction(fields):
+    """Turn the fields of one <STMTTRN> into a record, or None without a usable date or amount."""
+    timestamp = parse_timestamp(fields.get("DTPOSTED", ""))
+    try:
+        amount = Decimal(fields.get("TRNAMT", "").replace(",", "."))
+    except InvalidOperation:
+        return None
+    if timestamp is None:
+        return None
+
+    if amount > 0:
+        transaction_type = "income"
+    elif amount < 0:
+        transaction_type = "expense"
+    else:
+        transaction_type = "unknown"
+
+    name = fields.get("NAME", "")
+    memo = fields.get("MEMO", "")
+    description = " - ".join(part for part in (name, memo) if part) or fields.get("TRNTYPE", "")
+    return make_record(timestamp, transaction_type, abs(amount), name or memo, description, fields.get("FITID") or None)
+
+
+def parse(source):
+    """Yield a record (or None) for every transaction in a statement download."""
+    return (parse_transaction(fields) for fields in iter_transactions(source))
@@ -0,0 +1,167 @@
+"""
+Shared import pipeline: filter -> dedupe -> batched write.
+
+Format parsers yield normalised records, or None for an entry they could
+not read. A record is a dict with these keys:
+
+- ``timestamp``: datetime of the transaction.
+- ``type``: ``"income"``, ``"expense"`` or ``"unknown"``.
+- ``amount``: a positive Decimal.
+- ``counterparty``: the payer or payee, at most MAX_LENGTH characters.
+- ``description``: the raw text of the entry.
+- ``reference``: an optional bank reference. It is added to the fingerprint
+  for statements whose timestamps cannot tell identical entries apart.
+"""
+import hashlib
+from decimal import Decimal
+
+from django.db import router, transaction
+from django.db.models import sql
+from django.db.models.constants import OnConflict
+
+from ..models import Income, Expense
+from ..summary import invalidate_summary
+from .. import rollups
+
+MAX_LENGTH = 100
+BATCH_SIZE = 1000
+
+WRITE_TARGETS = {
+    "income": (Income, "income_source"),
+    "expense": (Expense, "recipient"),
+}
+
+
+def make_record(timestamp, transaction_type, amount, counterparty, description, reference=None):
+    return {
+        "timestamp": timestamp,
+        "type": transaction_type,
+        "amount": amount,
+        "counterparty": (counterparty or "")[:MAX_LENGTH],
+        "description": description,
+        "reference": reference,
+    }
+
+
+def transaction_fingerprint(user_id, timestamp, amount, counterparty, transaction_type, reference=None):
+    """Stable hash identifying one imported transaction, stored on Income/Expense for dedupe."""
+    parts = [str(user_id), timestamp.isoformat(), str(amount.quantize(Decimal("0.01"))), counterparty or "", transaction_type]
+    if reference:
+        parts.append(reference)
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def filter_records(records, start_date, end_date, stats, exclude_gt=None, exclude_lt=None,
+                   batch_size=BATCH_SIZE, progress=None):
+    """Yield the importable records, counting the rest as skipped or filtered in ``stats``."""
+    for record in records:
+        stats["scanned"] += 1
+        if progress is not None and stats["scanned"] % batch_size == 0:
+            progress(dict(stats))
+        if record is None or record["type"] not in WRITE_TARGETS:
+            stats["skipped"] += 1
+            continue
+        if not (start_date <= record["timestamp"].date() <= end_date):
+            stats["skipped"] += 1
+            continue
+
+        # Filter transactions based on exclude_gt and exclude_lt
+        amount = record["amount"]
+        if (exclude_gt is not None and amount > exclude_gt) or (exclude_lt is not None and amount < exclude_lt):
+            stats["filtered"] += 1
+            continue
+        yield record
+
+
+def write_records(records, user, stats, batch_size=BATCH_SIZE):
+    """Deduplicate and bulk-insert records, ``batch_size`` per type at a time."""
+    pending = {transaction_type: [] for transaction_type in WRITE_TARGETS}
+    for record in records:
+        batch = pending[record["type"]]
+        batch.append(record)
+        if len(batch) >= batch_size:
+            _write_batch(record["type"], batch, user, stats)
+            batch.clear()
+
+    for transaction_type, batch in pending.items():
+        if batch:
+            _write_batch(transaction_type, batch, user, stats)
+
+
+def import_records(records, start_date, end_date, user, exclude_gt=None, exclude_lt=None,
+                   batch_size=BATCH_SIZE, progress=None):
+    """
+    Run parsed records through the pipeline and return counters for the run.
+
+    Everything is written inside a single database transaction. ``progress``,
+    if given, is called with the counters every ``batch_size`` records.
+    """
+    stats = {"scanned": 0, "inserted": 0, "duplicates": 0, "filtered": 0, "skipped": 0}
+    with transaction.atomic():
+        accepted = filter_records(records, start_date, end_date, stats, exclude_gt, exclude_lt, batch_size, progress)
+        write_records(accepted, user, stats, batch_size)
+        if stats["inserted"]:
+            # bulk_create sends no post_save signals
+            transaction.on_commit(lambda: invalidate_summary(user.pk))
+    return stats
+
+
+def _write_batch(transaction_type, records, user, stats):
+    model, counterparty_field = WRITE_TARGETS[transaction_type]
+    fingerprinted = [
+        (
+            transaction_fingerprint(
+                user.pk, r["timestamp"], r["amount"], r["counterparty"], transaction_type, r.get("reference")
+            ),
+            r,
+        )
+        for r in records
+    ]
+    # One indexed lookup per batch instead of one exists() per row
+    existing = set(
+        model.objects.filter(fingerprint__in=[fingerprint for fingerprint, _ in fingerprinted])
+        .values_list("fingerprint", flat=True)
+    )
+
+    rows = []
+    for fingerprint, record in fingerprinted:
+        if fingerprint in existing:
+            stats["duplicates"] += 1
+            continue
+        existing.add(fingerprint)
+        rows.append(model(**{
+            "user": user,
+            "amount": record["amount"],
+            "date": record["timestamp"].date(),
+            counterparty_field: record["counterparty"],
+            "description": record["description"],
+            "fingerprint": fingerprint,
+        }))
+
+    inserted = insert_new(model, rows)
+    # Rows left out lost a race with a concurrent import of the same entries
+    stats["duplicates"] += len(rows) - len(inserted)
+    rollups.record(transaction_type, inserted)
+    stats["inserted"] += len(inserted)
+
+
+def insert_new(model, rows):
+    """
+    INSERT ... ON CONFLICT DO NOTHING RETURNING fingerprint, and return the ``rows`` that were actually written.
+
+    bulk_create(ignore_conflicts=True) cannot tell which rows a conflict
+    dropped, so the insert query is built directly.
+    """
+    if not rows:
+        return []
+    opts = model._meta
+    fields = [field for field in opts.concrete_fields if not field.primary_key and not field.generated]
+    written = set()
+    for start in range(0, len(rows), BATCH_SIZE):
+        query = sql.InsertQuery(model, on_conflict=OnConflict.IGNORE)
+        query.insert_values(fields, rows[start:start + BATCH_SIZE])
+        returned = query.get_compiler(using=router.db_for_write(model)).execute_sql(
+            returning_fields=[opts.get_field("fingerprint")]
+        )
+        written.update(fingerprint for fingerprint, in returned)
+    return [row for row in rows if row.fingerprint in written]
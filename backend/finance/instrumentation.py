@@ -0,0 +1,221 @@
+"""Per-request timing, query and size metrics, Server-Timing headers, histograms and performance budgets."""
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger("finance.requests")
+
+# Upper bounds of the histogram buckets; anything larger lands in "+Inf"
+HISTOGRAM_BUCKETS = {
+    "wall_ms": [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000],
+    "db_ms": [1, 5, 10, 25, 50, 100, 250, 500, 1000],
+    "queries": [1, 2, 5, 10, 20, 50, 100],
+    "serialize_ms": [1, 5, 10, 25, 50, 100, 250, 500],
+    "render_ms": [1, 5, 10, 25, 50, 100, 250, 500],
+    "bytes": [1_000, 10_000, 100_000, 1_000_000, 10_000_000],
+}
+
+_current = ContextVar("request_metrics", default=None)
+
+
+class PerformanceBudgetExceeded(AssertionError):
+    """Raised instead of logged when PERF_BUDGET_ACTION is "raise", so a test over budget fails."""
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.phases = {"serialize": 0.0, "render": 0.0}
+
+    def __call__(self, execute, sql, params, many, context):
+        # connection.execute_wrapper() hook
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+
+@contextmanager
+def timed(phase):
+    """Add the block's duration to ``phase`` of the request being served, if any."""
+    metrics = _current.get()
+    if metrics is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.phases[phase] += time.perf_counter() - started
+
+
+class Histograms:
+    """Histograms of every request metric per "<METHOD> <url name>", kept in process memory by each worker."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def observe(self, record, over_budget):
+        key = f"{record['method']} {record['url_name']}"
+        with self.lock:
+            endpoint = self.endpoints.setdefault(key, {
+                "count": 0,
+                "over_budget": 0,
+                "metrics": {
+                    name: {"buckets": [0] * (len(bounds) + 1), "sum": 0, "max": 0}
+                    for name, bounds in HISTOGRAM_BUCKETS.items()
+                },
+            })
+            endpoint["count"] += 1
+            endpoint["over_budget"] += bool(over_budget)
+            for name, bounds in HISTOGRAM_BUCKETS.items():
+                value = record.get(name)
+                if value is None:
+                    continue
+                histogram = endpoint["metrics"][name]
+                histogram["buckets"][bisect_left(bounds, value)] += 1
+                histogram["sum"] += value
+                histogram["max"] = max(histogram["max"], value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: {
+                    "count": endpoint["count"],
+                    "over_budget": endpoint["over_budget"],
+                    "metrics": {
+                        name: {
+                            "buckets": dict(zip([str(b) for b in HISTOGRAM_BUCKETS[name]] + ["+Inf"], h["buckets"])),
+                            "sum": round(h["sum"], 3),
+                            "max": round(h["max"], 3),
+                            "mean": round(h["sum"] / endpoint["count"], 3),
+                        }
+                        for name, h in endpoint["metrics"].items()
+                    },
+                }
+                for key, endpoint in sorted(self.endpoints.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.endpoints.clear()
+
+
+histograms = Histograms()
+
+
+def over_budget(url_name, record):
+    """
+    ``{metric: (value, limit)}`` for every budget limit the request went over.
+
+    A ``"<METHOD> <url name>"`` entry in PERF_BUDGETS takes precedence over a plain ``"<url name>"`` one.
+    """
+    budgets = settings.PERF_BUDGETS
+    budget = budgets.get(f"{record['method']} {url_name}", budgets.get(url_name, {}))
+    return {
+        name: (record[name], limit)
+        for name, limit in budget.items()
+        if record.get(name) is not None and record[name] > limit
+    }
+
+
+class RequestMetricsMiddleware:
+    """
+    Measures every request and reports it as a Server-Timing header, a JSON log line and histograms.
+
+    Recorded per request: wall time, database query count and time (through
+    ``connection.execute_wrapper``), serializer and renderer time (from the
+    timed() blocks in serializers.py and renderers.py) and response size.
+    Requests over their PERF_BUDGETS entry are logged as warnings, or raise
+    PerformanceBudgetExceeded when PERF_BUDGET_ACTION is "raise".
+
+    Works in both sync and async stacks, so under ASGI it does not push async
+    views back onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        try:
+            with connection.execute_wrapper(metrics):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        started = time.perf_counter()
+        # Queries run on the request's ORM thread, through that thread's connection, so the hook goes there
+        await sync_to_async(_add_wrapper)(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(metrics)
+            _current.reset(token)
+        return self.report(request, response, metrics, time.perf_counter() - started)
+
+    def report(self, request, response, metrics, wall):
+        match = request.resolver_match
+        url_name = match.view_name if match and match.view_name else "unresolved"
+        record = {
+            "url_name": url_name,
+            "method": request.method,
+            "status": response.status_code,
+            "wall_ms": round(wall * 1000, 3),
+            "queries": metrics.queries,
+            "db_ms": round(metrics.db * 1000, 3),
+            "serialize_ms": round(metrics.phases["serialize"] * 1000, 3),
+            "render_ms": round(metrics.phases["render"] * 1000, 3),
+            # Streaming bodies are produced after the middleware returns
+            "bytes": None if response.streaming else len(response.content),
+        }
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={record["db_ms"]};desc="{metrics.queries} queries"',
+            f'serialize;dur={record["serialize_ms"]}',
+            f'render;dur={record["render_ms"]}',
+            f'total;dur={record["wall_ms"]}',
+        ])
+
+        exceeded = over_budget(url_name, record)
+        histograms.observe(record, exceeded)
+        if exceeded:
+            record["over_budget"] = {name: limit for name, (_, limit) in exceeded.items()}
+            message = json.dumps(record)
+            if settings.PERF_BUDGET_ACTION == "raise":
+                raise PerformanceBudgetExceeded(message)
+            logger.warning(message)
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+
+def _add_wrapper(metrics):
+    connection.execute_wrappers.append(metrics)
+
+
+def _remove_wrapper(metrics):
+    connection.execute_wrappers.remove(metrics)
@@ -0,0 +1,103 @@
+"""
+Closed-loop HTTP load generator comparing the sync read endpoints with their async/ versions.
+
+Each of ``concurrency`` clients sends a GET, waits for the answer and sends
+the next one over the same keep-alive connection, so throughput shows how many
+requests the server can have in flight at once. Run it against a real server
+(``uvicorn goalcrest.asgi:application``, say); the test client serialises
+everything and says nothing about concurrency.
+"""
+import http.client
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.urls import reverse
+
+# name: (sync url name, async url name)
+ENDPOINTS = {
+    "incomes": ("income-list-create", "async-income-list"),
+    "expenses": ("expense-list-create", "async-expense-list"),
+    "transactions": ("transaction-list-create", "async-transaction-list"),
+    "summary": ("summary", "async-summary"),
+}
+MODES = ["sync", "async"]
+
+
+def endpoint_paths(mode, names, page_size=None):
+    """The path of each endpoint in ``names`` for ``mode`` ("sync" or "async")."""
+    paths = {}
+    for name in names:
+        path = reverse(ENDPOINTS[name][MODES.index(mode)])
+        if page_size and name != "summary":
+            path += f"?page_size={page_size}"
+        paths[name] = path
+    return paths
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarise(samples, elapsed):
+    """Counts, throughput and latency percentiles (ms) of ``(ok, ms)`` samples collected over ``elapsed`` seconds."""
+    timings = sorted(ms for ok, ms in samples if ok)
+    result = {
+        "requests": len(samples),
+        "errors": len(samples) - len(timings),
+        "requests_per_second": round(len(timings) / elapsed, 1) if elapsed else None,
+    }
+    if timings:
+        result.update({
+            "p50_ms": round(_percentile(timings, 0.5), 2),
+            "p95_ms": round(_percentile(timings, 0.95), 2),
+            "p99_ms": round(_percentile(timings, 0.99), 2),
+            "max_ms": round(timings[-1], 2),
+        })
+    return result
+
+
+def run(base_url, token, paths, concurrency, requests):
+    """
+    Send ``requests`` GETs, cycling through ``paths`` (``{name: path}``), from ``concurrency`` clients.
+
+    Returns ``{"total": stats, name: stats, ...}`` as built by summarise().
+    """
+    target = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if target.scheme == "https" else http.client.HTTPConnection
+    headers = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+    prefix = target.path.rstrip("/")
+    names = list(paths)
+    local = threading.local()
+    opened = []
+
+    def fetch(n):
+        name = names[n % len(names)]
+        started = time.perf_counter()
+        try:
+            if getattr(local, "connection", None) is None:
+                local.connection = connection_class(target.netloc, timeout=60)
+                opened.append(local.connection)
+            local.connection.request("GET", prefix + paths[name], headers=headers)
+            response = local.connection.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            # Reconnect on the next request
+            local.connection.close()
+            local.connection = None
+            ok = False
+        return name, ok, (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        samples = list(pool.map(fetch, range(requests)))
+    elapsed = time.perf_counter() - started
+    for connection in opened:
+        connection.close()
+
+    results = {"total": summarise([(ok, ms) for _, ok, ms in samples], elapsed)}
+    for name in names:
+        results[name] = summarise([(ok, ms) for sample_name, ok, ms in samples if sample_name == name], elapsed)
+    return results
@@ -0,0 +1,52 @@
+import os
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance import synthetic
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate reproducible synthetic users with Income, Expense and Transaction histories, "
+        "and optionally GPay Takeout HTML exports, for benchmarking."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=10)
+        parser.add_argument("--rows", type=int, default=10000, help="Ledger rows across all users and models")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--years", type=int, default=3, help="Length of the generated history")
+        parser.add_argument("--end-date", type=date.fromisoformat, help="Last day of history (default: today)")
+        parser.add_argument("--gpay-files", type=int, default=0, help="Number of GPay exports to write")
+        parser.add_argument("--gpay-rows", type=int, default=10000, help="Activities per GPay export")
+        parser.add_argument("--gpay-dir", default="benchmarks/data")
+        parser.add_argument("--clear", action="store_true", help="Delete earlier synthetic users first")
+
+    def handle(self, *args, **options):
+        if options["users"] < 1:
+            raise CommandError("--users must be at least 1")
+        if options["clear"]:
+            self.stdout.write(f"Deleted {synthetic.clear()} synthetic objects")
+
+        try:
+            totals = synthetic.generate(
+                options["users"], options["rows"], seed=options["seed"], years=options["years"],
+                end_date=options["end_date"], progress=self.stdout.write,
+            )
+        except ValueError as exc:
+            raise CommandError(f"{exc} (--clear deletes them)") from exc
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {totals['users']} users, {totals['income']} incomes, {totals['expense']} expenses "
+            f"and {totals['transaction']} transactions"
+        ))
+
+        if options["gpay_files"]:
+            os.makedirs(options["gpay_dir"], exist_ok=True)
+        for n in range(options["gpay_files"]):
+            path = os.path.join(options["gpay_dir"], f"gpay-{options['seed']}-{n}.html")
+            synthetic.write_gpay_export(
+                path, options["gpay_rows"], seed=options["seed"] + n, years=options["years"],
+                end_date=options["end_date"],
+            )
+            self.stdout.write(f"Wrote {path} ({os.path.getsize(path)} bytes)")
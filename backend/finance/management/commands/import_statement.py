@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from finance.importers import IMPORTERS, import_statement
+from finance.importers.gpay import parse_gpay_file
+
+
+class Command(BaseCommand):
+    help = "Import a bank statement or Google Pay Takeout export from disk."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Path to the statement file (for GPay, the Takeout 'My Activity.html')")
+        parser.add_argument("--format", choices=sorted(IMPORTERS), default="gpay")
+        parser.add_argument("--email", required=True, help="Email of the user to import for")
+        parser.add_argument("--start-date", required=True, type=parse_date)
+        parser.add_argument("--end-date", required=True, type=parse_date)
+        parser.add_argument("--exclude-gt", type=int)
+        parser.add_argument("--exclude-lt", type=int)
+        parser.add_argument("--workers", type=int, help="GPay parser processes (defaults to the CPU count)")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options["email"])
+        except User.DoesNotExist as exc:
+            raise CommandError(f"No user with email {options['email']}") from exc
+
+        window = (options["start_date"], options["end_date"], user, options["exclude_gt"], options["exclude_lt"])
+        try:
+            if options["format"] == "gpay":
+                stats = parse_gpay_file(options["path"], *window, workers=options["workers"])
+            else:
+                with open(options["path"], "rb") as source:
+                    stats = import_statement(source, options["format"], *window)
+        except ValueError as exc:
+            raise CommandError(str(exc)) from exc
+
+        self.stdout.write(self.style.SUCCESS(
+            "Scanned {scanned}, inserted {inserted}, duplicates {duplicates}, "
+            "filtered {filtered}, skipped {skipped}".format(**stats)
+        ))
@@ -0,0 +1,78 @@
+import json
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from finance import benchmarks, loadtest
+from finance.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Load a running server with concurrent dashboard reads and compare the sync endpoints with the async/ "
+        "ones. Requests are signed with a JWT for --email (default: the largest synthetic user)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--base-url", default="http://localhost:8000")
+        parser.add_argument("--email", help="User to read as")
+        parser.add_argument("--endpoint", choices=sorted(loadtest.ENDPOINTS), action="append",
+                            help="Default: all of them")
+        parser.add_argument("--mode", choices=loadtest.MODES, action="append", help="Default: both")
+        parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per mode and concurrency level")
+        parser.add_argument("--warmup", type=int, default=100, help="Requests sent and discarded before each run")
+        parser.add_argument("--page-size", type=int)
+        parser.add_argument("--output", help="Also write the results to this JSON file")
+
+    def handle(self, *args, **options):
+        if options["email"]:
+            user = User.objects.filter(email=options["email"]).first()
+        else:
+            user = benchmarks.benchmark_user()
+        if user is None:
+            raise CommandError("No such user; pass --email or run generate_synthetic_data first")
+        token = str(AccessToken.for_user(user))
+        names = options["endpoint"] or sorted(loadtest.ENDPOINTS)
+        modes = options["mode"] or loadtest.MODES
+
+        runs = []
+        for concurrency in options["concurrency"]:
+            throughput = {}
+            for mode in modes:
+                paths = loadtest.endpoint_paths(mode, names, options["page_size"])
+                if options["warmup"]:
+                    loadtest.run(options["base_url"], token, paths, concurrency, options["warmup"])
+                results = loadtest.run(options["base_url"], token, paths, concurrency, options["requests"])
+                runs.append({"mode": mode, "concurrency": concurrency, "results": results})
+                throughput[mode] = results["total"]["requests_per_second"]
+                for name, stats in results.items():
+                    self.write_stats(mode, concurrency, name, stats)
+            if throughput.get("sync") and throughput.get("async"):
+                self.stdout.write(
+                    f"concurrency {concurrency}: async serves {throughput['async'] / throughput['sync']:.2f}x "
+                    "the requests per second of sync"
+                )
+
+        if options["output"]:
+            os.makedirs(os.path.dirname(options["output"]) or ".", exist_ok=True)
+            with open(options["output"], "w") as f:
+                json.dump({
+                    "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "base_url": options["base_url"],
+                    "user": user.email,
+                    "requests": options["requests"],
+                    "page_size": options["page_size"],
+                    "runs": runs,
+                }, f, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+    def write_stats(self, mode, concurrency, name, stats):
+        line = (
+            f"{mode:<5} c={concurrency:<4} {name:<12} {stats['requests_per_second'] or 0:8.1f} req/s  "
+            f"p50 {stats.get('p50_ms', 0):8.2f} ms  p95 {stats.get('p95_ms', 0):8.2f} ms  "
+            f"p99 {stats.get('p99_ms', 0):8.2f} ms  {stats['errors']} errors"
+        )
+        self.stdout.write(self.style.ERROR(line) if stats["errors"] else line)
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from finance import rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild MonthlyRollup from the raw Income and Expense rows, then verify it."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--email", help="Only rebuild this user's rollups")
+        parser.add_argument(
+            "--verify-only", action="store_true", help="Compare the rollups against the raw rows without rebuilding"
+        )
+
+    def handle(self, *args, **options):
+        user = None
+        if options["email"]:
+            User = get_user_model()
+            try:
+                user = User.objects.get(email=options["email"])
+            except User.DoesNotExist as exc:
+                raise CommandError(f"No user with email {options['email']}") from exc
+
+        if not options["verify_only"]:
+            count = rollups.rebuild(user)
+            self.stdout.write(f"Rebuilt {count} rollup buckets")
+
+        mismatches = rollups.verify(user)
+        for key, expected, actual in mismatches[:20]:
+            self.stderr.write(f"{key}: expected {expected}, found {actual}")
+        if mismatches:
+            raise CommandError(f"{len(mismatches)} rollup buckets disagree with the raw rows")
+        self.stdout.write(self.style.SUCCESS("Rollups match the raw rows"))
@@ -0,0 +1,67 @@
+import glob
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from finance import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the list endpoints, serializers, GPay parser and recurrence job against the synthetic data, "
+        "write the results as JSON and optionally compare them with an earlier run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--page-size", type=int, nargs="+", default=[100, 1000])
+        parser.add_argument("--serializer-rows", type=int, default=10000)
+        parser.add_argument("--gpay", nargs="*", default=None,
+                            help="GPay exports to parse (default: benchmarks/data/*.html)")
+        parser.add_argument("--only", nargs="+", help="Only run cases whose name starts with one of these")
+        parser.add_argument("--output", help="Results file (default: benchmarks/results/<timestamp>.json)")
+        parser.add_argument("--compare", help="Earlier results file to compare against")
+        parser.add_argument("--max-regression", type=float, default=0.2,
+                            help="Fail when a median grew by more than this fraction of the baseline")
+
+    def handle(self, *args, **options):
+        gpay_paths = options["gpay"] if options["gpay"] is not None else sorted(glob.glob("benchmarks/data/*.html"))
+        try:
+            report = benchmarks.run_suite(
+                repeat=options["repeat"],
+                page_sizes=options["page_size"],
+                serializer_rows=options["serializer_rows"],
+                gpay_paths=gpay_paths,
+                only=options["only"],
+                progress=self.write_result,
+            )
+        except LookupError as exc:
+            raise CommandError(str(exc)) from exc
+
+        output = options["output"] or os.path.join(
+            "benchmarks", "results", report["environment"]["timestamp"].replace(":", "") + ".json"
+        )
+        os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        self.stdout.write(f"Wrote {output}")
+
+        if options["compare"]:
+            with open(options["compare"]) as f:
+                baseline = json.load(f)
+            regressions = 0
+            for name, params, old, new, ratio, regressed in benchmarks.compare(
+                baseline, report, options["max_regression"]
+            ):
+                line = f"{name:<36} {json.dumps(params):<40} {old:10.2f} ms -> {new:10.2f} ms  {ratio:5.2f}x"
+                self.stdout.write(self.style.ERROR(line) if regressed else line)
+                regressions += regressed
+            if regressions:
+                raise CommandError(f"{regressions} benchmarks regressed by more than {options['max_regression']:.0%}")
+
+    def write_result(self, result):
+        self.stdout.write(
+            f"{result['name']:<36} {json.dumps(result['params']):<40} median {result['median_ms']:10.2f} ms  "
+            f"p95 {result['p95_ms']:10.2f} ms  {result['rows']} rows"
+        )
@@ -0,0 +1,68 @@
+# Generated by Django 5.1.1 on 2026-10-18 15:57
+
+import hashlib
+import re
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import migrations, models
+
+DATE_PATTERN = re.compile(r'\d{1,2} \w{3,4} \d{4}, \d{2}:\d{2}:\d{2}')
+
+
+def _fingerprint(user_id, timestamp, amount, counterparty, transaction_type):
+    # Frozen copy of finance.importers.pipeline.transaction_fingerprint, from before it took a reference
+    parts = [str(user_id), timestamp.isoformat(), str(amount.quantize(Decimal("0.01"))), counterparty or "", transaction_type]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def _backfill(model, counterparty_field, transaction_type):
+    seen = set()
+    batch = []
+    rows = model.objects.filter(fingerprint__isnull=True).only("id", "user_id", "amount", counterparty_field, "description")
+    for row in rows.iterator(chunk_size=2000):
+        match = DATE_PATTERN.search(row.description or "")
+        if not match:
+            continue
+        try:
+            timestamp = datetime.strptime(match.group(0).replace("Sept", "Sep"), '%d %b %Y, %H:%M:%S')
+        except ValueError:
+            continue
+        fingerprint = _fingerprint(row.user_id, timestamp, row.amount, getattr(row, counterparty_field), transaction_type)
+        # Rows that were already duplicated keep a NULL fingerprint
+        if fingerprint in seen:
+            continue
+        seen.add(fingerprint)
+        row.fingerprint = fingerprint
+        batch.append(row)
+        if len(batch) >= 2000:
+            model.objects.bulk_update(batch, ["fingerprint"])
+            batch = []
+    model.objects.bulk_update(batch, ["fingerprint"])
+
+
+def backfill_fingerprints(apps, schema_editor):
+    """Fingerprint previously imported GPay rows so re-uploads keep being deduplicated."""
+    _backfill(apps.get_model("finance", "Income"), "income_source", "income")
+    _backfill(apps.get_model("finance", "Expense"), "recipient", "expense")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0002_test'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='expense',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='income',
+            name='fingerprint',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True, unique=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+    ]
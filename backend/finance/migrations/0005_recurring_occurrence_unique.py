@@ -0,0 +1,21 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0004_importjob'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='recurringtransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('income__isnull', False)), fields=('income', 'date'), name='unique_income_occurrence'),
+        ),
+        migrations.AddConstraint(
+            model_name='recurringtransaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('expense__isnull', False)), fields=('expense', 'date'), name='unique_expense_occurrence'),
+        ),
+    ]
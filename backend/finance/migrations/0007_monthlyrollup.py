@@ -0,0 +1,43 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:06
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Seed the rollup table from the rows that already exist
+POPULATE_SQL = """
+INSERT INTO finance_monthlyrollup (user_id, month, category_id, type, total, count)
+SELECT user_id, date_trunc('month', date)::date, category_id, 'income', SUM(amount), COUNT(*)
+FROM finance_income GROUP BY 1, 2, 3
+UNION ALL
+SELECT user_id, date_trunc('month', date)::date, category_id, 'expense', SUM(amount), COUNT(*)
+FROM finance_expense GROUP BY 1, 2, 3
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0006_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('type', models.CharField(choices=[('income', 'Income'), ('expense', 'Expense')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('count', models.IntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='finance.category')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(models.F('user'), models.F('month'), django.db.models.functions.comparison.Coalesce('category', models.Value(0, output_field=models.BigIntegerField())), models.F('type'), name='unique_monthly_rollup')],
+            },
+        ),
+        migrations.RunSQL(POPULATE_SQL, migrations.RunSQL.noop),
+    ]
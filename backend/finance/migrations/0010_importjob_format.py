@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 16:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0009_sync_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='format',
+            field=models.CharField(choices=[('gpay', 'Google Pay Takeout HTML'), ('csv', 'CSV statement'), ('ofx', 'OFX / QFX statement')], default='gpay', max_length=10),
+        ),
+    ]
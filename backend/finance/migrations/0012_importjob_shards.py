@@ -0,0 +1,23 @@
+# Generated by Django 5.1.1 on 2026-10-18 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finance', '0011_outboundemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='shards',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('running', 'Running'), ('completed', 'Completed'), ('partial', 'Partially imported'), ('failed', 'Failed')], default='pending', max_length=20),
+        ),
+    ]
@@ -1,5 +1,6 @@
 """this is models file"""
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.base_user import BaseUserManager
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
@@ -8,6 +9,41 @@ from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils import timezone
 from dateutil.relativedelta import relativedelta
 
+# Step added to a recurring row's date to reach its next occurrence
+RECURRENCE_DELTAS = {
+    "daily": relativedelta(days=1),
+    "weekly": relativedelta(weeks=1),
+    "monthly": relativedelta(months=1),
+    "yearly": relativedelta(years=1),
+}
+
+
+def next_occurrence_after(date, recurrence_interval, anchor=None):
+    """
+    Date of the occurrence following ``date``, or None for an unknown interval.
+
+    Monthly and yearly steps are counted from ``anchor``, the series' first
+    date, when given: a series started on Jan 31 posts Feb 29 and then Mar 31,
+    where stepping from Feb 29 would settle on the 29th for good.
+    """
+    delta = RECURRENCE_DELTAS.get(recurrence_interval)
+    if not delta:
+        return None
+    if anchor is None or not (delta.months or delta.years):
+        return date + delta
+    elapsed = relativedelta(date, anchor)
+    steps = (elapsed.years * 12 + elapsed.months) // (delta.years * 12 + delta.months)
+    while anchor + delta * steps <= date:
+        steps += 1
+    return anchor + delta * steps
+
+
+def schedule_next_occurrence(row):
+    """Fill in a recurring Income/Expense row's first next_occurrence; shared by save() and the bulk API."""
+    if row.is_recurring and not row.next_occurrence:
+        row.next_occurrence = next_occurrence_after(row.date, row.recurrence_interval)
+
+
 class CustomUserManager(BaseUserManager):
     """Manager for custom user creation with email validation."""
 
@@ -137,19 +173,23 @@ class Income(models.Model):
     description = models.TextField(blank=True, null=True)  # Notes
     attachments = models.FileField(upload_to='income_attachments/', blank=True, null=True)  # Attachments
     next_occurrence = models.DateField(blank=True, null=True)
+    fingerprint = models.CharField(max_length=64, unique=True, blank=True, null=True, editable=False)  # Import dedupe hash
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Per-user date filters, newest-first listing, delta sync and the recurrence job's due scan
+        indexes = [
+            models.Index(fields=["user", "date"], name="income_user_date_idx"),
+            models.Index(fields=["user", "-date", "id"], name="income_user_recent_idx"),
+            models.Index(fields=["user", "updated_at"], name="income_user_updated_idx"),
+            models.Index(
+                fields=["next_occurrence"], condition=models.Q(is_recurring=True), name="income_due_idx"
+            ),
+        ]
+
     def save(self, *args, **kwargs):
-        if self.is_recurring and not self.next_occurrence:
-            if self.recurrence_interval == "daily":
-                self.next_occurrence = self.date + relativedelta(days=1)
-            elif self.recurrence_interval == "weekly":
-                self.next_occurrence = self.date + relativedelta(weeks=1)
-            elif self.recurrence_interval == "monthly":
-                self.next_occurrence = self.date + relativedelta(months=1)
-            elif self.recurrence_interval == "yearly":
-                self.next_occurrence = self.date + relativedelta(years=1)
+        schedule_next_occurrence(self)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -178,19 +218,23 @@ class Expense(models.Model):
     description = models.TextField(blank=True, null=True)  # Notes
     attachments = models.FileField(upload_to='expense_attachments/', blank=True, null=True)  # Attachments
     next_occurrence = models.DateField(blank=True, null=True)
+    fingerprint = models.CharField(max_length=64, unique=True, blank=True, null=True, editable=False)  # Import dedupe hash
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Per-user date filters, newest-first listing, delta sync and the recurrence job's due scan
+        indexes = [
+            models.Index(fields=["user", "date"], name="expense_user_date_idx"),
+            models.Index(fields=["user", "-date", "id"], name="expense_user_recent_idx"),
+            models.Index(fields=["user", "updated_at"], name="expense_user_updated_idx"),
+            models.Index(
+                fields=["next_occurrence"], condition=models.Q(is_recurring=True), name="expense_due_idx"
+            ),
+        ]
+
     def save(self, *args, **kwargs):
-        if self.is_recurring and not self.next_occurrence:
-            if self.recurrence_interval == "daily":
-                self.next_occurrence = self.date + relativedelta(days=1)
-            elif self.recurrence_interval == "weekly":
-                self.next_occurrence = self.date + relativedelta(weeks=1)
-            elif self.recurrence_interval == "monthly":
-                self.next_occurrence = self.date + relativedelta(months=1)
-            elif self.recurrence_interval == "yearly":
-                self.next_occurrence = self.date + relativedelta(years=1)
+        schedule_next_occurrence(self)
         super().save(*args, **kwargs)
 
     def __str__(self):
@@ -208,6 +252,22 @@ class Budget(models.Model):
         return f"Budget for {self.category.name} - {self.user}"
 
 
+class BudgetAlert(models.Model):
+    """Records that a budget's spend crossed one of BUDGET_ALERT_THRESHOLDS, so each crossing is notified once."""
+    budget = models.ForeignKey(Budget, on_delete=models.CASCADE, related_name="alerts")
+    threshold = models.PositiveSmallIntegerField()  # Percent of the budget amount
+    spent = models.DecimalField(max_digits=14, decimal_places=2)  # Spend when the crossing was detected
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["budget", "threshold"], name="unique_budget_alert"),
+        ]
+
+    def __str__(self):
+        return f"{self.threshold}% of {self.budget}"
+
+
 class Transaction(models.Model):
     """Logs each income or expense transaction."""
     TRANSACTION_TYPES = (("income", "Income"), ("expense", "Expense"))
@@ -220,6 +280,13 @@ class Transaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Per-user date filters and newest-first listing
+        indexes = [
+            models.Index(fields=["user", "date"], name="transaction_user_date_idx"),
+            models.Index(fields=["user", "-date", "id"], name="transaction_user_recent_idx"),
+        ]
+
     def __str__(self):
         return f"{self.transaction_type.capitalize()} {self.amount} - {self.user}"
 
@@ -231,9 +298,125 @@ class RecurringTransaction(models.Model):
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     date = models.DateField()
 
+    class Meta:
+        # One posted instance per rule and date keeps the recurrence job idempotent
+        constraints = [
+            models.UniqueConstraint(
+                fields=["income", "date"], condition=models.Q(income__isnull=False), name="unique_income_occurrence"
+            ),
+            models.UniqueConstraint(
+                fields=["expense", "date"], condition=models.Q(expense__isnull=False), name="unique_expense_occurrence"
+            ),
+        ]
+
     def __str__(self):
         return f"Recurring {'Income' if self.income else 'Expense'} - {self.amount} on {self.date}"
 
 
+class MonthlyRollup(models.Model):
+    """Running income/expense totals per user, month and category, kept current by finance.rollups."""
+    TYPE_CHOICES = (("income", "Income"), ("expense", "Expense"))
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    month = models.DateField()  # First day of the month
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True)
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Uncategorised rows share one bucket; the upsert in finance.rollups targets this index
+            models.UniqueConstraint(
+                models.F("user"),
+                models.F("month"),
+                Coalesce("category", models.Value(0, output_field=models.BigIntegerField())),
+                models.F("type"),
+                name="unique_monthly_rollup",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.type.capitalize()} {self.total} - {self.user} - {self.month:%Y-%m}"
+
+
+class Tombstone(models.Model):
+    """Marks a deleted Income or Expense so /sync/ can tell clients to drop it."""
+    MODEL_CHOICES = (("income", "Income"), ("expense", "Expense"))
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    model = models.CharField(max_length=10, choices=MODEL_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["user", "deleted_at"], name="tombstone_user_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"Deleted {self.model} {self.object_id} - {self.user}"
+
+
+class ImportJob(models.Model):
+    """A bank statement or GPay Takeout export queued for background import, with its progress counters."""
+    FORMAT_CHOICES = [
+        ("gpay", "Google Pay Takeout HTML"),
+        ("csv", "CSV statement"),
+        ("ofx", "OFX / QFX statement"),
+    ]
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("completed", "Completed"),
+        ("partial", "Partially imported"),  # Some shards of a sharded import failed; the others' rows are kept
+        ("failed", "Failed"),
+    ]
+    # Import counter (as returned by the importers) -> field
+    COUNTER_FIELDS = {
+        "scanned": "rows_scanned",
+        "inserted": "rows_inserted",
+        "duplicates": "rows_duplicate",
+        "filtered": "rows_filtered",
+        "skipped": "rows_skipped",
+    }
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    file = models.FileField(upload_to="imports/", blank=True, null=True)  # Removed once imported
+    format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default="gpay")
+    start_date = models.DateField()
+    end_date = models.DateField()
+    exclude_gt = models.IntegerField(blank=True, null=True)
+    exclude_lt = models.IntegerField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    task_id = models.CharField(max_length=255, blank=True, null=True)  # Celery task id
+    shards = models.PositiveSmallIntegerField(default=1)  # Parallel tasks the file was split across
+    rows_scanned = models.PositiveIntegerField(default=0)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    rows_duplicate = models.PositiveIntegerField(default=0)
+    rows_filtered = models.PositiveIntegerField(default=0)  # Dropped by exclude_gt / exclude_lt
+    rows_skipped = models.PositiveIntegerField(default=0)  # Outside the date window or unparseable
+    error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    def __str__(self):
+        return f"Import {self.pk} - {self.user} - {self.status}"
+
+
+class OutboundEmail(models.Model):
+    """An email waiting in the outbox for flush_email_outbox, which sends them in batches over one SMTP session."""
+    subject = models.CharField(max_length=998)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=254, blank=True, null=True)  # None: DEFAULT_FROM_EMAIL when sent
+    to = models.JSONField()
+    attempts = models.PositiveIntegerField(default=0)  # Flushes that failed with this message unsent
+    last_error = models.TextField(blank=True, null=True)
+    failed_at = models.DateTimeField(blank=True, null=True)  # Given up on; kept for inspection, never retried
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.subject} to {', '.join(self.to)}"
+
+
 class Test(models.Model):
     description = models.TextField(blank=True, null=True)
\ No newline at end of file
@@ -0,0 +1,115 @@
+"""
+Outgoing email, queued in the OutboundEmail table and sent in batches by flush_email_outbox.
+
+enqueue() stores a message in the caller's transaction and, once that commits,
+schedules one flush EMAIL_BATCH_DELAY seconds out unless one is already
+scheduled, so a burst of sign-ups or password resets becomes a few tasks
+instead of one per message. A flush sends up to EMAIL_BATCH_SIZE messages over
+a single SMTP connection on the "email" queue. Messages the server rejects
+outright are marked failed. When the connection itself fails, the unsent
+messages stay queued and the task retries with backoff.
+"""
+import logging
+import smtplib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SCHEDULED_KEY = "finance:outbox:flush-scheduled"
+
+
+def enqueue(subject, body, to, html_body=None, from_email=None):
+    """Queue an email to the ``to`` addresses; it is sent by the first flush after the transaction commits."""
+    email = OutboundEmail.objects.create(
+        subject=subject, body=body, html_body=html_body, from_email=from_email, to=list(to)
+    )
+    transaction.on_commit(schedule_flush)
+    return email
+
+
+def schedule_flush():
+    # add() only succeeds for the first message of a batch; the key is cleared when the flush starts
+    if cache.add(FLUSH_SCHEDULED_KEY, True, timeout=settings.EMAIL_BATCH_DELAY + 60):
+        from .tasks import flush_email_outbox
+        flush_email_outbox.apply_async(countdown=settings.EMAIL_BATCH_DELAY)
+
+
+def is_permanent(exc):
+    """Whether the message itself was rejected (5xx, refused or invalid recipients), so sending it again cannot help."""
+    if isinstance(exc, (smtplib.SMTPRecipientsRefused, ValueError)):
+        return True
+    return isinstance(exc, smtplib.SMTPResponseException) and exc.smtp_code >= 500
+
+
+def as_message(email, connection):
+    message = EmailMultiAlternatives(
+        subject=email.subject,
+        body=email.body,
+        from_email=email.from_email or settings.DEFAULT_FROM_EMAIL,
+        to=email.to,
+        connection=connection,
+    )
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def flush(batch_size):
+    """
+    Send up to ``batch_size`` queued emails over one connection; returns ``(sent, taken from the queue)``.
+
+    Rows are locked with SKIP LOCKED, so concurrent flushes share the queue
+    instead of sending a message twice. A transient error (the connection
+    failing, a 4xx reply) is raised after recording it on the unsent messages.
+    """
+    cache.delete(FLUSH_SCHEDULED_KEY)  # Messages queued from here on schedule the next flush
+    error = None
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.filter(failed_at__isnull=True).order_by("id").select_for_update(skip_locked=True)
+            [:batch_size]
+        )
+        if not batch:
+            return 0, 0
+
+        sent, rejected = [], []
+        try:
+            with get_connection() as connection:
+                for email in batch:
+                    try:
+                        as_message(email, connection).send()
+                    except (smtplib.SMTPException, ValueError) as exc:
+                        if not is_permanent(exc):
+                            raise
+                        logger.error("Email %s to %s rejected: %s", email.pk, email.to, exc)
+                        rejected.append((email.pk, exc))
+                    else:
+                        sent.append(email.pk)
+        except OSError as exc:  # smtplib's errors included
+            error = exc
+            handled = set(sent) | {pk for pk, _ in rejected}
+            unsent = [email.pk for email in batch if email.pk not in handled]
+            OutboundEmail.objects.filter(pk__in=unsent).update(attempts=F("attempts") + 1, last_error=repr(exc))
+            # Past the last attempt a message is parked with the rejected ones
+            OutboundEmail.objects.filter(pk__in=unsent, attempts__gte=settings.EMAIL_MAX_ATTEMPTS).update(
+                failed_at=timezone.now()
+            )
+
+        OutboundEmail.objects.filter(pk__in=sent).delete()
+        for pk, exc in rejected:
+            OutboundEmail.objects.filter(pk=pk).update(
+                attempts=F("attempts") + 1, last_error=repr(exc), failed_at=timezone.now()
+            )
+
+    logger.info("Sent %d of %d queued emails, %d rejected", len(sent), len(batch), len(rejected))
+    if error is not None:
+        raise error
+    return len(sent), len(batch)
@@ -0,0 +1,105 @@
+"""Keyset pagination for the finance list endpoints."""
+import base64
+import binascii
+
+from django.db.models import Q
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class DateIdCursorPagination(BasePagination):
+    """
+    Cursor pagination keyed on ``(date, id)``, matching the list views' ``-date, id`` ordering.
+
+    The cursor holds the key of the last row sent, and the next page is read
+    from the ``(user, -date, id)`` index starting just after it. Every page costs
+    the same however deep into the history it is, unlike OFFSET pages.
+    """
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.page_results(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request):
+        """paginate_queryset() for async views; the page is read in one query, off the event loop."""
+        return self.page_results([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        """``queryset`` narrowed to the requested page, plus one row to tell whether there is a next page."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.next_position = None
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            cursor_date, cursor_id = position
+            # date__lte bounds the index range; the OR only filters rows sharing the cursor's date
+            queryset = queryset.filter(date__lte=cursor_date).filter(
+                Q(date__lt=cursor_date) | Q(date=cursor_date, id__gt=cursor_id)
+            )
+        return queryset[:self.page_size + 1]
+
+    def page_results(self, results):
+        if len(results) > self.page_size:
+            results = results[:self.page_size]
+            self.next_position = self.get_position(results[-1])
+        return results
+
+    def get_position(self, row):
+        if isinstance(row, dict):
+            return row["date"], row["id"]
+        return row.date, row.pk
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE or 100
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            cursor_date, cursor_id = base64.urlsafe_b64decode(encoded.encode("ascii")).decode("ascii").split("|")
+            cursor_date, cursor_id = parse_date(cursor_date), int(cursor_id)
+        except (binascii.Error, UnicodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if cursor_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return cursor_date, cursor_id
+
+    def encode_cursor(self, position):
+        cursor_date, cursor_id = position
+        encoded = base64.urlsafe_b64encode(f"{cursor_date.isoformat()}|{cursor_id}".encode("ascii")).decode("ascii")
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {"next": self.get_next_link(), "results": data}
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -0,0 +1,123 @@
+"""Recurrence engine: posts every due occurrence of recurring Income and Expense rules."""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Income, Expense, RecurringTransaction, next_occurrence_after
+from .summary import invalidate_summary
+from . import rollups
+
+RECURRENCE_BATCH_SIZE = 1000
+
+# model, fields copied from a rule onto each occurrence, RecurringTransaction FK name
+RECURRING_MODELS = {
+    "income": (
+        Income,
+        ["user_id", "amount", "income_source", "category_id", "sub_category", "received_by", "description",
+         "attachments"],
+        "income",
+    ),
+    "expense": (
+        Expense,
+        ["user_id", "amount", "recipient", "category_id", "sub_category", "payment_method", "tags", "description",
+         "attachments"],
+        "expense",
+    ),
+}
+
+
+def due_rules(kind, today):
+    """Recurring rules of ``kind`` with at least one unposted occurrence on or before ``today``."""
+    model = RECURRING_MODELS[kind][0]
+    return model.objects.filter(is_recurring=True, next_occurrence__lte=today).filter(
+        Q(end_date__isnull=True) | Q(end_date__gte=F("next_occurrence"))
+    )
+
+
+def partition_due(kind, today, partition_size=None):
+    """
+    Split the due ``kind`` rules into inclusive ``(first_pk, last_pk)`` ranges of ``partition_size`` rules.
+
+    ``partition_size`` defaults to the RECURRENCE_PARTITION_SIZE setting.
+    """
+    partition_size = partition_size or settings.RECURRENCE_PARTITION_SIZE
+    partitions = []
+    first_pk = last_pk = None
+    count = 0
+    pks = due_rules(kind, today).order_by("pk").values_list("pk", flat=True)
+    for pk in pks.iterator(chunk_size=partition_size):
+        if first_pk is None:
+            first_pk = pk
+        last_pk = pk
+        count += 1
+        if count == partition_size:
+            partitions.append((first_pk, last_pk))
+            first_pk, count = None, 0
+    if first_pk is not None:
+        partitions.append((first_pk, last_pk))
+    return partitions
+
+
+def materialise_due(kind, today=None, pk_range=None, batch_size=RECURRENCE_BATCH_SIZE):
+    """
+    Post every missed occurrence of every due ``kind`` rule up to ``today``.
+
+    ``pk_range`` limits the run to rules whose primary key falls in an
+    inclusive ``(first_pk, last_pk)`` range, as produced by partition_due().
+
+    Rules are processed in primary-key chunks. Each chunk is locked with
+    ``SKIP LOCKED``, so concurrent runs never handle the same rule. Occurrences
+    already recorded in RecurringTransaction are not posted again, which makes
+    a re-run after a crash safe. Returns the number of occurrences created.
+    """
+    today = today or timezone.now().date()
+    queryset = due_rules(kind, today).order_by("pk")
+    if pk_range is not None:
+        queryset = queryset.filter(pk__range=pk_range)
+
+    created = 0
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(queryset.filter(pk__gt=last_pk).select_for_update(skip_locked=True)[:batch_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+            created += _materialise_chunk(kind, chunk, today)
+    return created
+
+
+def _materialise_chunk(kind, rules, today):
+    model, copied_fields, link_field = RECURRING_MODELS[kind]
+    posted = set(
+        RecurringTransaction.objects.filter(
+            **{f"{link_field}__in": rules, "date__gte": min(rule.next_occurrence for rule in rules)}
+        ).values_list(f"{link_field}_id", "date")
+    )
+
+    now = timezone.now()
+    occurrences = []
+    records = []
+    for rule in rules:
+        occurrence = rule.next_occurrence
+        while occurrence is not None and occurrence <= today and (rule.end_date is None or occurrence <= rule.end_date):
+            if (rule.pk, occurrence) not in posted:
+                occurrences.append(model(
+                    date=occurrence,
+                    is_recurring=False,
+                    **{field: getattr(rule, field) for field in copied_fields},
+                ))
+                records.append(RecurringTransaction(amount=rule.amount, date=occurrence, **{link_field: rule}))
+            occurrence = next_occurrence_after(occurrence, rule.recurrence_interval, anchor=rule.date)
+        rule.next_occurrence = occurrence
+        rule.updated_at = now
+
+    model.objects.bulk_create(occurrences)
+    rollups.record(kind, occurrences)
+    RecurringTransaction.objects.bulk_create(records)
+    model.objects.bulk_update(rules, ["next_occurrence", "updated_at"])
+    if occurrences:
+        user_ids = [occurrence.user_id for occurrence in occurrences]
+        transaction.on_commit(lambda: invalidate_summary(*user_ids))
+    return len(occurrences)
@@ -0,0 +1,63 @@
+"""Renderers for API responses and the ledger export formats.
+
+FastJSONRenderer is the default JSON renderer (see REST_FRAMEWORK in settings).
+
+LedgerExportAPIView streams its body itself. The export classes only let DRF's
+content negotiation pick the format from ``?format=`` or the Accept header.
+Error responses are still rendered through them, as JSON.
+"""
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from .instrumentation import timed
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up; the stock renderer is used without it
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson when it is installed.
+
+    The bytes match the stock renderer's compact, unescaped-unicode output.
+    Datetimes and dataclasses still go through DRF's encoder, since orjson's
+    own formats for them differ. Indented output and anything orjson refuses
+    (integers over 64 bits, for one) fall back to the stock renderer.
+    """
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS if orjson else 0
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed("render"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=self.options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped by JSONRenderer too: valid in JSON but not in JavaScript string literals
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
+
+
+class ExportRenderer(BaseRenderer):
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data).encode(self.charset)
+
+
+class CSVRenderer(ExportRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(ExportRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
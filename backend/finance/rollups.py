@@ -0,0 +1,116 @@
+"""Incremental maintenance of MonthlyRollup from Income and Expense writes."""
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Income, Expense, MonthlyRollup
+
+ROLLUP_MODELS = {"income": Income, "expense": Expense}
+UPSERT_BATCH_SIZE = 5000  # Buckets per statement, well under PostgreSQL's bind parameter limit
+
+UPSERT_SQL = """
+INSERT INTO finance_monthlyrollup (user_id, month, category_id, type, total, count)
+VALUES {values}
+ON CONFLICT (user_id, month, COALESCE(category_id, 0), type)
+DO UPDATE SET total = finance_monthlyrollup.total + EXCLUDED.total,
+              count = finance_monthlyrollup.count + EXCLUDED.count
+"""
+
+
+def month_of(value):
+    if isinstance(value, datetime):
+        value = value.date()
+    return value.replace(day=1)
+
+
+def record(rollup_type, rows, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) Income/Expense ``rows`` from their rollup buckets."""
+    deltas = defaultdict(lambda: [Decimal("0"), 0])
+    for row in rows:
+        key = (row.user_id, month_of(row.date), row.category_id, rollup_type)
+        deltas[key][0] += sign * Decimal(str(row.amount))
+        deltas[key][1] += sign
+    apply_deltas(deltas)
+
+
+def apply_deltas(deltas):
+    """Upsert ``{(user_id, month, category_id, type): [total, count]}`` increments, a few thousand buckets per statement."""
+    items = list(deltas.items())
+    for start in range(0, len(items), UPSERT_BATCH_SIZE):
+        chunk = items[start:start + UPSERT_BATCH_SIZE]
+        params = []
+        for (user_id, month, category_id, rollup_type), (total, count) in chunk:
+            params.extend([user_id, month, category_id, rollup_type, total, count])
+        values = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(chunk))
+        with connection.cursor() as cursor:
+            cursor.execute(UPSERT_SQL.format(values=values), params)
+
+    # Buckets emptied by deletes or edits carry no information
+    if any(count < 0 for _, count in deltas.values()):
+        MonthlyRollup.objects.filter(user_id__in={key[0] for key in deltas}, count=0).delete()
+
+
+def fold_category(category_id):
+    """Move a category's buckets into the uncategorised ones before the category is deleted."""
+    with transaction.atomic():
+        rollups = list(MonthlyRollup.objects.filter(category_id=category_id))
+        deltas = defaultdict(lambda: [Decimal("0"), 0])
+        for rollup in rollups:
+            key = (rollup.user_id, rollup.month, None, rollup.type)
+            deltas[key][0] += rollup.total
+            deltas[key][1] += rollup.count
+        MonthlyRollup.objects.filter(pk__in=[rollup.pk for rollup in rollups]).delete()
+        apply_deltas(deltas)
+
+
+def expected_rollups(user=None):
+    """Rollup buckets recomputed from the raw Income and Expense rows."""
+    expected = {}
+    for rollup_type, model in ROLLUP_MODELS.items():
+        queryset = model.objects.all() if user is None else model.objects.filter(user=user)
+        grouped = (
+            queryset.annotate(month=TruncMonth("date"))
+            .values("user_id", "month", "category_id")
+            .annotate(total=Sum("amount"), count=Count("id"))
+            .order_by()
+        )
+        for row in grouped.iterator():
+            key = (row["user_id"], row["month"], row["category_id"], rollup_type)
+            expected[key] = (row["total"], row["count"])
+    return expected
+
+
+def rebuild(user=None, batch_size=5000):
+    """Replace the rollup table (or one user's part of it) with freshly computed buckets."""
+    expected = expected_rollups(user)
+    with transaction.atomic():
+        existing = MonthlyRollup.objects.all() if user is None else MonthlyRollup.objects.filter(user=user)
+        existing.delete()
+        MonthlyRollup.objects.bulk_create(
+            (
+                MonthlyRollup(user_id=user_id, month=month, category_id=category_id, type=rollup_type,
+                              total=total, count=count)
+                for (user_id, month, category_id, rollup_type), (total, count) in expected.items()
+            ),
+            batch_size=batch_size,
+        )
+    return len(expected)
+
+
+def verify(user=None):
+    """Return ``(key, expected, actual)`` for every bucket that disagrees with the raw rows."""
+    expected = expected_rollups(user)
+    existing = MonthlyRollup.objects.all() if user is None else MonthlyRollup.objects.filter(user=user)
+    actual = {
+        (r["user_id"], r["month"], r["category_id"], r["type"]): (r["total"], r["count"])
+        for r in existing.values("user_id", "month", "category_id", "type", "total", "count").iterator()
+    }
+    return [
+        (key, expected.get(key), actual.get(key))
+        for key in expected.keys() | actual.keys()
+        if expected.get(key) != actual.get(key)
+    ]
@@ -1,7 +1,13 @@
+from django.db import transaction
+from django.utils import timezone
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
 from djoser.serializers import UserCreateSerializer
-from .models import Income, Expense, Category, Budget, Transaction
+from .models import Income, Expense, Category, Budget, Transaction, ImportJob, schedule_next_occurrence
+from .summary import invalidate_summary
+from . import categories, instrumentation, rollups
+
+BULK_MAX_ITEMS = 1000
 
 
 User = get_user_model()
@@ -25,11 +31,142 @@ class CreateUserSerializer(UserCreateSerializer):
         return user
 
 
-class IncomeSerializer(serializers.ModelSerializer):
+class CachedCategoryField(serializers.PrimaryKeyRelatedField):
+    """Category foreign key validated against the cached catalogue instead of a query per write."""
+
+    def __init__(self, category_type=None, **kwargs):
+        self.category_type = category_type
+        kwargs.setdefault("queryset", Category.objects.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        category = categories.from_context(self.context).get(pk, self.category_type)
+        if category is None:
+            self.fail("does_not_exist", pk_value=data)
+        return category
+
+
+class TimedRepresentationMixin:
+    """Counts output serialization towards the request's ``serialize`` time (see finance.instrumentation)."""
+
+    def to_representation(self, instance):
+        with instrumentation.timed("serialize"):
+            return super().to_representation(instance)
+
+
+class CategoryNameMixin:
+    def get_category_name(self, obj):
+        if obj.category_id is None:
+            return None
+        category = categories.from_context(self.context).get(obj.category_id)
+        # Fall back to the row's own relation for a category newer than the catalogue
+        return category.name if category else obj.category.name
+
+
+class RollupSerializerMixin:
+    """Keeps MonthlyRollup in step with rows created or edited through the serializer."""
+    rollup_type = None
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            instance = super().create(validated_data)
+            rollups.record(self.rollup_type, [instance])
+        return instance
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            rollups.record(self.rollup_type, [instance], sign=-1)
+            instance = super().update(instance, validated_data)
+            rollups.record(self.rollup_type, [instance])
+        return instance
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """
+    Writes a validated batch of Income/Expense rows with one bulk_create or bulk_update.
+
+    For updates, ``instance`` is the list of rows the items may target and
+    every item carries the ``id`` of one of them. Validation errors come back
+    as a list aligned with the input, and nothing is written unless every
+    item is valid.
+    """
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("max_length", BULK_MAX_ITEMS)
+        super().__init__(*args, **kwargs)
+        self.matched = []
+
+    def run_child_validation(self, data):
+        if self.instance is not None:
+            self.child.instance = self.match_instance(data)
+            self.child.initial_data = data
+        return super().run_child_validation(data)
+
+    def match_instance(self, data):
+        if not hasattr(self, "_instances_by_id"):
+            self._instances_by_id = {instance.pk: instance for instance in self.instance}
+        try:
+            instance = self._instances_by_id.get(int(data.get("id")))
+        except (AttributeError, TypeError, ValueError):
+            instance = None
+        if instance is None:
+            raise serializers.ValidationError({"id": ["Not found."]})
+        if any(matched is instance for matched in self.matched):
+            raise serializers.ValidationError({"id": ["Duplicate id in this batch."]})
+        self.matched.append(instance)
+        return instance
+
+    def create(self, validated_data):
+        model = self.child.Meta.model
+        rows = [model(**attrs) for attrs in validated_data]
+        for row in rows:
+            schedule_next_occurrence(row)
+        with transaction.atomic():
+            model.objects.bulk_create(rows)
+            rollups.record(self.child.rollup_type, rows)
+            self.clear_summaries(rows)
+        return rows
+
+    def update(self, instances, validated_data):
+        model = self.child.Meta.model
+        rows = self.matched
+        fields = {"next_occurrence", "updated_at"}
+        now = timezone.now()
+        with transaction.atomic():
+            rollups.record(self.child.rollup_type, rows, sign=-1)
+            for row, attrs in zip(rows, validated_data):
+                for attr, value in attrs.items():
+                    setattr(row, attr, value)
+                    fields.add(attr)
+                schedule_next_occurrence(row)
+                # bulk_update bypasses auto_now, and /sync/ relies on updated_at
+                row.updated_at = now
+            model.objects.bulk_update(rows, sorted(fields))
+            rollups.record(self.child.rollup_type, rows)
+            self.clear_summaries(rows)
+        return rows
+
+    def clear_summaries(self, rows):
+        user_ids = {row.user_id for row in rows}
+        transaction.on_commit(lambda: invalidate_summary(*user_ids))
+
+
+class IncomeSerializer(
+    CategoryNameMixin, RollupSerializerMixin, TimedRepresentationMixin, serializers.ModelSerializer
+):
+    category = CachedCategoryField(category_type="income", allow_null=True, required=False)
     category_name = serializers.SerializerMethodField()
+    rollup_type = "income"
 
     class Meta:
         model = Income
+        list_serializer_class = BulkListSerializer
         fields = [
             "id",
             "user",
@@ -46,16 +183,17 @@ class IncomeSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "user", "created_at", "updated_at", "next_occurrence"]
 
-    def get_category_name(self, obj):
-        # Fetching the category name using the related category ID
-        return obj.category.name if obj.category else None
-
 
-class ExpenseSerializer(serializers.ModelSerializer):
+class ExpenseSerializer(
+    CategoryNameMixin, RollupSerializerMixin, TimedRepresentationMixin, serializers.ModelSerializer
+):
+    category = CachedCategoryField(category_type="expense", allow_null=True, required=False)
     category_name = serializers.SerializerMethodField()
+    rollup_type = "expense"
 
     class Meta:
         model = Expense
+        list_serializer_class = BulkListSerializer
         fields = [
             "id",
             "user",
@@ -72,24 +210,27 @@ class ExpenseSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["id", "user", "created_at", "updated_at", "next_occurrence"]
 
-    def get_category_name(self, obj):
-        # Fetching the category name using the related category ID
-        return obj.category.name if obj.category else None
-
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(TimedRepresentationMixin, serializers.ModelSerializer):
     class Meta:
         model = Category
         fields = ["id", "name", "type"]
 
 
-class BudgetSerializer(serializers.ModelSerializer):
+class BudgetSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    category = CachedCategoryField()
+    # Annotated by finance.budgets.with_utilisation()
+    spent = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    remaining = serializers.DecimalField(max_digits=14, decimal_places=2, read_only=True)
+    pct_used = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True, allow_null=True)
+
     class Meta:
         model = Budget
-        fields = ["id", "user", "category", "amount", "date_from", "date_to"]
+        fields = ["id", "user", "category", "amount", "date_from", "date_to", "spent", "remaining", "pct_used"]
 
 
-class TransactionSerializer(serializers.ModelSerializer):
+class TransactionSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    category = CachedCategoryField()
     class Meta:
         model = Transaction
         fields = [
@@ -103,9 +244,35 @@ class TransactionSerializer(serializers.ModelSerializer):
         ]
 
 
-class GPayTransactionUploadSerializer(serializers.Serializer):
+class TransactionUploadSerializer(serializers.Serializer):
     file = serializers.FileField()
+    format = serializers.ChoiceField(choices=ImportJob.FORMAT_CHOICES, default="gpay")
     start_date = serializers.DateField()
     end_date = serializers.DateField()
     exclude_gt = serializers.IntegerField(required=False)
-    exclude_lt = serializers.IntegerField(required=False)
\ No newline at end of file
+    exclude_lt = serializers.IntegerField(required=False)
+
+
+class ImportJobSerializer(TimedRepresentationMixin, serializers.ModelSerializer):
+    class Meta:
+        model = ImportJob
+        fields = [
+            "id",
+            "format",
+            "status",
+            "start_date",
+            "end_date",
+            "exclude_gt",
+            "exclude_lt",
+            "rows_scanned",
+            "rows_inserted",
+            "rows_duplicate",
+            "rows_filtered",
+            "rows_skipped",
+            "shards",
+            "error",
+            "created_at",
+            "started_at",
+            "finished_at",
+        ]
+        read_only_fields = fields
@@ -0,0 +1,61 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import User, Income, Expense, Category
+from .summary import invalidate_summary
+from .sync import record_tombstones
+from . import categories, rollups
+
+_bulk_write = ContextVar("finance_bulk_write", default=False)
+
+
+@contextmanager
+def bulk_write():
+    """Mute the per-row Income/Expense receivers; the caller writes tombstones and clears the summary once."""
+    token = _bulk_write.set(True)
+    try:
+        yield
+    finally:
+        _bulk_write.reset(token)
+
+
+@receiver([post_save, post_delete], sender=Income)
+@receiver([post_save, post_delete], sender=Expense)
+def clear_cached_summary(sender, instance, **kwargs):
+    if _bulk_write.get():
+        return
+    # Bump the generation only once the write is visible, so a reader that sees the new one queries the new totals
+    transaction.on_commit(lambda: invalidate_summary(instance.user_id))
+
+
+@receiver(post_delete, sender=Income)
+@receiver(post_delete, sender=Expense)
+def record_tombstone(sender, instance, origin=None, **kwargs):
+    if _bulk_write.get():
+        return
+    # A deleted account takes its tombstones with it; nothing is left to sync
+    if isinstance(origin, User) or (isinstance(origin, QuerySet) and origin.model is User):
+        return
+    record_tombstones(sender._meta.model_name, [instance])
+
+
+@receiver(pre_delete, sender=Category)
+def fold_category_rollups(sender, instance, **kwargs):
+    # Income/Expense rows fall back to no category (SET_NULL); their rollup buckets must follow
+    rollups.fold_category(instance.pk)
+    # SET_NULL is a queryset update, which skips auto_now; touch the rows so /sync/ resends them
+    now = timezone.now()
+    Income.objects.filter(category_id=instance.pk).update(updated_at=now)
+    Expense.objects.filter(category_id=instance.pk).update(updated_at=now)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def refresh_category_catalogue(sender, **kwargs):
+    # Bumped after commit so no process can cache the old rows under the new version
+    transaction.on_commit(categories.bump_version)
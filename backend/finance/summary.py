@@ -0,0 +1,152 @@
+"""Per-user income/expense totals for the dashboard, cached in Redis."""
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Sum, Value
+from django.db.models.functions import TruncMonth
+
+from .categories import aget_catalogue, get_catalogue
+from .models import Income, Expense
+
+# A write bumps the user's generation and a Category write the catalogue version; either moves readers to a new
+# key, and whatever a reader that started earlier caches under the old one is never read again
+SUMMARY_CACHE_KEY = "finance:summary:{user_id}:{generation}:{catalogue}"
+SUMMARY_GENERATION_KEY = "finance:summary:{user_id}:generation"
+SUMMARY_CACHE_RANGES = 8  # Date ranges kept per user before the oldest is evicted
+ZERO = Decimal("0.00")  # Two places, so empty totals serialise like the others
+
+
+def _grouped(model, kind, user, start_date, end_date):
+    return (
+        model.objects.filter(user=user, date__range=(start_date, end_date))
+        .annotate(kind=Value(kind, output_field=CharField()), month=TruncMonth("date"))
+        .values("kind", "month", "category_id", "category__name", "category__classification")
+        .annotate(total=Sum("amount"))
+        .order_by()
+    )
+
+
+def summary_rows(user, start_date, end_date):
+    """A single grouped UNION ALL query over incomes and expenses."""
+    return _grouped(Income, "income", user, start_date, end_date).union(
+        _grouped(Expense, "expense", user, start_date, end_date), all=True
+    )
+
+
+def build_summary(user, start_date, end_date):
+    """Totals by month, category and classification."""
+    return summarise(summary_rows(user, start_date, end_date), start_date, end_date)
+
+
+def summarise(rows, start_date, end_date):
+    totals = {"income": ZERO, "expense": ZERO}
+    by_month = {}
+    by_category = {}
+    by_classification = {}
+    for row in rows:
+        kind, total = row["kind"], row["total"]
+        totals[kind] += total
+
+        month = by_month.setdefault(row["month"], {"income": ZERO, "expense": ZERO})
+        month[kind] += total
+
+        category = by_category.setdefault((kind, row["category_id"]), {
+            "category": row["category_id"],
+            "category_name": row["category__name"],
+            "classification": row["category__classification"],
+            "type": kind,
+            "total": ZERO,
+        })
+        category["total"] += total
+
+        if row["category__classification"]:
+            by_classification[row["category__classification"]] = (
+                by_classification.get(row["category__classification"], ZERO) + total
+            )
+
+    return {
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "totals": {
+            "income": str(totals["income"]),
+            "expense": str(totals["expense"]),
+            "net": str(totals["income"] - totals["expense"]),
+        },
+        "by_month": [
+            {"month": month.strftime("%Y-%m"), "income": str(values["income"]), "expense": str(values["expense"])}
+            for month, values in sorted(by_month.items())
+        ],
+        "by_category": [
+            dict(category, total=str(category["total"]))
+            for category in sorted(by_category.values(), key=lambda c: c["total"], reverse=True)
+        ],
+        "by_classification": {key: str(value) for key, value in sorted(by_classification.items())},
+    }
+
+
+def get_summary(user, start_date, end_date):
+    """Cached build_summary(); all of a user's cached ranges live under one key so a write retires them at once."""
+    key = SUMMARY_CACHE_KEY.format(
+        user_id=user.pk, generation=_generation(user.pk), catalogue=get_catalogue().version
+    )
+    range_key = f"{start_date.isoformat()}:{end_date.isoformat()}"
+    cached = cache.get(key) or {}
+    if range_key in cached:
+        return cached[range_key]
+
+    summary = build_summary(user, start_date, end_date)
+    cache.set(key, _add_range(cached, range_key, summary), settings.SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+async def aget_summary(user, start_date, end_date):
+    """get_summary() for async views, through the async cache and ORM APIs."""
+    key = SUMMARY_CACHE_KEY.format(
+        user_id=user.pk, generation=await _ageneration(user.pk), catalogue=(await aget_catalogue()).version
+    )
+    range_key = f"{start_date.isoformat()}:{end_date.isoformat()}"
+    cached = await cache.aget(key) or {}
+    if range_key in cached:
+        return cached[range_key]
+
+    rows = [row async for row in summary_rows(user, start_date, end_date)]
+    summary = summarise(rows, start_date, end_date)
+    await cache.aset(key, _add_range(cached, range_key, summary), settings.SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+def _add_range(cached, range_key, summary):
+    cached[range_key] = summary
+    while len(cached) > SUMMARY_CACHE_RANGES:
+        cached.pop(next(iter(cached)))
+    return cached
+
+
+def _generation(user_id):
+    key = SUMMARY_GENERATION_KEY.format(user_id=user_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Never set or evicted; a time_ns() start cannot land on a generation used before
+        cache.add(key, time.time_ns(), timeout=None)
+        generation = cache.get(key)
+    return generation
+
+
+async def _ageneration(user_id):
+    key = SUMMARY_GENERATION_KEY.format(user_id=user_id)
+    generation = await cache.aget(key)
+    if generation is None:
+        await cache.aadd(key, time.time_ns(), timeout=None)
+        generation = await cache.aget(key)
+    return generation
+
+
+def invalidate_summary(*user_ids):
+    """Retire the users' cached summaries; call it once the write has committed."""
+    for user_id in set(user_ids):
+        try:
+            cache.incr(SUMMARY_GENERATION_KEY.format(user_id=user_id))
+        except ValueError:
+            pass  # No generation yet; the next reader starts a fresh one
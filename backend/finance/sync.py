@@ -0,0 +1,142 @@
+"""Delta sync of a user's incomes and expenses from an opaque ``since`` token."""
+import base64
+import binascii
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Income, Expense, Tombstone
+from .pagination import DateIdCursorPagination
+
+SYNC_MODELS = {"income": Income, "expense": Expense}
+TOKEN_PREFIX = "v1:"
+SYNC_MAX_PAGE_SIZE = DateIdCursorPagination.max_page_size
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+class InvalidToken(ValueError):
+    pass
+
+
+class ExpiredToken(InvalidToken):
+    pass
+
+
+def encode_token(moment, started=None, positions=None):
+    """
+    A plain token holds the time to sync from. A continuation token also holds when the
+    paged sync started and the last (updated_at, id) sent of each kind; ``moment`` is
+    None for an initial sync.
+    """
+    parts = ["" if moment is None else str(_micros(moment))]
+    if started is not None:
+        parts.append(str(_micros(started)))
+        for kind in SYNC_MODELS:
+            position = positions.get(kind)
+            parts.append("" if position is None else f"{_micros(position[0])}.{position[1]}")
+    return base64.urlsafe_b64encode((TOKEN_PREFIX + ":".join(parts)).encode("ascii")).decode("ascii")
+
+
+def decode_token(token):
+    """Return ``(since, started, positions)``; ``started`` is None and ``positions`` empty for a plain token."""
+    try:
+        raw = base64.urlsafe_b64decode(token.encode("ascii")).decode("ascii")
+        if not raw.startswith(TOKEN_PREFIX):
+            raise InvalidToken(token)
+        parts = raw[len(TOKEN_PREFIX):].split(":")
+        if len(parts) == 1:
+            return _moment(parts[0]), None, {}
+        if len(parts) != 2 + len(SYNC_MODELS):
+            raise InvalidToken(token)
+        since = _moment(parts[0]) if parts[0] else None
+        positions = {}
+        for kind, position in zip(SYNC_MODELS, parts[2:]):
+            if position:
+                micros, pk = position.split(".")
+                positions[kind] = _moment(micros), int(pk)
+        return since, _moment(parts[1]), positions
+    except (binascii.Error, UnicodeError, ValueError, OverflowError, OSError):
+        raise InvalidToken(token)
+
+
+def _micros(moment):
+    # Exact integer arithmetic: positions are compared with updated_at for equality
+    return (moment - EPOCH) // timedelta(microseconds=1)
+
+
+def _moment(micros):
+    return EPOCH + timedelta(microseconds=int(micros))
+
+
+def changes_since(user, token=None, page_size=SYNC_MAX_PAGE_SIZE):
+    """
+    Rows of ``user`` created, updated or deleted since ``token`` (everything when it is None).
+
+    Each kind is read in ``(updated_at, id)`` order, at most ``page_size`` rows
+    per call. When either kind has more, ``has_more`` is True and the returned
+    token continues after the last row sent; rows written after the sync
+    started are left for the next sync, so the paging always ends. Deletions
+    are returned with the first page.
+
+    The token returned with the last page is the start of the sync moved back
+    by SYNC_OVERLAP_SECONDS. A write whose transaction commits after that read
+    still has an ``updated_at`` inside the overlap, so the next call returns
+    it. Clients must therefore apply changes idempotently. A token older than
+    the tombstone retention raises ExpiredToken, because deletions before the
+    cutoff may have been pruned.
+    """
+    now = timezone.now()
+    since, started, positions = None, None, {}
+    if token is not None:
+        since, started, positions = decode_token(token)
+        if since is not None and since < now - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS):
+            raise ExpiredToken(token)
+    first_page = started is None
+    started = started or now
+    page_size = min(page_size, SYNC_MAX_PAGE_SIZE)
+
+    changed, has_more = {}, False
+    for kind, model in SYNC_MODELS.items():
+        queryset = model.objects.filter(user=user, updated_at__lte=started)
+        if since is not None:
+            queryset = queryset.filter(updated_at__gt=since)
+        if kind in positions:
+            updated_at, pk = positions[kind]
+            # updated_at__gte bounds the index range; the OR only filters rows sharing the position's time
+            queryset = queryset.filter(updated_at__gte=updated_at).filter(
+                Q(updated_at__gt=updated_at) | Q(updated_at=updated_at, id__gt=pk)
+            )
+        rows = list(queryset.order_by("updated_at", "id")[:page_size + 1])
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            has_more = True
+        if rows:
+            positions[kind] = rows[-1].updated_at, rows[-1].pk
+        changed[kind] = rows
+
+    deleted = {kind: [] for kind in SYNC_MODELS}
+    if since is not None and first_page:
+        tombstones = Tombstone.objects.filter(user=user, deleted_at__gt=since).order_by("deleted_at")
+        for kind, object_id in tombstones.values_list("model", "object_id"):
+            deleted[kind].append(object_id)
+
+    if has_more:
+        next_token = encode_token(since, started, positions)
+    else:
+        next_token = encode_token(started - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS))
+    return changed, deleted, next_token, has_more
+
+
+def record_tombstones(kind, rows):
+    """Insert one Tombstone per deleted ``kind`` row in ``rows``."""
+    Tombstone.objects.bulk_create(
+        Tombstone(user_id=row.user_id, model=kind, object_id=row.pk) for row in rows
+    )
+
+
+def prune_tombstones(now=None):
+    cutoff = (now or timezone.now()) - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    deleted, _ = Tombstone.objects.filter(deleted_at__lt=cutoff).delete()
+    return deleted
@@ -0,0 +1,247 @@
+"""
+Reproducible synthetic users, ledgers and GPay Takeout exports for benchmarks.
+
+Everything is drawn from one ``random.Random(seed)``, so the same arguments
+always produce the same data relative to ``end_date``. Rows are loaded with
+COPY rather than the ORM, which keeps tens of millions of rows practical;
+rollups are rebuilt afterwards, since COPY bypasses them.
+"""
+import random
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+
+from . import categories, rollups
+from .importers.gpay import CONTENT_CELL_CLASS, OUTER_CELL_CLASS
+from .models import Category, Expense, Income, Transaction, User
+
+SYNTHETIC_EMAIL_DOMAIN = "synthetic.goalcrest.invalid"
+
+# name, classification, median amount, relative frequency
+INCOME_CATEGORIES = [
+    ("Salary", "income", 85000, 4),
+    ("Freelance", "income", 15000, 2),
+    ("Interest", "income", 900, 2),
+    ("Refunds", "income", 1200, 1),
+]
+EXPENSE_CATEGORIES = [
+    ("Rent", "need", 22000, 1),
+    ("Groceries", "need", 1400, 8),
+    ("Utilities", "need", 1800, 2),
+    ("Transport", "need", 250, 10),
+    ("Dining", "want", 650, 6),
+    ("Shopping", "want", 2200, 4),
+    ("Entertainment", "want", 500, 3),
+    ("Travel", "want", 9000, 1),
+    ("Investments", "saving", 10000, 1),
+]
+PAYMENT_METHODS = ["upi", "card", "cash", "netbanking"]
+RECIPIENTS = [f"Shop {n}" for n in range(1, 200)]
+INTERVALS = ["weekly", "monthly", "monthly", "monthly", "yearly"]
+
+# Shares of the requested row count
+ROW_SPLIT = {"expense": 0.6, "transaction": 0.3, "income": 0.1}
+RECURRING_FRACTION = 0.02
+MAX_AMOUNT = Decimal("99999999.99")  # max_digits=10, decimal_places=2
+
+
+def ensure_categories():
+    """The synthetic category set, created where missing; returns ``{type: [(category, median, weight)]}``."""
+    catalogue = {"income": [], "expense": []}
+    for category_type, specs in (("income", INCOME_CATEGORIES), ("expense", EXPENSE_CATEGORIES)):
+        for name, classification, median, weight in specs:
+            category, _ = Category.objects.get_or_create(
+                name=name, type=category_type, defaults={"classification": classification}
+            )
+            catalogue[category_type].append((category, median, weight))
+    return catalogue
+
+
+def clear():
+    """Delete every synthetic user and, through the cascade, their rows and rollups."""
+    deleted, _ = User.objects.filter(email__endswith=f"@{SYNTHETIC_EMAIL_DOMAIN}").delete()
+    return deleted
+
+
+def user_shares(rng, users, total):
+    """Split ``total`` rows across ``users`` with a heavy tail, as real usage is."""
+    weights = [rng.paretovariate(1.5) for _ in users]
+    scale = total / sum(weights)
+    counts = [int(weight * scale) for weight in weights]
+    counts[0] += total - sum(counts)
+    return counts
+
+
+def _amount(rng, median):
+    return min(Decimal(str(round(median * rng.lognormvariate(0, 0.6), 2))), MAX_AMOUNT)
+
+
+def _timestamp(day, rng):
+    return datetime.combine(day, time(rng.randrange(24), rng.randrange(60)), tzinfo=dt_timezone.utc)
+
+
+def _pick(rng, weighted):
+    return rng.choices(weighted, weights=[weight for _, _, weight in weighted])[0]
+
+
+def income_rows(rng, user, count, catalogue, start_date, end_date):
+    span = (end_date - start_date).days
+    for _ in range(count):
+        category, median, _ = _pick(rng, catalogue["income"])
+        day = start_date + timedelta(days=rng.randrange(span + 1))
+        recurring = rng.random() < RECURRING_FRACTION
+        stamp = _timestamp(day, rng)
+        yield (
+            user.pk, _amount(rng, median), category.name, day, recurring,
+            rng.choice(INTERVALS) if recurring else None,
+            category.pk, None, "Synthetic income",
+            # Due within the last month, so the recurrence job has work to do
+            end_date - timedelta(days=rng.randrange(30)) if recurring else None,
+            stamp, stamp,
+        )
+
+
+INCOME_COLUMNS = [
+    "user", "amount", "income_source", "date", "is_recurring", "recurrence_interval", "category", "received_by",
+    "description", "next_occurrence", "created_at", "updated_at",
+]
+
+
+def expense_rows(rng, user, count, catalogue, start_date, end_date):
+    span = (end_date - start_date).days
+    for _ in range(count):
+        category, median, _ = _pick(rng, catalogue["expense"])
+        day = start_date + timedelta(days=rng.randrange(span + 1))
+        recurring = rng.random() < RECURRING_FRACTION
+        stamp = _timestamp(day, rng)
+        yield (
+            user.pk, _amount(rng, median), rng.choice(RECIPIENTS), day, recurring,
+            rng.choice(INTERVALS) if recurring else None,
+            category.pk, rng.choice(PAYMENT_METHODS), None, "Synthetic expense",
+            end_date - timedelta(days=rng.randrange(30)) if recurring else None,
+            stamp, stamp,
+        )
+
+
+EXPENSE_COLUMNS = [
+    "user", "amount", "recipient", "date", "is_recurring", "recurrence_interval", "category", "payment_method",
+    "tags", "description", "next_occurrence", "created_at", "updated_at",
+]
+
+
+def transaction_rows(rng, user, count, catalogue, start_date, end_date):
+    span = (end_date - start_date).days
+    for _ in range(count):
+        transaction_type = "income" if rng.random() < 0.15 else "expense"
+        category, median, _ = _pick(rng, catalogue[transaction_type])
+        day = start_date + timedelta(days=rng.randrange(span + 1))
+        stamp = _timestamp(day, rng)
+        yield (
+            user.pk, transaction_type, category.pk, _amount(rng, median), day,
+            f"Synthetic {transaction_type}", stamp, stamp,
+        )
+
+
+TRANSACTION_COLUMNS = ["user", "transaction_type", "category", "amount", "date", "description", "created_at",
+                       "updated_at"]
+
+LEDGERS = {
+    "income": (Income, INCOME_COLUMNS, income_rows),
+    "expense": (Expense, EXPENSE_COLUMNS, expense_rows),
+    "transaction": (Transaction, TRANSACTION_COLUMNS, transaction_rows),
+}
+
+
+def copy_rows(model, columns, rows):
+    """Stream ``rows`` (tuples in ``columns`` order) into ``model``'s table with COPY."""
+    quote = connection.ops.quote_name
+    fields = ", ".join(quote(model._meta.get_field(name).column) for name in columns)
+    with connection.cursor() as cursor:
+        with cursor.copy(f"COPY {quote(model._meta.db_table)} ({fields}) FROM STDIN") as copy:
+            for row in rows:
+                copy.write_row(row)
+
+
+def generate(users, rows, seed=0, years=3, end_date=None, progress=None, analyze=True):
+    """
+    Create ``users`` synthetic users sharing about ``rows`` Income, Expense and Transaction rows.
+
+    Returns ``{"users": n, "income": n, "expense": n, "transaction": n}``.
+    ``progress``, if given, is called with a message after each user.
+    ``analyze=False`` skips refreshing the planner statistics, whose row
+    estimates would outlive a test's rollback and sway other tests' plans.
+    Raises ValueError, before writing anything, when users from ``seed``
+    already exist, since their emails would collide.
+    """
+    existing = User.objects.filter(email__startswith=f"user{seed}-", email__endswith=f"@{SYNTHETIC_EMAIL_DOMAIN}")
+    if existing.exists():
+        raise ValueError(f"Synthetic users for seed {seed} already exist; clear them first or use another seed")
+
+    rng = random.Random(seed)
+    end_date = end_date or datetime.now(dt_timezone.utc).date()
+    start_date = end_date - timedelta(days=365 * years)
+    catalogue = ensure_categories()
+
+    created_users = [
+        User(first_name="Synthetic", last_name=f"User {n}", email=f"user{seed}-{n}@{SYNTHETIC_EMAIL_DOMAIN}",
+             is_active=True)
+        for n in range(users)
+    ]
+    User.objects.bulk_create(created_users)
+    shares = {kind: user_shares(rng, created_users, int(rows * split)) for kind, split in ROW_SPLIT.items()}
+
+    totals = {"users": users, **{kind: 0 for kind in LEDGERS}}
+    for index, user in enumerate(created_users):
+        with transaction.atomic():
+            for kind, (model, columns, make_rows) in LEDGERS.items():
+                count = shares[kind][index]
+                copy_rows(model, columns, make_rows(rng, user, count, catalogue, start_date, end_date))
+                totals[kind] += count
+            rollups.rebuild(user)
+        if progress:
+            progress(f"{user.email}: {', '.join(f'{shares[kind][index]} {kind}' for kind in LEDGERS)}")
+
+    if analyze:
+        with connection.cursor() as cursor:
+            # Fresh planner statistics, so benchmarks see the plans production would
+            for model, _, _ in LEDGERS.values():
+                cursor.execute(f"ANALYZE {connection.ops.quote_name(model._meta.db_table)}")
+    categories.bump_version()
+    return totals
+
+
+def _activity(rng, moment):
+    amount = f"{_amount(rng, 900):,.2f}"
+    roll = rng.random()
+    if roll < 0.55:
+        text = f"Paid ₹{amount} to {rng.choice(RECIPIENTS)} using Bank Account XXXXXX1234"
+    elif roll < 0.75:
+        text = f"Received ₹{amount}"
+    elif roll < 0.9:
+        text = f"Sent ₹{amount}"
+    else:
+        text = f"Used Google Pay for ₹{amount}"
+    # Takeout spells September "Sept"
+    stamp = f"{moment.day} {moment.strftime('%b').replace('Sep', 'Sept')} {moment:%Y, %H:%M:%S} IST"
+    return (
+        f'<div class="{OUTER_CELL_CLASS}"><div class="mdl-grid">'
+        '<div class="header-cell mdl-cell mdl-cell--12-col"><p class="mdl-typography--title">Google Pay<br></p></div>'
+        f'<div class="{CONTENT_CELL_CLASS}">{text}<br>{stamp}<br></div>'
+        '<div class="content-cell mdl-cell mdl-cell--12-col mdl-typography--caption"><b>Products:</b><br>'
+        '&emsp;Google Pay<br><b>Details:</b><br>&emsp;Completed<br></div></div></div>'
+    )
+
+
+def write_gpay_export(path, activities, seed=0, years=3, end_date=None):
+    """Write a Takeout-style "My Activity" HTML file with ``activities`` Google Pay entries, newest first."""
+    rng = random.Random(seed)
+    moment = datetime.combine(end_date or datetime.now(dt_timezone.utc).date(), time(23, 59, 59))
+    # Random gaps averaging out to ``years`` of history, generated in order so nothing has to be sorted
+    mean_gap = 365 * years * 86400 / max(activities, 1)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('<html><head><meta charset="utf-8"><title>My Activity</title></head><body><div class="mdl-grid">')
+        for _ in range(activities):
+            f.write(_activity(rng, moment))
+            moment -= timedelta(seconds=rng.expovariate(1 / mean_gap))
+        f.write("</div></body></html>")
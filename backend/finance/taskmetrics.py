@@ -0,0 +1,205 @@
+"""
+Celery task metrics kept in Redis and exported in the Prometheus text format.
+
+Signal handlers record, per task name: queue latency (from publish, or from
+the ETA for delayed tasks, to the start of the run), run time, runs by final
+state (SUCCESS, FAILURE, RETRY) and the rows a task reports through
+add_rows(). Every worker process writes to the same Redis hashes, so one
+scrape covers the whole pool. The worker's main process serves them over HTTP
+when TASK_METRICS_PORT is set.
+
+Latency compares wall clocks of the publishing and the executing host, so
+those clocks must be synchronised for it to mean anything.
+"""
+import logging
+import threading
+import time
+from datetime import datetime
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import redis
+from celery import current_task
+from celery.signals import before_task_publish, task_postrun, task_prerun, worker_ready
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+TASKS_KEY = "finance:taskmetrics:tasks"
+TASK_KEY = "finance:taskmetrics:task:{name}"
+ENQUEUED_HEADER = "enqueued_at"
+
+# Upper bounds in seconds; the "+Inf" bucket is implied
+HISTOGRAMS = {
+    "runtime": [0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900],
+    "latency": [0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300],
+}
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@lru_cache(maxsize=None)
+def _client():
+    # Created on first use, so each forked worker child opens its own connection
+    return redis.Redis.from_url(settings.TASK_METRICS_REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+
+
+def add_rows(count):
+    """Count ``count`` rows (imported, posted, emailed...) towards the running task's throughput."""
+    task = current_task
+    if task is not None and task.request.id is not None:
+        task.request.rows_processed = (getattr(task.request, "rows_processed", None) or 0) + count
+
+
+def _bucket(name, value):
+    for bound in HISTOGRAMS[name]:
+        if value <= bound:
+            return f"{name}_bucket:{bound}"
+    return f"{name}_bucket:+Inf"
+
+
+def record(task_name, state, runtime=None, latency=None, rows=0):
+    """Add one finished run to ``task_name``'s counters in a single round trip."""
+    key = TASK_KEY.format(name=task_name)
+    pipe = _client().pipeline(transaction=False)
+    pipe.sadd(TASKS_KEY, task_name)
+    pipe.hincrby(key, f"runs:{state}", 1)
+    for name, value in (("runtime", runtime), ("latency", latency)):
+        if value is not None:
+            pipe.hincrby(key, f"{name}_count", 1)
+            pipe.hincrbyfloat(key, f"{name}_sum", value)
+            pipe.hincrby(key, _bucket(name, value), 1)
+    if rows:
+        pipe.hincrby(key, "rows", rows)
+    pipe.execute()
+
+
+def snapshot():
+    """``{task name: {field: value}}`` as stored in Redis."""
+    client = _client()
+    names = sorted(name.decode() for name in client.smembers(TASKS_KEY))
+    pipe = client.pipeline(transaction=False)
+    for name in names:
+        pipe.hgetall(TASK_KEY.format(name=name))
+    return {
+        name: {field.decode(): float(value) for field, value in fields.items()}
+        for name, fields in zip(names, pipe.execute())
+    }
+
+
+def reset():
+    client = _client()
+    names = [name.decode() for name in client.smembers(TASKS_KEY)]
+    client.delete(TASKS_KEY, *[TASK_KEY.format(name=name) for name in names])
+
+
+def _number(value):
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_prometheus(metrics):
+    """The Prometheus text exposition of a snapshot() result."""
+    lines = [
+        "# HELP celery_task_runs_total Finished task runs by final state.",
+        "# TYPE celery_task_runs_total counter",
+    ]
+    for task, fields in metrics.items():
+        for field, value in sorted(fields.items()):
+            if field.startswith("runs:"):
+                lines.append(f'celery_task_runs_total{{task="{task}",state="{field[5:]}"}} {_number(value)}')
+
+    lines += [
+        "# HELP celery_task_rows_processed_total Rows reported by tasks through add_rows().",
+        "# TYPE celery_task_rows_processed_total counter",
+    ]
+    for task, fields in metrics.items():
+        if "rows" in fields:
+            lines.append(f'celery_task_rows_processed_total{{task="{task}"}} {_number(fields["rows"])}')
+
+    for name, metric, help_text in (
+        ("runtime", "celery_task_runtime_seconds", "Time spent running the task."),
+        ("latency", "celery_task_queue_latency_seconds", "Time from publish (or ETA) to the start of the run."),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for task, fields in metrics.items():
+            if f"{name}_count" not in fields:
+                continue
+            cumulative = 0
+            for bound in HISTOGRAMS[name] + ["+Inf"]:
+                cumulative += fields.get(f"{name}_bucket:{bound}", 0)
+                lines.append(f'{metric}_bucket{{task="{task}",le="{bound}"}} {_number(cumulative)}')
+            lines.append(f'{metric}_sum{{task="{task}"}} {_number(fields[f"{name}_sum"])}')
+            lines.append(f'{metric}_count{{task="{task}"}} {_number(fields[f"{name}_count"])}')
+    return "\n".join(lines) + "\n"
+
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    if headers is not None:
+        headers[ENQUEUED_HEADER] = time.time()
+
+
+@task_prerun.connect
+def start_timer(task=None, **kwargs):
+    request = task.request
+    request.metrics_started = time.perf_counter()
+    request.rows_processed = 0
+    enqueued_at = getattr(request, ENQUEUED_HEADER, None)
+    if enqueued_at is None:
+        request.metrics_latency = None  # Eager calls and messages from producers without the signal
+        return
+    if request.eta:
+        eta = datetime.fromisoformat(request.eta) if isinstance(request.eta, str) else request.eta
+        enqueued_at = max(enqueued_at, eta.timestamp())
+    request.metrics_latency = max(time.time() - enqueued_at, 0)
+
+
+@task_postrun.connect
+def record_run(task=None, state=None, **kwargs):
+    if not settings.TASK_METRICS_ENABLED:
+        return
+    request = task.request
+    started = getattr(request, "metrics_started", None)
+    runtime = None if started is None else time.perf_counter() - started
+    latency = getattr(request, "metrics_latency", None)
+    rows = getattr(request, "rows_processed", 0)
+    logger.info(
+        "Task %s[%s] %s: ran %.3fs, queued %s, %d rows", task.name, request.id, state, runtime or 0,
+        "-" if latency is None else f"{latency:.3f}s", rows,
+    )
+    try:
+        record(task.name, state or "UNKNOWN", runtime=runtime, latency=latency, rows=rows)
+    except redis.RedisError:
+        # Metrics must never fail the task they describe
+        logger.warning("Could not record metrics for task %s", task.name, exc_info=True)
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        try:
+            body = render_prometheus(snapshot()).encode()
+        except redis.RedisError:
+            logger.exception("Could not read task metrics")
+            self.send_error(503)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug(format, *args)
+
+
+@worker_ready.connect
+def serve_metrics(**kwargs):
+    """Serve /metrics from the worker's main process when TASK_METRICS_PORT is set."""
+    port = settings.TASK_METRICS_PORT
+    if not settings.TASK_METRICS_ENABLED or not port:
+        return
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="task-metrics", daemon=True).start()
+    logger.info("Serving task metrics on :%d/metrics", port)
@@ -1,62 +1,251 @@
 # finance/tasks.py
 from celery import shared_task
 from django.utils import timezone
-from .models import Income
-from dateutil.relativedelta import relativedelta
 import time
 from celery import shared_task
-from django.core.mail import EmailMultiAlternatives
 from django.template.loader import render_to_string
 from django.conf import settings
+import logging
+from datetime import date
+from celery import chord
+from django.core.cache import cache
+from django.db import OperationalError
+from django.db.models import F
+from celery.utils import uuid
+from .models import ImportJob
+from . import budgets, importers, outbox, recurrence, sync, taskmetrics
+from .importers import gpay
 
-@shared_task
+logger = logging.getLogger(__name__)
+
+@shared_task(ignore_result=True)
 def send_email_async(subject, body, to):
-    email = EmailMultiAlternatives(
-        subject=subject,
-        body=body,
-        from_email=settings.DEFAULT_FROM_EMAIL,
-        to=to,
+    # Kept for messages published before the outbox; they join it and go out with the next batch
+    outbox.enqueue(subject, body, to)
+
+
+@shared_task(
+    bind=True,
+    ignore_result=True,
+    autoretry_for=(OSError,),  # smtplib's errors included
+    retry_backoff=30,
+    retry_backoff_max=1800,
+    retry_jitter=True,
+    max_retries=5,  # Anything still queued after that is picked up by the periodic flush
+)
+def flush_email_outbox(self):
+    """Send a batch of queued emails over one SMTP connection, and carry on while a full batch was taken."""
+    sent, taken = outbox.flush(settings.EMAIL_BATCH_SIZE)
+    taskmetrics.add_rows(sent)
+    if taken == settings.EMAIL_BATCH_SIZE:
+        flush_email_outbox.delay()
+    return sent
+
+@shared_task
+def add_recurring_income():
+    created = recurrence.materialise_due("income")
+    taskmetrics.add_rows(created)
+    return created
+
+
+@shared_task
+def add_recurring_expense():
+    created = recurrence.materialise_due("expense")
+    taskmetrics.add_rows(created)
+    return created
+
+
+@shared_task
+def run_recurrence(today=None):
+    """Split the due recurring rules into partitions and post them in parallel across workers."""
+    today = today or timezone.now().date().isoformat()
+    partitions = [
+        materialise_recurrence_partition.s(kind, first_pk, last_pk, today)
+        for kind in recurrence.RECURRING_MODELS
+        for first_pk, last_pk in recurrence.partition_due(kind, date.fromisoformat(today))
+    ]
+    if not partitions:
+        return summarise_recurrence([], today)
+    chord(partitions)(summarise_recurrence.s(today))
+    return len(partitions)
+
+
+@shared_task(
+    autoretry_for=(OperationalError,), retry_backoff=True, max_retries=5, acks_late=True
+)
+def materialise_recurrence_partition(kind, first_pk, last_pk, today):
+    # Safe to retry: locked chunks commit independently and posted dates are skipped on the next attempt
+    created = recurrence.materialise_due(kind, date.fromisoformat(today), pk_range=(first_pk, last_pk))
+    taskmetrics.add_rows(created)
+    return {"kind": kind, "created": created}
+
+
+@shared_task
+def summarise_recurrence(results, today):
+    summary = {kind: 0 for kind in recurrence.RECURRING_MODELS}
+    for result in results:
+        summary[result["kind"]] += result["created"]
+    logger.info("Recurrence run for %s posted %s across %d partitions", today, summary, len(results))
+    return summary
+
+
+@shared_task(bind=True)
+def import_statement(self, job_id):
+    """Run a queued import job, publishing counters to the result backend as it goes."""
+    job = ImportJob.objects.select_related("user").get(pk=job_id)
+    job.status = "running"
+    job.started_at = timezone.now()
+    job.save(update_fields=["status", "started_at"])
+
+    if job.format == "gpay":
+        shards = gpay.shard_boundaries(job.file.path, settings.GPAY_IMPORT_SHARDS)
+        if len(shards) > 1:
+            # Fan the CPU-bound parsing out across workers; each writes its own shard and adds its counters to the job
+            callback = finish_gpay_import.s(job_id).set(task_id=uuid())
+            callback.on_error(fail_gpay_import.s(job_id))
+            job.task_id = callback.id
+            job.shards = len(shards)
+            job.save(update_fields=["task_id", "shards"])
+            chord(
+                parse_gpay_shard.s(job_id, index, start, end) for index, (start, end) in enumerate(shards)
+            )(callback)
+            return None
+
+    def run(report):
+        with job.file.open("rb") as source:
+            return importers.import_statement(
+                source, job.format, job.start_date, job.end_date, job.user, job.exclude_gt, job.exclude_lt,
+                progress=report,
+            )
+
+    return _run_import(self, job, run)
+
+
+SHARD_PROGRESS_KEY = "finance:import:{job_id}:shard:{index}"
+SHARD_PROGRESS_TIMEOUT = 24 * 60 * 60
+
+
+@shared_task
+def parse_gpay_shard(job_id, index, start, end):
+    """
+    Import one byte range of a GPay export in its own transaction.
+
+    Live counters go to the cache while it runs; once the shard commits they
+    are added to the job row, so the job always shows what has been written.
+    """
+    job = ImportJob.objects.select_related("user").get(pk=job_id)
+    progress_key = SHARD_PROGRESS_KEY.format(job_id=job_id, index=index)
+
+    def report(stats):
+        cache.set(progress_key, stats, SHARD_PROGRESS_TIMEOUT)
+
+    stats = gpay.import_shard(
+        job.file.path, start, end, job.start_date, job.end_date, job.user, job.exclude_gt, job.exclude_lt,
+        progress=report,
     )
-    
+    ImportJob.objects.filter(pk=job_id).update(
+        **{field: F(field) + stats[key] for key, field in ImportJob.COUNTER_FIELDS.items()}
+    )
+    cache.delete(progress_key)
+    taskmetrics.add_rows(stats["scanned"])
+    return stats
+
+
+def shard_progress(job):
+    """Counters of a sharded import's shards that are still running, as reported so far."""
+    keys = [SHARD_PROGRESS_KEY.format(job_id=job.pk, index=index) for index in range(job.shards)]
+    totals = dict.fromkeys(ImportJob.COUNTER_FIELDS, 0)
+    for stats in cache.get_many(keys).values():
+        for key in totals:
+            totals[key] += stats.get(key, 0)
+    return totals
+
+
+@shared_task
+def finish_gpay_import(shard_stats, job_id):
+    """Chord callback: every shard has written its rows and counters, so the job is complete."""
+    job = ImportJob.objects.get(pk=job_id)
+    job.status = "completed"
+    job.finished_at = timezone.now()
+    job.file.delete(save=False)
+    job.save(update_fields=["status", "finished_at", "file"])
+    return {key: getattr(job, field) for key, field in ImportJob.COUNTER_FIELDS.items()}
+
+
+@shared_task
+def fail_gpay_import(request, exc, traceback, job_id):
+    """
+    Chord error callback: a shard failed and rolled back its own rows.
+
+    Rows committed by the other shards stay, so the job is reported as
+    partial when any shard completed; importing the file again adds only the
+    missing rows.
+    """
+    job = ImportJob.objects.get(pk=job_id)
+    logger.error("Sharded import job %s failed: %s", job_id, exc)
+    job.status = "partial" if job.rows_scanned else "failed"
+    job.error = str(exc)
+    job.finished_at = timezone.now()
+    job.save(update_fields=["status", "error", "finished_at"])
+    cache.delete_many([SHARD_PROGRESS_KEY.format(job_id=job_id, index=index) for index in range(job.shards)])
+
+
+def _run_import(task, job, run):
+    def report(stats):
+        # The import runs in one transaction, so live progress goes through Redis instead of the job row
+        task.update_state(state="PROGRESS", meta=stats)
+
     try:
-        email.send()
-        return f"Email sent successfully to {to}"
+        stats = run(report)
     except Exception as e:
-        return f"Failed to send email: {str(e)}"
+        logger.exception("Import job %s failed", job.pk)
+        job.status = "failed"
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "error", "finished_at"])
+        raise
 
-@shared_task
-def add_recurring_income():
-    today = timezone.now().date()
-    recurring_incomes = Income.objects.filter(is_recurring=True, next_occurrence=today)
-
-    for income in recurring_incomes:
-        Income.objects.create(
-            user=income.user,
-            amount=income.amount,
-            income_source=income.income_source,
-            date=today,
-            is_recurring=False,  
-            category=income.category,
-            sub_category=income.sub_category,
-            received_by=income.received_by,
-            description=income.description,
-            attachments=income.attachments,
-        )
-
-        if income.recurrence_interval == "daily":
-            income.next_occurrence += relativedelta(days=1)
-        elif income.recurrence_interval == "weekly":
-            income.next_occurrence += relativedelta(weeks=1)
-        elif income.recurrence_interval == "monthly":
-            income.next_occurrence += relativedelta(months=1)
-        elif income.recurrence_interval == "yearly":
-            income.next_occurrence += relativedelta(years=1)
-
-        income.save()
+    taskmetrics.add_rows(stats["scanned"])
+    for key, field in ImportJob.COUNTER_FIELDS.items():
+        setattr(job, field, stats[key])
+    job.status = "completed"
+    job.finished_at = timezone.now()
+    job.file.delete(save=False)
+    job.save()
+    return stats
 
 
 @shared_task
 def add(x, y):
-    print("i am working on this")
+    logger.info("Adding %s and %s", x, y)
     time.sleep(15)
-    return x + y
\ No newline at end of file
+    return x + y
+
+
+@shared_task
+def evaluate_budget_alerts(today=None):
+    """Raise alerts for budgets that crossed a BUDGET_ALERT_THRESHOLDS level and email each affected user once."""
+    today = date.fromisoformat(today) if today else timezone.now().date()
+    alerts = budgets.evaluate_alerts(today, settings.BUDGET_ALERT_THRESHOLDS)
+
+    by_user = {}
+    for alert in alerts:
+        by_user.setdefault(alert.budget.user, []).append(alert)
+    for user, user_alerts in by_user.items():
+        lines = [
+            f"{alert.budget.category.name}: {alert.spent} of {alert.budget.amount} spent "
+            f"({alert.threshold}% threshold, {alert.budget.date_from} to {alert.budget.date_to})"
+            for alert in user_alerts
+        ]
+        outbox.enqueue("Budget alert", "\n".join(lines), [user.email])
+    logger.info("Raised %d budget alerts for %d users", len(alerts), len(by_user))
+    taskmetrics.add_rows(len(alerts))
+    return len(alerts)
+
+
+@shared_task
+def prune_tombstones():
+    deleted = sync.prune_tombstones()
+    logger.info("Pruned %d sync tombstones", deleted)
+    taskmetrics.add_rows(deleted)
+    return deleted
@@ -1,3 +1,1263 @@
-from django.test import TestCase
+import base64
+import gzip
+import io
+import json
+import os
+import smtplib
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.core.mail.backends import locmem
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .categories import get_catalogue
+from .importers import gpay, import_statement, pipeline
+from .instrumentation import PerformanceBudgetExceeded
+from .models import (
+    User, Category, Income, Expense, Transaction, Budget, BudgetAlert, ImportJob, MonthlyRollup, OutboundEmail,
+    RecurringTransaction,
+)
+from .pagination import DateIdCursorPagination
+from .recurrence import due_rules, materialise_due, partition_due
+from .serializers import IncomeSerializer, ExpenseSerializer, TransactionSerializer
+from . import benchmarks, budgets, outbox, recurrence, rollups, synthetic
+from . import summary as summary_module
+from .sync import encode_token
+from .taskmetrics import render_prometheus
+from .tasks import import_statement as import_statement_task
+from .tasks import (
+    SHARD_PROGRESS_KEY, evaluate_budget_alerts, fail_gpay_import, finish_gpay_import, materialise_recurrence_partition,
+    parse_gpay_shard, send_email_async, shard_progress,
+)
+
+# The category catalogue's version key lives in the cache; keep it in-process for tests
+LOCMEM_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ListIndexUsageTests(APITestCase):
+    """The per-user list endpoints and the recurrence scan should be answered from the composite indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Index", "User", "index@example.com", "password")
+        income_category = Category.objects.create(name="Salary", type="income", classification="income")
+        expense_category = Category.objects.create(name="Rent", type="expense", classification="need")
+        start = date(2024, 1, 1)
+        Income.objects.bulk_create(
+            Income(user=cls.user, amount=100, date=start + timedelta(days=i), category=income_category)
+            for i in range(50)
+        )
+        Expense.objects.bulk_create(
+            Expense(user=cls.user, amount=10, date=start + timedelta(days=i), category=expense_category,
+                    payment_method="upi")
+            for i in range(50)
+        )
+        Transaction.objects.bulk_create(
+            Transaction(user=cls.user, transaction_type="expense", amount=10, date=start + timedelta(days=i),
+                        category=expense_category)
+            for i in range(50)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        get_catalogue()
+
+    def explain(self, sql):
+        # The test tables are tiny, so take sequential scans off the table to see which index the planner picks
+        with connection.cursor() as cursor:
+            cursor.execute("SET enable_seqscan = off")
+            try:
+                cursor.execute("EXPLAIN " + sql)
+                return "\n".join(row[0] for row in cursor.fetchall())
+            finally:
+                cursor.execute("RESET enable_seqscan")
+
+    def assertEndpointUsesIndex(self, url, table, indexes):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        sql = next(q["sql"] for q in queries.captured_queries if f'FROM "{table}"' in q["sql"])
+        plan = self.explain(sql)
+        self.assertTrue(any(index in plan for index in indexes), plan)
+
+    def test_income_list(self):
+        self.assertEndpointUsesIndex(reverse("income-list-create"), "finance_income", ["income_user_recent_idx"])
+
+    def test_income_list_by_date(self):
+        self.assertEndpointUsesIndex(
+            reverse("income-list-create") + "?date=2024-01-10",
+            "finance_income",
+            ["income_user_date_idx", "income_user_recent_idx"],
+        )
+
+    def test_expense_list(self):
+        self.assertEndpointUsesIndex(reverse("expense-list-create"), "finance_expense", ["expense_user_recent_idx"])
+
+    def test_expense_list_by_date(self):
+        self.assertEndpointUsesIndex(
+            reverse("expense-list-create") + "?date=2024-01-10",
+            "finance_expense",
+            ["expense_user_date_idx", "expense_user_recent_idx"],
+        )
+
+    def test_transaction_list(self):
+        self.assertEndpointUsesIndex(
+            reverse("transaction-list-create"), "finance_transaction", ["transaction_user_recent_idx"]
+        )
+
+    def test_sync(self):
+        since = "?since=" + encode_token(timezone.now() - timedelta(days=1))
+        self.assertEndpointUsesIndex(reverse("sync") + since, "finance_income", ["income_user_updated_idx"])
+        self.assertEndpointUsesIndex(reverse("sync") + since, "finance_expense", ["expense_user_updated_idx"])
+
+    def test_recurrence_due_scan(self):
+        for kind in ("income", "expense"):
+            with self.subTest(kind=kind):
+                sql, params = due_rules(kind, date(2024, 6, 1)).query.sql_with_params()
+                with connection.cursor() as cursor:
+                    sql = cursor.mogrify(sql, params)
+                self.assertIn(f"{kind}_due_idx", self.explain(sql))
+
+
+class RecurrenceTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Recurring", "User", "recurring@example.com", "password")
+
+    def rule(self, model, start, interval, **fields):
+        if model is Expense:
+            fields.setdefault("payment_method", "upi")
+        return model.objects.create(
+            user=self.user, amount=100, date=start, is_recurring=True, recurrence_interval=interval, **fields
+        )
+
+    def posted(self, rule):
+        return list(type(rule).objects.filter(user=self.user, is_recurring=False).order_by("date")
+                    .values_list("date", flat=True))
+
+    def test_missed_periods_are_caught_up(self):
+        rule = self.rule(Expense, date(2024, 1, 10), "monthly")
+        self.assertEqual(materialise_due("expense", date(2024, 4, 15)), 3)
+        self.assertEqual(self.posted(rule), [date(2024, 2, 10), date(2024, 3, 10), date(2024, 4, 10)])
+        self.assertEqual(RecurringTransaction.objects.filter(expense=rule).count(), 3)
+        rule.refresh_from_db()
+        self.assertEqual(rule.next_occurrence, date(2024, 5, 10))
+        # The rule was created outside the API, so only its occurrences are rolled up
+        self.assertEqual(
+            list(MonthlyRollup.objects.filter(user=self.user).order_by("month").values_list("month", "total")),
+            [(date(2024, 2, 1), 100), (date(2024, 3, 1), 100), (date(2024, 4, 1), 100)],
+        )
+
+    def test_end_date_stops_the_series(self):
+        rule = self.rule(Income, date(2024, 1, 1), "weekly", end_date=date(2024, 1, 20))
+        self.assertEqual(materialise_due("income", date(2024, 3, 1)), 2)
+        self.assertEqual(self.posted(rule), [date(2024, 1, 8), date(2024, 1, 15)])
+        self.assertFalse(due_rules("income", date(2024, 3, 1)).exists())
+
+    def test_month_end_is_clamped_without_drifting(self):
+        rule = self.rule(Income, date(2024, 1, 31), "monthly")
+        materialise_due("income", date(2024, 4, 30))
+        self.assertEqual(self.posted(rule), [date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)])
+        rule.refresh_from_db()
+        self.assertEqual(rule.next_occurrence, date(2024, 5, 31))
+
+    def test_rerun_posts_nothing(self):
+        rule = self.rule(Expense, date(2024, 1, 1), "daily")
+        self.assertEqual(materialise_due("expense", date(2024, 1, 5)), 4)
+        self.assertEqual(materialise_due("expense", date(2024, 1, 5)), 0)
+        # As if a crashed run had posted the occurrences without moving next_occurrence on
+        Expense.objects.filter(pk=rule.pk).update(next_occurrence=date(2024, 1, 2))
+        self.assertEqual(materialise_due("expense", date(2024, 1, 5)), 0)
+        self.assertEqual(len(self.posted(rule)), 4)
+
+    @override_settings(RECURRENCE_PARTITION_SIZE=3)
+    def test_partitions_cover_each_due_rule_once(self):
+        due = [self.rule(Income, date(2024, 1, n), "monthly").pk for n in range(1, 8)]
+        self.rule(Income, date(2024, 6, 1), "monthly")  # Not due yet
+        self.rule(Income, date(2024, 1, 1), "monthly", end_date=date(2024, 1, 15))  # Ended
+        partitions = partition_due("income", date(2024, 3, 1))
+        self.assertEqual(len(partitions), 3)
+        covered = [
+            pk for pk_range in partitions
+            for pk in due_rules("income", date(2024, 3, 1)).filter(pk__range=pk_range).values_list("pk", flat=True)
+        ]
+        self.assertEqual(sorted(covered), due)
+
+    def test_failed_partition_can_be_retried(self):
+        rules = [self.rule(Expense, date(2024, 1, n), "monthly") for n in range(1, 5)]
+        pk_range = (rules[0].pk, rules[-1].pk)
+        chunks = []
+
+        def fail_on_second_chunk(*args):
+            chunks.append(args)
+            if len(chunks) == 2:
+                raise OperationalError("connection lost")
+            return materialise_chunk(*args)
+
+        materialise_chunk = recurrence._materialise_chunk
+        with mock.patch.object(recurrence, "_materialise_chunk", side_effect=fail_on_second_chunk):
+            with self.assertRaises(OperationalError):
+                recurrence.materialise_due("expense", date(2024, 3, 15), pk_range=pk_range, batch_size=1)
+        self.assertEqual(Expense.objects.filter(is_recurring=False).count(), 2)
+
+        result = materialise_recurrence_partition.apply(args=["expense", *pk_range, "2024-03-15"]).get()
+        self.assertEqual(result, {"kind": "expense", "created": 6})
+        self.assertEqual(Expense.objects.filter(is_recurring=False).count(), 8)
+        self.assertEqual(RecurringTransaction.objects.count(), 8)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CursorPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Page", "User", "page@example.com", "password")
+        # Several rows share a date, so pages must break ties on id
+        for day in (3, 1, 2, 2, 2, 2, 1):
+            Income.objects.create(user=cls.user, amount=day, date=date(2024, 1, day))
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_pages_walk_every_row_once_in_order(self):
+        expected = list(Income.objects.filter(user=self.user).order_by("-date", "id").values_list("id", flat=True))
+        url, pages = reverse("income-list-create") + "?page_size=2", []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([row["id"] for row in response.data["results"]])
+            url = response.data["next"]
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual([pk for page in pages for pk in page], expected)
+
+    def test_page_size(self):
+        paginator = DateIdCursorPagination()
+        for query, size in (("", 100), ("?page_size=5", 5), ("?page_size=5000", 1000), ("?page_size=0", 100)):
+            with self.subTest(query=query):
+                request = Request(APIRequestFactory().get("/incomes/" + query))
+                self.assertEqual(paginator.get_page_size(request), size)
+
+    def test_invalid_cursor(self):
+        not_a_date = base64.urlsafe_b64encode(b"yesterday|1").decode()
+        for cursor in ("garbage!", not_a_date, base64.urlsafe_b64encode(b"2024-01-01").decode()):
+            with self.subTest(cursor=cursor):
+                response = self.client.get(reverse("income-list-create"), {"cursor": cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class QueryCountTests(APITestCase):
+    """A finance endpoint's query count must not grow with the number of rows it returns."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Query", "User", "query@example.com", "password")
+        cls.income_category = Category.objects.create(name="Salary", type="income", classification="income")
+        cls.expense_category = Category.objects.create(name="Food", type="expense", classification="want")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def create_rows(self, count):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._create_rows(count)
+        get_catalogue()
+
+    def _create_rows(self, count):
+        for i in range(count):
+            day = date(2024, 1, 1) + timedelta(days=i)
+            Income.objects.create(user=self.user, amount=100, date=day, category=self.income_category)
+            Expense.objects.create(
+                user=self.user, amount=10, date=day, category=self.expense_category, payment_method="upi"
+            )
+            Transaction.objects.create(
+                user=self.user, transaction_type="expense", amount=10, date=day, category=self.expense_category
+            )
+            Budget.objects.create(
+                user=self.user, category=self.expense_category, amount=500, date_from=day, date_to=day
+            )
+            Category.objects.create(name=f"Extra {i}", type="expense", classification="want")
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_list_endpoints(self):
+        urls = [
+            reverse("income-list-create") + "?page_size=1000",
+            reverse("expense-list-create") + "?page_size=1000",
+            reverse("transaction-list-create") + "?page_size=1000",
+            reverse("budget-list-create"),
+            reverse("category-list"),
+        ]
+        self.create_rows(2)
+        few = {url: self.count_queries(url) for url in urls}
+        self.create_rows(20)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), few[url])
+
+    def test_detail_endpoints(self):
+        self.create_rows(1)
+        for name, model in (("income-detail", Income), ("expense-detail", Expense)):
+            with self.subTest(name=name):
+                url = reverse(name, args=[model.objects.get(user=self.user).pk])
+                self.assertEqual(self.count_queries(url), 1)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CategoryCatalogueTests(APITestCase):
+    """Category reads come from the in-process catalogue and cost no queries once it is loaded."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Catalogue", "User", "catalogue@example.com", "password")
+        cls.income_category = Category.objects.create(name="Salary", type="income", classification="income")
+        cls.expense_category = Category.objects.create(name="Food", type="expense", classification="want")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        get_catalogue()
+
+    def test_list_is_served_from_the_catalogue(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("category-list"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({c["name"] for c in response.json()}, {"Salary", "Food"})
+
+        response = self.client.get(reverse("category-list"), HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_category_write_changes_the_etag(self):
+        etag = self.client.get(reverse("category-list"))["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            Category.objects.create(name="Rent", type="expense", classification="need")
+
+        response = self.client.get(reverse("category-list"), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertIn("Rent", {c["name"] for c in response.json()})
+
+    def test_write_validates_category_type_without_queries(self):
+        with self.assertNumQueries(0):
+            response = self.client.post(
+                reverse("income-list-create"),
+                {"amount": "10.00", "date": "2024-01-01", "category": self.expense_category.pk},
+            )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("category", response.json())
+
+        response = self.client.post(
+            reverse("income-list-create"),
+            {"amount": "10.00", "date": "2024-01-01", "category": self.income_category.pk},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()["category_name"], "Salary")
+
+
+@override_settings(CACHES=LOCMEM_CACHES, SYNC_OVERLAP_SECONDS=0)
+class SyncTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Sync", "User", "sync@example.com", "password")
+        category = Category.objects.create(name="Food", type="expense", classification="want")
+        cls.kept = Expense.objects.create(user=cls.user, amount=10, date=date(2024, 1, 1), category=category,
+                                          payment_method="upi")
+        cls.edited = Expense.objects.create(user=cls.user, amount=20, date=date(2024, 1, 2), category=category,
+                                            payment_method="upi")
+        cls.removed = Expense.objects.create(user=cls.user, amount=30, date=date(2024, 1, 3), category=category,
+                                             payment_method="upi")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def test_returns_only_changes_since_the_token(self):
+        response = self.client.get(reverse("sync"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()["expenses"]), 3)
+        since = response.json()["since"]
+
+        self.edited.amount = 25
+        self.edited.save()
+        self.client.delete(reverse("expense-detail", args=[self.removed.pk]))
+
+        response = self.client.get(reverse("sync"), {"since": since})
+        self.assertEqual([row["id"] for row in response.json()["expenses"]], [self.edited.pk])
+        self.assertEqual(response.json()["deleted"], {"incomes": [], "expenses": [self.removed.pk]})
+
+    def test_pages_the_initial_sync_and_large_deltas(self):
+        sent = []
+        response = self.client.get(reverse("sync"), {"page_size": 2}).json()
+        while response["has_more"]:
+            self.assertLessEqual(len(response["expenses"]), 2)
+            sent += [row["id"] for row in response["expenses"]]
+            response = self.client.get(reverse("sync"), {"since": response["since"], "page_size": 2}).json()
+        sent += [row["id"] for row in response["expenses"]]
+        self.assertEqual(sent, [self.kept.pk, self.edited.pk, self.removed.pk])
+
+        # Rows sharing updated_at are split on id; the token picks up after the last one sent
+        Expense.objects.filter(user=self.user).update(updated_at=timezone.now())
+        response = self.client.get(reverse("sync"), {"since": response["since"], "page_size": 1}).json()
+        sent = [row["id"] for row in response["expenses"]]
+        while response["has_more"]:
+            response = self.client.get(reverse("sync"), {"since": response["since"], "page_size": 1}).json()
+            sent += [row["id"] for row in response["expenses"]]
+        self.assertEqual(sent, [self.kept.pk, self.edited.pk, self.removed.pk])
+
+    def test_rejects_bad_and_expired_tokens(self):
+        self.assertEqual(self.client.get(reverse("sync"), {"since": "not-a-token"}).status_code, 400)
+        expired = encode_token(timezone.now() - timedelta(days=365))
+        self.assertEqual(self.client.get(reverse("sync"), {"since": expired}).status_code, 410)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BulkWriteTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Bulk", "User", "bulk@example.com", "password")
+        cls.category = Category.objects.create(name="Food", type="expense", classification="want")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        get_catalogue()
+
+    def items(self, count):
+        return [
+            {"amount": "10.00", "date": "2024-01-01", "category": self.category.pk, "payment_method": "upi"}
+            for _ in range(count)
+        ]
+
+    def test_batch_is_written_in_constant_queries(self):
+        with CaptureQueriesContext(connection) as few:
+            self.client.post(reverse("expense-bulk"), self.items(2), format="json")
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.post(reverse("expense-bulk"), self.items(50), format="json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(few), len(many))
+
+        ids = list(Expense.objects.filter(user=self.user).values_list("pk", flat=True))
+        response = self.client.patch(reverse("expense-bulk"), [{"id": pk, "amount": "5.00"} for pk in ids], format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(Expense.objects.values_list("amount", flat=True)), {5})
+
+        response = self.client.delete(reverse("expense-bulk"), ids, format="json")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Expense.objects.exists())
+
+    def test_one_invalid_item_rejects_the_batch(self):
+        items = self.items(3)
+        items[1]["amount"] = "not a number"
+        response = self.client.post(reverse("expense-bulk"), items, format="json")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()[0], {})
+        self.assertIn("amount", response.json()[1])
+        self.assertFalse(Expense.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class LedgerExportTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Export", "User", "export@example.com", "password")
+        category = Category.objects.create(name="Salary", type="income", classification="income")
+        Income.objects.bulk_create(
+            Income(user=cls.user, amount=100 + i, date=date(2024, 1, 1) + timedelta(days=i), category=category)
+            for i in range(3)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+
+    def test_csv(self):
+        response = self.client.get(reverse("ledger-export", args=["incomes"]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0].split(",")[:4], ["id", "date", "amount", "category"])
+        self.assertEqual([line.split(",")[1:4] for line in lines[1:]], [
+            ["2024-01-03", "102.00", "Salary"], ["2024-01-02", "101.00", "Salary"], ["2024-01-01", "100.00", "Salary"],
+        ])
+
+    def test_gzipped_ndjson(self):
+        response = self.client.get(
+            reverse("ledger-export", args=["incomes"]), {"format": "ndjson", "start_date": "2024-01-02"},
+            HTTP_ACCEPT_ENCODING="gzip",
+        )
+        self.assertEqual(response["Content-Encoding"], "gzip")
+        rows = [json.loads(line) for line in gzip.decompress(b"".join(response.streaming_content)).splitlines()]
+        self.assertEqual([row["amount"] for row in rows], ["102.00", "101.00"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BudgetAlertTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Budget", "User", "budget@example.com", "password")
+        cls.other = User.objects.create_user("Other", "User", "other@example.com", "password")
+        cls.food = Category.objects.create(name="Food", type="expense", classification="want")
+        cls.budget = Budget.objects.create(
+            user=cls.user, category=cls.food, amount=200, date_from=date(2024, 3, 1), date_to=date(2024, 3, 31)
+        )
+
+    def spend(self, amount, day=date(2024, 3, 10), user=None):
+        Expense.objects.create(
+            user=user or self.user, amount=amount, date=day, category=self.food, payment_method="upi"
+        )
+
+    def test_utilisation(self):
+        self.spend(50)
+        self.spend(100, day=date(2024, 3, 31))
+        self.spend(1000, day=date(2024, 4, 1))  # Outside the window
+        self.spend(1000, user=self.other)
+        empty = Budget.objects.create(
+            user=self.user, category=self.food, amount=0, date_from=date(2024, 5, 1), date_to=date(2024, 5, 31)
+        )
+        rows = {b.pk: b for b in budgets.with_utilisation(Budget.objects.all())}
+        budget = rows[self.budget.pk]
+        self.assertEqual((budget.spent, budget.remaining, budget.pct_used), (150, 50, Decimal("75.00")))
+        self.assertEqual((rows[empty.pk].spent, rows[empty.pk].pct_used), (0, None))
+
+    def evaluate(self):
+        return evaluate_budget_alerts.apply(kwargs={"today": "2024-03-15"}).get()
+
+    @override_settings(BUDGET_ALERT_THRESHOLDS=[80, 100])
+    def test_each_crossing_is_alerted_once(self):
+        self.spend(150)
+        self.assertEqual(self.evaluate(), 0)
+        self.spend(20)
+        self.assertEqual(self.evaluate(), 1)
+        self.assertEqual(self.evaluate(), 0)
+        self.spend(40)
+        self.assertEqual(self.evaluate(), 1)
+        self.assertEqual(
+            sorted(BudgetAlert.objects.values_list("threshold", "spent")), [(80, 170), (100, 210)]
+        )
+        self.assertEqual(OutboundEmail.objects.count(), 2)
+
+    def test_alerts_lost_to_an_overlapping_run_are_not_returned(self):
+        BudgetAlert.objects.create(budget=self.budget, threshold=80, spent=170)
+        created = budgets.insert_new([
+            BudgetAlert(budget=self.budget, threshold=80, spent=170),
+            BudgetAlert(budget=self.budget, threshold=100, spent=210),
+        ])
+        self.assertEqual([alert.threshold for alert in created], [100])
+        self.assertEqual(created[0].pk, BudgetAlert.objects.get(threshold=100).pk)
+
+
+class StatementImportTests(TestCase):
+    CSV = (
+        "Date,Narration,Withdrawal Amt.,Deposit Amt.\n"
+        "01/02/2024,ATM CASH,500,\n"
+        "01/02/2024,ATM CASH,500,\n"
+        "02/02/2024,SALARY,,\"50,000.00\"\n"
+    )
+    OFX = (
+        "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKTRANLIST>\n"
+        "<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240110120000\n<TRNAMT>-42.10\n<FITID>1\n<NAME>Cafe\n</STMTTRN>\n"
+        "<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>20240110120000\n<TRNAMT>-42.10\n<FITID>2\n<NAME>Cafe\n</STMTTRN>\n"
+        "</BANKTRANLIST></OFX>\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Import", "User", "import@example.com", "password")
+
+    def run_import(self, source, statement_format):
+        return import_statement(io.BytesIO(source.encode()), statement_format, date(2024, 1, 1), date(2024, 12, 31),
+                                self.user)
+
+    def test_csv_import_is_idempotent(self):
+        stats = self.run_import(self.CSV, "csv")
+        self.assertEqual((stats["inserted"], stats["duplicates"]), (3, 0))
+        self.assertEqual(Expense.objects.filter(user=self.user, amount=500, recipient="ATM CASH").count(), 2)
+        self.assertEqual(Income.objects.get(user=self.user).amount, 50000)
+
+        stats = self.run_import(self.CSV, "csv")
+        self.assertEqual((stats["inserted"], stats["duplicates"]), (0, 3))
+
+    def test_ofx_import_keys_on_fitid(self):
+        stats = self.run_import(self.OFX, "ofx")
+        self.assertEqual((stats["inserted"], stats["duplicates"]), (2, 0))
+        self.assertEqual(self.run_import(self.OFX, "ofx")["duplicates"], 2)
+
+    def test_ofx_cp1252_bytes_undefined_in_the_code_page_are_replaced(self):
+        statement = self.OFX.replace("OFXHEADER:100", "OFXHEADER:100\nCHARSET:1252").replace("Cafe", "Caf\xe9")
+        # 0x81 has no character in cp1252
+        source = statement.encode("cp1252").replace(b"<FITID>2\n<NAME>Caf\xe9", b"<FITID>2\n<NAME>Caf\x81")
+        stats = import_statement(io.BytesIO(source), "ofx", date(2024, 1, 1), date(2024, 12, 31), self.user)
+        self.assertEqual(stats["inserted"], 2)
+        self.assertEqual(
+            set(Expense.objects.filter(user=self.user).values_list("recipient", flat=True)), {"Caf\ufffd", "Café"}
+        )
+
+    def test_ofx_entities_are_unescaped(self):
+        statement = self.OFX.replace("<NAME>Cafe", "<NAME>AT&amp;T", 1)
+        self.assertEqual(self.run_import(statement, "ofx")["inserted"], 2)
+        fingerprint = pipeline.transaction_fingerprint(
+            self.user.pk, datetime(2024, 1, 10, 12), Decimal("42.10"), "AT&T", "expense", "1"
+        )
+        expense = Expense.objects.get(user=self.user, fingerprint=fingerprint)
+        self.assertEqual((expense.recipient, expense.description), ("AT&T", "AT&T"))
+
+    def test_rows_lost_to_a_concurrent_import_are_not_inserted(self):
+        # As if another import committed "taken" between our fingerprint lookup and our insert
+        Expense.objects.create(user=self.user, amount=1, date=date(2024, 1, 1), fingerprint="taken")
+        rows = [Expense(user=self.user, amount=2, date=date(2024, 1, 1), fingerprint=fingerprint)
+                for fingerprint in ("taken", "new")]
+        inserted = pipeline.insert_new(Expense, rows)
+        self.assertEqual([row.fingerprint for row in inserted], ["new"])
+        self.assertEqual(Expense.objects.get(fingerprint="taken").amount, 1)
+
+
+def gpay_export(entries):
+    """A Takeout "My Activity" page with one activity cell per ``(text, timestamp)`` entry."""
+    cells = "".join(
+        f'<div class="{gpay.OUTER_CELL_CLASS}"><div class="mdl-grid">'
+        f'<div class="header-cell mdl-cell mdl-cell--12-col"><p>Google Pay</p></div>'
+        f'<div class="{gpay.CONTENT_CELL_CLASS}">{text}\n{timestamp}</div>'
+        f"</div></div>\n"
+        for text, timestamp in entries
+    )
+    return f'<html><body><div class="mdl-grid">\n{cells}</div></body></html>'.encode()
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class GPayImportTests(TestCase):
+    ENTRIES = [
+        ("Paid ₹250.00 to Coffee House", "12 Mar 2024, 10:15:00 IST"),
+        ("Received ₹1,200.50", "13 Mar 2024, 09:00:00 IST"),
+        ("Sent ₹75 to Asha", "14 Sept 2024, 18:30:12 IST"),
+        ("Paid ₹10.00 to Old Shop", "01 Jan 2023, 08:00:00 IST"),  # Before the import window
+        ("Opened Google Pay", "no date"),
+    ] + [(f"Paid ₹{n}.00 to Shop {n}", f"15 Apr 2024, 12:00:{n:02d} IST") for n in range(1, 8)]
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("GPay", "User", "gpay@example.com", "password")
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.addCleanup(self.media.cleanup)
+        self.path = os.path.join(self.media.name, "export.html")
+        with open(self.path, "wb") as f:
+            f.write(gpay_export(self.ENTRIES))
+
+    def test_activity_cells_survive_small_chunks(self):
+        with open(self.path, "rb") as f:
+            details = list(gpay.iter_activity_details(f, chunk_size=64))
+        self.assertEqual(details, [f"{text}\n{timestamp}" for text, timestamp in self.ENTRIES])
+
+        records = [gpay.parse_activity(text) for text in details]
+        self.assertEqual(
+            [(r["type"], r["amount"], r["counterparty"], r["timestamp"]) for r in records[:3]],
+            [
+                ("expense", Decimal("250.00"), "Coffee House", datetime(2024, 3, 12, 10, 15)),
+                ("income", Decimal("1200.50"), "Received from", datetime(2024, 3, 13, 9, 0)),
+                ("expense", Decimal("75"), "Asha", datetime(2024, 9, 14, 18, 30, 12)),
+            ],
+        )
+        self.assertIsNone(records[4])
+
+    def test_import_writes_in_batches_and_is_idempotent(self):
+        batches = []
+        write_batch = pipeline._write_batch
+
+        def record_batch(transaction_type, records, *args):
+            batches.append((transaction_type, len(records)))  # The caller reuses the list
+            return write_batch(transaction_type, records, *args)
+
+        with mock.patch.object(pipeline, "_write_batch", side_effect=record_batch):
+            with open(self.path, "rb") as f:
+                stats = gpay.parse_gpay_html(f, date(2024, 1, 1), date(2024, 12, 31), self.user, batch_size=3)
+        self.assertEqual(batches, [("expense", 3), ("expense", 3), ("expense", 3), ("income", 1)])
+        self.assertEqual(stats, {"scanned": 12, "inserted": 10, "duplicates": 0, "filtered": 0, "skipped": 2})
+
+        with open(self.path, "rb") as f:
+            stats = gpay.parse_gpay_html(f, date(2024, 1, 1), date(2024, 12, 31), self.user, batch_size=3)
+        self.assertEqual((stats["inserted"], stats["duplicates"]), (0, 10))
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 9)
+
+    def test_sharded_parse_matches_serial_parse(self):
+        with open(self.path, "rb") as f:
+            serial = list(gpay.parse(f))
+        shards = gpay.shard_boundaries(self.path, 4, min_bytes=1)
+        self.assertEqual(len(shards), 4)
+        sharded = [record for start, end in shards for record in gpay.parse_shard(self.path, start, end)]
+        self.assertEqual(sharded, serial)
+        self.assertEqual(len(serial), len(self.ENTRIES))
+
+    def sharded_job(self, shard_count):
+        job = ImportJob.objects.create(
+            user=self.user, file="export.html", start_date=date(2024, 1, 1), end_date=date(2024, 12, 31),
+            status="running", shards=shard_count,
+        )
+        return job, gpay.shard_boundaries(self.path, shard_count, min_bytes=1)
+
+    def test_shards_add_their_counters_to_the_job(self):
+        with override_settings(MEDIA_ROOT=self.media.name):
+            job, shards = self.sharded_job(3)
+            results = []
+            for index, (start, end) in enumerate(shards):
+                results.append(parse_gpay_shard.apply(args=[job.pk, index, start, end]).get())
+                job.refresh_from_db()
+                # The row always holds the sum of the shards committed so far
+                self.assertEqual(job.rows_scanned, sum(stats["scanned"] for stats in results))
+            self.assertEqual(shard_progress(job), dict.fromkeys(ImportJob.COUNTER_FIELDS, 0))
+            stats = finish_gpay_import.apply(args=[results, job.pk]).get()
+
+        self.assertEqual(stats, {"scanned": 12, "inserted": 10, "duplicates": 0, "filtered": 0, "skipped": 2})
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_inserted, job.rows_skipped), ("completed", 10, 2))
+        self.assertFalse(job.file)
+        self.assertEqual(Expense.objects.filter(user=self.user).count(), 9)
+        self.assertEqual(Income.objects.get(user=self.user).amount, Decimal("1200.50"))
+
+    def test_a_failed_shard_leaves_a_partial_import(self):
+        with override_settings(MEDIA_ROOT=self.media.name):
+            job, shards = self.sharded_job(2)
+            first = parse_gpay_shard.apply(args=[job.pk, 0, *shards[0]]).get()
+            fail_gpay_import.apply(args=[None, RuntimeError("worker lost"), None, job.pk])
+
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ("partial", "worker lost"))
+        self.assertEqual((job.rows_scanned, job.rows_inserted), (first["scanned"], first["inserted"]))
+        written = Expense.objects.filter(user=self.user).count() + Income.objects.filter(user=self.user).count()
+        self.assertEqual(written, first["inserted"])
+
+    def test_an_import_with_no_completed_shard_failed(self):
+        job, _ = self.sharded_job(2)
+        fail_gpay_import.apply(args=[None, RuntimeError("worker lost"), None, job.pk])
+        job.refresh_from_db()
+        self.assertEqual(job.status, "failed")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ImportJobAPITests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Upload", "User", "upload@example.com", "password")
+        cls.other = User.objects.create_user("Other", "User", "other-upload@example.com", "password")
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        media_root = override_settings(MEDIA_ROOT=media.name)
+        media_root.enable()
+        self.addCleanup(media_root.disable)
+        # Run the job in-process, as a worker would once the upload commits
+        run_here = mock.patch.object(
+            import_statement_task, "apply_async",
+            side_effect=lambda args, task_id: import_statement_task.apply(args=args, task_id=task_id),
+        )
+        run_here.start()
+        self.addCleanup(run_here.stop)
+        self.client.force_authenticate(self.user)
+
+    def upload(self):
+        upload = SimpleUploadedFile("statement.csv", StatementImportTests.CSV.encode(), content_type="text/csv")
+        return self.client.post(
+            reverse("upload-transactions"),
+            {"file": upload, "format": "csv", "start_date": "2024-01-01", "end_date": "2024-12-31"},
+            format="multipart",
+        )
+
+    def test_upload_queues_a_job_that_completes(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.upload()
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data["status"], "pending")
+        url = reverse("import-job-detail", args=[response.data["job_id"]])
+        self.assertEqual(self.client.get(url).data["status"], "pending")
+
+        for callback in callbacks:
+            callback()
+        job = self.client.get(url).data
+        self.assertEqual(
+            (job["status"], job["rows_scanned"], job["rows_inserted"], job["rows_duplicate"], job["error"]),
+            ("completed", 3, 3, 0, None),
+        )
+        self.assertFalse(ImportJob.objects.get(pk=job["id"]).file)
+
+    def test_running_job_reports_live_counters(self):
+        with self.captureOnCommitCallbacks():
+            job_id = self.upload().data["job_id"]
+        ImportJob.objects.filter(pk=job_id).update(status="running")
+        progress = mock.Mock(state="PROGRESS", info={"scanned": 2000, "inserted": 1500})
+        with mock.patch("finance.views.AsyncResult", return_value=progress):
+            job = self.client.get(reverse("import-job-detail", args=[job_id])).data
+        self.assertEqual((job["status"], job["rows_scanned"], job["rows_inserted"]), ("running", 2000, 1500))
+
+    def test_sharded_job_reports_committed_and_running_shards(self):
+        job = ImportJob.objects.create(
+            user=self.user, start_date=date(2024, 1, 1), end_date=date(2024, 12, 31), status="running", shards=3,
+            rows_scanned=500, rows_inserted=450,  # Shard 0 has committed
+        )
+        cache.set(SHARD_PROGRESS_KEY.format(job_id=job.pk, index=2), {"scanned": 200, "inserted": 150})
+        data = self.client.get(reverse("import-job-detail", args=[job.pk])).data
+        self.assertEqual((data["shards"], data["rows_scanned"], data["rows_inserted"]), (3, 700, 600))
+
+    def test_other_users_cannot_see_the_job(self):
+        with self.captureOnCommitCallbacks():
+            job_id = self.upload().data["job_id"]
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(reverse("import-job-detail", args=[job_id])).status_code, 404)
+
+    def test_invalid_upload(self):
+        response = self.client.post(reverse("upload-transactions"), {"format": "csv"}, format="multipart")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(ImportJob.objects.exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class SummaryTests(APITestCase):
+    URL = reverse("summary") + "?start_date=2024-01-01&end_date=2024-12-31"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Summary", "User", "summary@example.com", "password")
+        cls.salary = Category.objects.create(name="Salary", type="income", classification="income")
+        cls.food = Category.objects.create(name="Food", type="expense", classification="want")
+        cls.rent = Category.objects.create(name="Rent", type="expense", classification="need")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        get_catalogue()
+
+    def expense(self, amount, day, category):
+        return Expense.objects.create(user=self.user, amount=amount, date=day, category=category, payment_method="upi")
+
+    def test_grouped_totals(self):
+        Income.objects.create(user=self.user, amount=100, date=date(2024, 1, 5), category=self.salary)
+        Income.objects.create(user=self.user, amount="50.50", date=date(2024, 2, 5))
+        self.expense("20.25", date(2024, 1, 9), self.food)
+        self.expense(300, date(2024, 1, 1), self.rent)
+        self.expense(10, date(2024, 3, 31), self.food)
+        self.expense(999, date(2023, 12, 31), self.food)  # Outside the range
+
+        summary = self.client.get(self.URL).data
+        self.assertEqual(summary["totals"], {"income": "150.50", "expense": "330.25", "net": "-179.75"})
+        self.assertEqual(summary["by_month"], [
+            {"month": "2024-01", "income": "100.00", "expense": "320.25"},
+            {"month": "2024-02", "income": "50.50", "expense": "0.00"},
+            {"month": "2024-03", "income": "0.00", "expense": "10.00"},
+        ])
+        self.assertEqual(
+            [(c["type"], c["category_name"], c["total"]) for c in summary["by_category"]],
+            [("expense", "Rent", "300.00"), ("income", "Salary", "100.00"), ("income", None, "50.50"),
+             ("expense", "Food", "30.25")],
+        )
+        self.assertEqual(summary["by_classification"], {"income": "100.00", "need": "300.00", "want": "30.25"})
+
+    def test_empty_totals_have_two_places(self):
+        summary = self.client.get(self.URL).data
+        self.assertEqual(summary["totals"], {"income": "0.00", "expense": "0.00", "net": "0.00"})
+        self.assertEqual(summary["by_month"], [])
+
+    def test_totals_read_before_a_write_are_not_served_after_it(self):
+        build_summary = summary_module.build_summary
+
+        def write_while_building(*args):
+            built = build_summary(*args)
+            # The write commits after this reader queried but before it caches its result
+            with self.captureOnCommitCallbacks(execute=True):
+                Income.objects.create(user=self.user, amount=40, date=date(2024, 6, 1))
+            return built
+
+        with mock.patch.object(summary_module, "build_summary", side_effect=write_while_building):
+            self.assertEqual(self.client.get(self.URL).data["totals"]["income"], "0.00")
+        self.assertEqual(self.client.get(self.URL).data["totals"]["income"], "40.00")
+
+    def test_category_writes_invalidate_the_cached_summary(self):
+        self.expense(30, date(2024, 1, 9), self.food)
+        self.assertEqual(self.client.get(self.URL).data["by_category"][0]["category_name"], "Food")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.name = "Groceries"
+            self.food.save()
+        summary = self.client.get(self.URL).data
+        self.assertEqual(summary["by_category"][0]["category_name"], "Groceries")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.food.delete()
+        summary = self.client.get(self.URL).data
+        self.assertEqual(summary["by_category"][0]["category_name"], None)
+        self.assertEqual(summary["by_classification"], {})
+
+    def test_writes_invalidate_the_cached_summary(self):
+        self.assertEqual(self.client.get(self.URL).data["totals"]["income"], "0.00")
+        with self.assertNumQueries(0):
+            self.client.get(self.URL)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Income.objects.create(user=self.user, amount=40, date=date(2024, 6, 1), category=self.salary)
+        self.assertEqual(self.client.get(self.URL).data["totals"]["income"], "40.00")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("expense-list-create"),
+                {"amount": "12.50", "date": "2024-06-02", "category": self.food.pk, "payment_method": "upi"},
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.client.get(self.URL).data["totals"]["expense"], "12.50")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("expense-detail", args=[response.data["id"]]))
+        self.assertEqual(self.client.get(self.URL).data["totals"]["expense"], "0.00")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RollupTests(APITestCase):
+    """MonthlyRollup must track every write to Income/Expense and agree with Sum() over the raw rows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Rollup", "User", "rollup@example.com", "password")
+        cls.salary = Category.objects.create(name="Salary", type="income", classification="income")
+        cls.bonus = Category.objects.create(name="Bonus", type="income", classification="income")
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        get_catalogue()
+
+    def buckets(self):
+        return {
+            (r.month, r.category_id): (r.total, r.count)
+            for r in MonthlyRollup.objects.filter(user=self.user, type="income")
+        }
+
+    def assertMatchesRawRows(self):
+        self.assertEqual(rollups.verify(self.user), [])
+        total = Income.objects.filter(user=self.user).aggregate(total=Sum("amount"))["total"] or 0
+        self.assertEqual(sum(total for total, _ in self.buckets().values()), total)
+
+    def test_create_update_delete(self):
+        url = reverse("income-list-create")
+        created = self.client.post(url, {"amount": "100.00", "date": "2024-01-15", "category": self.salary.pk})
+        self.assertEqual(created.status_code, 201)
+        detail = reverse("income-detail", args=[created.data["id"]])
+        self.assertEqual(self.buckets(), {(date(2024, 1, 1), self.salary.pk): (Decimal("100.00"), 1)})
+
+        for change, bucket in (
+            ({"amount": "250.00"}, (date(2024, 1, 1), self.salary.pk)),
+            ({"date": "2024-02-03"}, (date(2024, 2, 1), self.salary.pk)),
+            ({"category": self.bonus.pk}, (date(2024, 2, 1), self.bonus.pk)),
+        ):
+            with self.subTest(change=change):
+                self.assertEqual(self.client.patch(detail, change).status_code, 200)
+                # The row moves out of its old bucket, which is dropped once empty
+                self.assertEqual(self.buckets(), {bucket: (Decimal("250.00"), 1)})
+                self.assertMatchesRawRows()
+
+        self.assertEqual(self.client.delete(detail).status_code, 204)
+        self.assertEqual(self.buckets(), {})
+        self.assertMatchesRawRows()
+
+    def test_detail_writes_lock_their_row(self):
+        created = self.client.post(reverse("income-list-create"), {"amount": "100.00", "date": "2024-01-15"})
+        detail = reverse("income-detail", args=[created.data["id"]])
+        for method in ("get", "put", "patch", "delete"):
+            with self.subTest(method=method), CaptureQueriesContext(connection) as queries:
+                data = {"amount": "120.00", "date": "2024-01-15"} if method in ("put", "patch") else None
+                self.assertLess(getattr(self.client, method)(detail, data).status_code, 300)
+            locked = any(query["sql"].endswith("FOR UPDATE") for query in queries)
+            self.assertEqual(locked, method != "get")
+        self.assertMatchesRawRows()
+
+    def test_uncategorised_rows_share_one_bucket(self):
+        url = reverse("income-list-create")
+        for amount in ("10.00", "15.50"):
+            self.assertEqual(self.client.post(url, {"amount": amount, "date": "2024-03-01"}).status_code, 201)
+        self.assertEqual(self.buckets(), {(date(2024, 3, 1), None): (Decimal("25.50"), 2)})
+        self.assertMatchesRawRows()
+
+    def test_rebuild_and_verify(self):
+        self.client.post(reverse("income-list-create"), {"amount": "40.00", "date": "2024-01-01"})
+        MonthlyRollup.objects.filter(user=self.user).update(total=1)
+        self.assertEqual(len(rollups.verify(self.user)), 1)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_rollups", "--verify-only", stdout=io.StringIO(), stderr=io.StringIO())
+
+        call_command("rebuild_rollups", "--email", self.user.email, stdout=io.StringIO())
+        self.assertMatchesRawRows()
+
+    def test_reimport_with_existing_fingerprints(self):
+        csv = StatementImportTests.CSV
+        import_statement(io.BytesIO(csv.encode()), "csv", date(2024, 1, 1), date(2024, 12, 31), self.user)
+        csv += "03/02/2024,REFUND,,120.00\n"
+        stats = import_statement(io.BytesIO(csv.encode()), "csv", date(2024, 1, 1), date(2024, 12, 31), self.user)
+        self.assertEqual((stats["inserted"], stats["duplicates"]), (1, 3))
+        self.assertMatchesRawRows()
+        expenses = Expense.objects.filter(user=self.user).aggregate(total=Sum("amount"))["total"]
+        self.assertEqual(
+            MonthlyRollup.objects.filter(user=self.user, type="expense").aggregate(total=Sum("total"))["total"],
+            expenses,
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class FastListTests(APITestCase):
+    """The .values() list path must render the same bytes as the serializers and the stock JSON renderer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Fast", "User", "fast@example.com", "password")
+        salary = Category.objects.create(name="Salary", type="income", classification="income")
+        food = Category.objects.create(name="Café", type="expense", classification="want")
+        for i, category in enumerate([salary, None]):
+            Income.objects.create(user=cls.user, amount="1234.5", date=date(2024, 1, 1 + i), category=category,
+                                  description="Line\u2028separator \"quoted\"", is_recurring=True,
+                                  recurrence_interval="monthly")
+        Expense.objects.create(user=cls.user, amount=10, date=date(2024, 1, 1), category=food, payment_method="upi")
+        Transaction.objects.create(user=cls.user, transaction_type="expense", amount="0.1", category=food)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        cache.clear()
+        get_catalogue()
+        # Newer than the warmed catalogue, so its name comes from the fallback query
+        late = Category.objects.create(name="Late", type="expense", classification="need")
+        Expense.objects.create(user=self.user, amount=5, date=date(2024, 1, 2), category=late, payment_method="upi")
+
+    def test_matches_serializer_output(self):
+        for name, model, serializer_class in (
+            ("income-list-create", Income, IncomeSerializer),
+            ("expense-list-create", Expense, ExpenseSerializer),
+            ("transaction-list-create", Transaction, TransactionSerializer),
+        ):
+            with self.subTest(name=name):
+                response = self.client.get(reverse(name))
+                rows = model.objects.filter(user=self.user).order_by("-date", "id")
+                expected = {"next": None, "results": serializer_class(rows, many=True, context={}).data}
+                self.assertEqual(response.content, JSONRenderer().render(expected))
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class AsyncReadTests(TestCase):
+    """The async/ endpoints must answer exactly as the sync views they mirror."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Async", "User", "async@example.com", "password", is_active=True)
+        food = Category.objects.create(name="Food", type="expense", classification="need")
+        for day in range(1, 4):
+            Income.objects.create(user=cls.user, amount=100 * day, date=date(2024, 1, day))
+            Expense.objects.create(user=cls.user, amount=day, date=date(2024, 1, day), category=food)
+            Transaction.objects.create(user=cls.user, transaction_type="expense", amount=day, category=food)
+        cls.auth = {"headers": {"Authorization": f"Bearer {AccessToken.for_user(cls.user)}"}}
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_matches_sync_views(self):
+        for sync_name, async_name, query in (
+            ("income-list-create", "async-income-list", "?page_size=2"),
+            ("expense-list-create", "async-expense-list", ""),
+            ("transaction-list-create", "async-transaction-list", "?page_size=1"),
+            ("summary", "async-summary", "?start_date=2024-01-01&end_date=2024-12-31"),
+        ):
+            with self.subTest(name=async_name):
+                expected = await sync_to_async(self.client.get)(reverse(sync_name) + query, **self.auth)
+                response = await self.async_client.get(reverse(async_name) + query, **self.auth)
+                self.assertEqual(response.status_code, 200)
+                # Cursor links point back at the view that produced them
+                self.assertEqual(response.content.replace(b"/async/", b"/"), expected.content)
+                self.assertIn('queries"', response["Server-Timing"])
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse("async-income-list"))
+        self.assertEqual(response.status_code, 401)
+        self.assertIn("WWW-Authenticate", response)
+        response = await self.async_client.get(reverse("async-summary") + "?start_date=2024-02-01&end_date=2024-01-01",
+                                               **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+
+class DatabasePoolTests(APITestCase):
+    def test_staff_only(self):
+        user = User.objects.create_user("Pool", "User", "pool@example.com", "password")
+        self.client.force_authenticate(user)
+        self.assertEqual(self.client.get(reverse("db-pool-metrics")).status_code, 403)
+
+        user.is_staff = True
+        user.save()
+        response = self.client.get(reverse("db-pool-metrics"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["conn_max_age"], connection.settings_dict["CONN_MAX_AGE"])
+        self.assertEqual(response.data["pooled"], "pool" in connection.settings_dict["OPTIONS"])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class RequestMetricsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("Metrics", "User", "metrics@example.com", "password", is_staff=True)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+        self.client.delete(reverse("request-metrics"))
+
+    def test_server_timing_and_histograms(self):
+        response = self.client.get(reverse("income-list-create"))
+        self.assertIn('db;dur=', response["Server-Timing"])
+        self.assertIn("total;dur=", response["Server-Timing"])
+
+        endpoints = self.client.get(reverse("request-metrics")).data["endpoints"]
+        income_list = endpoints["GET income-list-create"]
+        self.assertEqual(income_list["count"], 1)
+        self.assertEqual(sum(income_list["metrics"]["queries"]["buckets"].values()), 1)
+
+    @override_settings(PERF_BUDGETS={"GET income-list-create": {"queries": 0}}, PERF_BUDGET_ACTION="raise")
+    def test_budget_fails_the_request_in_tests(self):
+        with self.assertRaises(PerformanceBudgetExceeded):
+            self.client.get(reverse("income-list-create"))
+
+
+class TaskMetricsTests(TestCase):
+    def test_prometheus_exposition(self):
+        text = render_prometheus({
+            "finance.tasks.prune_tombstones": {
+                "runs:SUCCESS": 2.0, "runs:FAILURE": 1.0, "rows": 40.0,
+                "runtime_count": 3.0, "runtime_sum": 0.75, "runtime_bucket:0.1": 2.0, "runtime_bucket:1": 1.0,
+            },
+        })
+        task = 'task="finance.tasks.prune_tombstones"'
+        self.assertIn(f'celery_task_runs_total{{{task},state="FAILURE"}} 1', text)
+        self.assertIn(f"celery_task_rows_processed_total{{{task}}} 40", text)
+        # Buckets are cumulative and end with +Inf == _count
+        self.assertIn(f'celery_task_runtime_seconds_bucket{{{task},le="0.05"}} 0', text)
+        self.assertIn(f'celery_task_runtime_seconds_bucket{{{task},le="0.5"}} 2', text)
+        self.assertIn(f'celery_task_runtime_seconds_bucket{{{task},le="+Inf"}} 3', text)
+        self.assertIn(f"celery_task_runtime_seconds_sum{{{task}}} 0.75", text)
+        self.assertNotIn("celery_task_queue_latency_seconds_count", text)
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, messages):
+        raise ConnectionRefusedError("SMTP server unavailable")
+
+
+class RejectingEmailBackend(locmem.EmailBackend):
+    """Refuses mail to rejected@example.com and counts the connections opened."""
+    connections = 0
+
+    def open(self):
+        type(self).connections += 1
+
+    def send_messages(self, messages):
+        if any("rejected@example.com" in message.to for message in messages):
+            raise smtplib.SMTPRecipientsRefused({"rejected@example.com": (550, b"No such user")})
+        return super().send_messages(messages)
+
+
+@override_settings(CACHES=LOCMEM_CACHES, EMAIL_BACKEND="finance.tests.RejectingEmailBackend")
+class OutboxTests(TestCase):
+    def setUp(self):
+        RejectingEmailBackend.connections = 0
+
+    def test_batches_share_one_connection(self):
+        for n in range(3):
+            outbox.enqueue(f"Message {n}", "Body", [f"user{n}@example.com"], html_body="<p>Body</p>")
+        self.assertEqual(outbox.flush(2), (2, 2))
+        self.assertEqual([message.subject for message in mail.outbox], ["Message 0", "Message 1"])
+        self.assertEqual(mail.outbox[0].alternatives[0][1], "text/html")
+        self.assertEqual(RejectingEmailBackend.connections, 1)
+        self.assertEqual(outbox.flush(2), (1, 1))
+        self.assertFalse(OutboundEmail.objects.exists())
+
+    def test_rejected_messages_are_parked(self):
+        outbox.enqueue("Bounce", "Body", ["rejected@example.com"])
+        outbox.enqueue("Fine", "Body", ["fine@example.com"])
+        with self.assertLogs("finance.outbox", "ERROR"):
+            self.assertEqual(outbox.flush(10), (1, 2))
+        parked = OutboundEmail.objects.get()
+        self.assertEqual((parked.subject, parked.attempts), ("Bounce", 1))
+        self.assertIsNotNone(parked.failed_at)
+        # Never picked up again
+        self.assertEqual(outbox.flush(10), (0, 0))
+
+    @override_settings(EMAIL_BACKEND="finance.tests.FailingEmailBackend", EMAIL_MAX_ATTEMPTS=2)
+    def test_connection_failures_keep_messages_queued(self):
+        outbox.enqueue("Later", "Body", ["someone@example.com"])
+        for attempts in (1, 2):
+            with self.assertRaises(ConnectionRefusedError):
+                outbox.flush(10)
+            email = OutboundEmail.objects.get()
+            self.assertEqual(email.attempts, attempts)
+        self.assertIsNotNone(email.failed_at)
+
+    def test_send_email_async_joins_the_outbox(self):
+        # Messages published by the old task before a deploy are still delivered, in the next batch
+        send_email_async.apply(args=["Subject", "Body", ["someone@example.com"]])
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(outbox.flush(10), (1, 1))
+        self.assertEqual(mail.outbox[0].to, ["someone@example.com"])
+
+    def test_password_reset_is_queued(self):
+        User.objects.create_user("Reset", "User", "reset@example.com", "password", is_active=True)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post("/auth/users/reset_password/", {"email": "reset@example.com"})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(OutboundEmail.objects.get().to, ["reset@example.com"])
+        self.assertEqual(len(callbacks), 1)  # schedule_flush
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class BenchmarkSuiteTests(TransactionTestCase):
+    # Rolled-back COPYs would leave the ledger tables' dead pages behind and change other tests' query plans;
+    # a TransactionTestCase truncates the tables afterwards instead
+    def generate(self):
+        synthetic.generate(2, 300, seed=7, end_date=date(2024, 6, 30), analyze=False)
+        return self.generated_rows()
+
+    def generated_rows(self):
+        return list(Expense.objects.filter(user__email__endswith=synthetic.SYNTHETIC_EMAIL_DOMAIN)
+                    .order_by("user__email", "date", "amount").values_list("user__email", "date", "amount"))
+
+    def test_generation_is_reproducible(self):
+        first = self.generate()
+        self.assertEqual(len(first), 180)
+        synthetic.clear()
+        self.assertEqual(self.generate(), first)
+
+    def test_rerunning_a_seed_without_clear_is_refused(self):
+        first = self.generate()
+        with self.assertRaisesMessage(CommandError, "seed 7 already exist"):
+            call_command("generate_synthetic_data", "--users", "2", "--rows", "300", "--seed", "7",
+                         stdout=io.StringIO())
+        self.assertEqual(self.generated_rows(), first)
+
+    def test_suite_reports_every_case(self):
+        self.generate()
+        report = benchmarks.run_suite(repeat=1, page_sizes=[10], serializer_rows=20)
+        names = {result["name"] for result in report["results"]}
+        self.assertIn("list.incomes", names)
+        self.assertIn("serialize.expenses.rowformat", names)
+        self.assertIn("tasks.add_recurring_income", names)
+        self.assertEqual(report["dataset"]["synthetic_users"], 2)
+        json.dumps(report)
@@ -4,12 +4,24 @@ from .views import (
     test_task_view,
     IncomeListCreateAPIView,
     IncomeDetailAPIView,
+    IncomeBulkAPIView,
     ExpenseListCreateAPIView,
     ExpenseDetailAPIView,
+    ExpenseBulkAPIView,
     CategoryListAPIView,
+    SummaryAPIView,
+    SyncAPIView,
+    LedgerExportAPIView,
     BudgetListCreateAPIView,
     TransactionListCreateAPIView,
-    GPayTransactionUploadView
+    TransactionUploadView,
+    ImportJobDetailAPIView,
+    DatabasePoolAPIView,
+    RequestMetricsAPIView,
+    AsyncIncomeListView,
+    AsyncExpenseListView,
+    AsyncTransactionListView,
+    AsyncSummaryView,
 )
 
 urlpatterns = [
@@ -20,15 +32,28 @@ urlpatterns = [
     path("test-task/", test_task_view, name="test_task"),
     path("incomes/", IncomeListCreateAPIView.as_view(), name="income-list-create"),
     path("incomes/<int:pk>/", IncomeDetailAPIView.as_view(), name="income-detail"),
+    path("incomes/bulk/", IncomeBulkAPIView.as_view(), name="income-bulk"),
     path("expenses/", ExpenseListCreateAPIView.as_view(), name="expense-list-create"),
     path("expenses/<int:pk>/", ExpenseDetailAPIView.as_view(), name="expense-detail"),
+    path("expenses/bulk/", ExpenseBulkAPIView.as_view(), name="expense-bulk"),
     path("categories/", CategoryListAPIView.as_view(), name="category-list"),
+    path("summary/", SummaryAPIView.as_view(), name="summary"),
+    path("sync/", SyncAPIView.as_view(), name="sync"),
+    path("export/<str:kind>/", LedgerExportAPIView.as_view(), name="ledger-export"),
     path("budgets/", BudgetListCreateAPIView.as_view(), name="budget-list-create"),
     path(
         "transactions/",
         TransactionListCreateAPIView.as_view(),
         name="transaction-list-create",
     ),
-    path('upload-transactions/', GPayTransactionUploadView.as_view(), name='upload-transactions'),
+    path('upload-transactions/', TransactionUploadView.as_view(), name='upload-transactions'),
+    path("import-jobs/<int:pk>/", ImportJobDetailAPIView.as_view(), name="import-job-detail"),
+    path("metrics/db-pool/", DatabasePoolAPIView.as_view(), name="db-pool-metrics"),
+    path("metrics/requests/", RequestMetricsAPIView.as_view(), name="request-metrics"),
+    # Async versions of the dashboard reads, for ASGI servers
+    path("async/incomes/", AsyncIncomeListView.as_view(), name="async-income-list"),
+    path("async/expenses/", AsyncExpenseListView.as_view(), name="async-expense-list"),
+    path("async/transactions/", AsyncTransactionListView.as_view(), name="async-transaction-list"),
+    path("async/summary/", AsyncSummaryView.as_view(), name="async-summary"),
 ]
 
@@ -1,4 +1,5 @@
 import logging
+import os
 from django.shortcuts import render
 from django.http import HttpResponse
 from rest_framework import generics
@@ -9,25 +10,85 @@ from .serializers import (
     CategorySerializer,
     BudgetSerializer,
     TransactionSerializer,
+    BULK_MAX_ITEMS,
 )
 from rest_framework.permissions import IsAuthenticated
+from .pagination import DateIdCursorPagination
+from .summary import get_summary, invalidate_summary
+from .budgets import with_utilisation
+from .categories import get_catalogue
+from .sync import changes_since, record_tombstones, ExpiredToken, InvalidToken
+from .signals import bulk_write
+from .export import EXPORT_COLUMNS, stream_export
+from .renderers import CSVRenderer, NDJSONRenderer
+from .rowformat import formatter_for
+from rest_framework.exceptions import NotFound, ParseError, ValidationError
+from django.http import StreamingHttpResponse
+from django.utils.text import compress_sequence
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
 from django.utils.dateparse import parse_date
-from .serializers import GPayTransactionUploadSerializer
+from .serializers import TransactionUploadSerializer
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from django.utils import timezone
+from django.db import transaction
+from . import rollups
 logger = logging.getLogger(__name__)
 
 def home(request):
     logger.info("hello")
-    print("hello")
     return render(request, "about.html")
 
-class IncomeListCreateAPIView(generics.ListCreateAPIView):
+class ValuesListMixin:
+    """
+    List GETs read ``.values()`` rows and format them with a compiled row formatter.
+
+    The response is identical to the serializer's, without building a model
+    instance and running every serializer field for each row.
+    """
+
+    def list(self, request, *args, **kwargs):
+        formatter = formatter_for(self.get_serializer_class())
+        queryset = self.filter_queryset(self.get_queryset()).values(*formatter.columns)
+        page = self.paginate_queryset(queryset)
+        rows = list(queryset) if page is None else page
+        data = formatter.format(rows, self.get_serializer_context())
+        if page is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class RowLockMixin:
+    """
+    PUT, PATCH and DELETE lock the row they read until the write commits.
+
+    The rollups subtract the row's old amount, date and category, so a
+    concurrent write must not change it between reading and saving, as in
+    BulkWriteAPIView.
+    """
+    locking_methods = ("PUT", "PATCH", "DELETE")
+
+    def lock_for_write(self, queryset):
+        if self.request.method in self.locking_methods:
+            return queryset.select_for_update()
+        return queryset
+
+    def update(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().update(request, *args, **kwargs)
+
+    def destroy(self, request, *args, **kwargs):
+        with transaction.atomic():
+            return super().destroy(request, *args, **kwargs)
+
+
+class IncomeListCreateAPIView(ValuesListMixin, generics.ListCreateAPIView):
     queryset = Income.objects.all()
     serializer_class = IncomeSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = DateIdCursorPagination
 
     def get_queryset(self):
         # Get the logged-in user
@@ -37,7 +98,7 @@ class IncomeListCreateAPIView(generics.ListCreateAPIView):
         date_param = self.request.query_params.get("date", None)
 
         # Filter by user and optionally by date
-        queryset = Income.objects.filter(user=user)
+        queryset = Income.objects.filter(user=user).order_by("-date", "id")
         if date_param:
             date = parse_date(date_param)
             if date:
@@ -50,25 +111,31 @@ class IncomeListCreateAPIView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class IncomeDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class IncomeDetailAPIView(RowLockMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Income.objects.all()
     serializer_class = IncomeSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # Ensure the user can only access their own income entries
-        return Income.objects.filter(user=self.request.user)
+        return self.lock_for_write(Income.objects.filter(user=self.request.user))
 
     def perform_update(self, serializer):
         # Ensure the user is correctly set during update and remains unchanged
-        print("i had been here")
+        logger.debug("Updating income %s for user %s", serializer.instance.pk, self.request.user.pk)
         serializer.save(user=self.request.user)
 
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            rollups.record("income", [instance], sign=-1)
+            instance.delete()
+
 
-class ExpenseListCreateAPIView(generics.ListCreateAPIView):
+class ExpenseListCreateAPIView(ValuesListMixin, generics.ListCreateAPIView):
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = DateIdCursorPagination
 
     def get_queryset(self):
         # Get the logged-in user
@@ -78,7 +145,7 @@ class ExpenseListCreateAPIView(generics.ListCreateAPIView):
         date_param = self.request.query_params.get("date", None)
 
         # Filter by user and optionally by date
-        queryset = Expense.objects.filter(user=user)
+        queryset = Expense.objects.filter(user=user).order_by("-date", "id")
         if date_param:
             date = parse_date(date_param)
             if date:
@@ -91,14 +158,92 @@ class ExpenseListCreateAPIView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class ExpenseDetailAPIView(generics.RetrieveUpdateDestroyAPIView):
+class ExpenseDetailAPIView(RowLockMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Expense.objects.all()
     serializer_class = ExpenseSerializer
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
         # Ensure the user can only access their own expense entries
-        return Expense.objects.filter(user=self.request.user)
+        return self.lock_for_write(Expense.objects.filter(user=self.request.user))
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            rollups.record("expense", [instance], sign=-1)
+            instance.delete()
+
+
+class BulkWriteAPIView(generics.GenericAPIView):
+    """
+    Batch writes for one of the user's row types.
+
+    - POST a list of objects to create them.
+    - PATCH a list of objects, each with its ``id``, to update them.
+    - DELETE a list of ids to remove them.
+
+    Each batch is validated in one pass and written in one transaction. A 400
+    carries one entry per input item, empty for the items that were valid.
+    """
+    permission_classes = [IsAuthenticated]
+    rollup_type = None
+
+    def get_queryset(self):
+        return self.get_serializer_class().Meta.model.objects.filter(user=self.request.user)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(user=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def patch(self, request, *args, **kwargs):
+        ids = [self.parse_id(item.get("id") if isinstance(item, dict) else None) for item in self.items(request)]
+        with transaction.atomic():
+            rows = list(self.get_queryset().filter(pk__in=ids).select_for_update())
+            serializer = self.get_serializer(rows, data=request.data, many=True, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save(user=request.user)
+        return Response(serializer.data)
+
+    def delete(self, request, *args, **kwargs):
+        ids = [self.parse_id(value) for value in self.items(request)]
+        with transaction.atomic():
+            rows = list(self.get_queryset().filter(pk__in=ids).select_for_update())
+            found = {row.pk for row in rows}
+            errors = [{} if pk in found else {"id": ["Not found."]} for pk in ids]
+            if any(errors):
+                return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+            rollups.record(self.rollup_type, rows, sign=-1)
+            # One tombstone insert and one summary invalidation instead of a pair per row
+            with bulk_write():
+                self.get_queryset().filter(pk__in=found).delete()
+            record_tombstones(self.rollup_type, rows)
+            transaction.on_commit(lambda: invalidate_summary(request.user.pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def items(self, request):
+        if not isinstance(request.data, list) or not request.data:
+            raise ValidationError({"non_field_errors": ["Expected a non-empty list."]})
+        if len(request.data) > BULK_MAX_ITEMS:
+            raise ValidationError({"non_field_errors": [f"Ensure this field has no more than {BULK_MAX_ITEMS} elements."]})
+        return request.data
+
+    def parse_id(self, value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+
+class IncomeBulkAPIView(BulkWriteAPIView):
+    serializer_class = IncomeSerializer
+    rollup_type = "income"
+
+
+class ExpenseBulkAPIView(BulkWriteAPIView):
+    serializer_class = ExpenseSerializer
+    rollup_type = "expense"
 
 
 class CategoryListAPIView(generics.ListAPIView):
@@ -106,6 +251,99 @@ class CategoryListAPIView(generics.ListAPIView):
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated]
 
+    def list(self, request, *args, **kwargs):
+        # Served from the in-process catalogue; clients revalidate with If-None-Match / If-Modified-Since
+        catalogue = get_catalogue()
+        response = get_conditional_response(
+            request, etag=catalogue.etag, last_modified=catalogue.last_modified
+        )
+        if response is None:
+            response = Response(self.get_serializer(catalogue.categories, many=True).data)
+        response["ETag"] = catalogue.etag
+        response["Last-Modified"] = http_date(catalogue.last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class SummaryAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        return Response(get_summary(request.user, *summary_range(request)))
+
+
+def summary_range(request):
+    """The ``start_date``/``end_date`` query parameters, defaulting to the current calendar year."""
+    today = timezone.now().date()
+    start_date = parse_date(request.query_params.get("start_date", "")) or today.replace(month=1, day=1)
+    end_date = parse_date(request.query_params.get("end_date", "")) or today.replace(month=12, day=31)
+    if start_date > end_date:
+        raise ParseError("start_date must not be after end_date.")
+    return start_date, end_date
+
+
+class SyncAPIView(APIView):
+    """
+    Incomes and expenses changed since ``?since=<token>``, plus the ids deleted, and the token for next time.
+
+    At most ``?page_size=`` rows of each kind are sent; while ``has_more`` is true,
+    call again with the returned token to get the rest.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        try:
+            changed, deleted, token, has_more = changes_since(
+                request.user,
+                request.query_params.get("since"),
+                page_size=DateIdCursorPagination().get_page_size(request),
+            )
+        except ExpiredToken:
+            return Response(
+                {"detail": "Sync token has expired; fetch everything again without since."},
+                status=status.HTTP_410_GONE,
+            )
+        except InvalidToken:
+            return Response({"detail": "Invalid sync token."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Shared so both serializers resolve categories from one catalogue lookup
+        context = {"request": request}
+        return Response({
+            "since": token,
+            "has_more": has_more,
+            "incomes": IncomeSerializer(changed["income"], many=True, context=context).data,
+            "expenses": ExpenseSerializer(changed["expense"], many=True, context=context).data,
+            "deleted": {"incomes": deleted["income"], "expenses": deleted["expense"]},
+        })
+
+
+class LedgerExportAPIView(APIView):
+    """Streams the user's incomes, expenses or transactions as CSV (default) or NDJSON, gzipped when accepted."""
+    permission_classes = [IsAuthenticated]
+    renderer_classes = [CSVRenderer, NDJSONRenderer]
+
+    def get(self, request, kind, *args, **kwargs):
+        if kind not in EXPORT_COLUMNS:
+            raise NotFound()
+        start_date = parse_date(request.query_params.get("start_date", ""))
+        end_date = parse_date(request.query_params.get("end_date", ""))
+        renderer = request.accepted_renderer
+
+        body = (chunk.encode(renderer.charset) for chunk in stream_export(
+            kind, renderer.format, request.user, start_date, end_date
+        ))
+        filename = f"{kind}.{renderer.format}"
+        gzipped = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if gzipped:
+            body = compress_sequence(body)
+
+        response = StreamingHttpResponse(body, content_type=f"{renderer.media_type}; charset={renderer.charset}")
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        if gzipped:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept", "Accept-Encoding"))
+        return response
+
 
 class BudgetListCreateAPIView(generics.ListCreateAPIView):
     queryset = Budget.objects.all()
@@ -113,22 +351,25 @@ class BudgetListCreateAPIView(generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
-        # Filter budget entries for the logged-in user
-        return Budget.objects.filter(user=self.request.user)
+        # Filter budget entries for the logged-in user, with spend so far computed in the same query
+        return with_utilisation(Budget.objects.filter(user=self.request.user)).order_by("id")
 
     def perform_create(self, serializer):
         # Assign the current logged-in user to the budget
-        serializer.save(user=self.request.user)
+        budget = serializer.save(user=self.request.user)
+        # Re-read it so the response carries spent/remaining/pct_used
+        serializer.instance = self.get_queryset().get(pk=budget.pk)
 
 
-class TransactionListCreateAPIView(generics.ListCreateAPIView):
+class TransactionListCreateAPIView(ValuesListMixin, generics.ListCreateAPIView):
     queryset = Transaction.objects.all()
     serializer_class = TransactionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = DateIdCursorPagination
 
     def get_queryset(self):
         # Filter transactions for the logged-in user
-        return Transaction.objects.filter(user=self.request.user)
+        return Transaction.objects.filter(user=self.request.user).order_by("-date", "id")
 
     def perform_create(self, serializer):
         # Assign the current logged-in user to the transaction
@@ -143,124 +384,170 @@ def test_task_view(request):
     result = add.delay(4, 6)
     return JsonResponse({"task_id": result.id})
 
-from bs4 import BeautifulSoup
-from datetime import datetime
-from .models import Income, Expense
-from django.utils import timezone
-import re
-
-
-def parse_gpay_html(file_content, start_date, end_date, user, exclude_gt, exclude_lt):
-    MAX_LENGTH = 100  
-    print("egt", exclude_gt)
-    print("elt", exclude_lt)
-    
-
-    exclude_gt = exclude_gt if exclude_gt is not None else float('inf')  # Default to infinity if not provided
-    exclude_lt = exclude_lt if exclude_lt is not None else float('-inf')  # Default to negative infinity if not provided
-
-    start_date = datetime.combine(start_date, datetime.min.time())
-    end_date = datetime.combine(end_date, datetime.max.time())
-
-    soup = BeautifulSoup(file_content, 'lxml')
-    transactions = soup.find_all("div", class_="outer-cell mdl-cell mdl-cell--12-col mdl-shadow--2dp")
-    date_pattern = re.compile(r'\d{1,2} \w{3,4} \d{4}, \d{2}:\d{2}:\d{2}')
-    amount_pattern = re.compile(r'₹([\d,]+(\.\d{1,2})?)')
-
-    for transaction in transactions:
-        transaction_info = transaction.find("div", class_="content-cell mdl-cell mdl-cell--6-col mdl-typography--body-1")
-        
-        if transaction_info:
-            details = transaction_info.text.strip()
-            date_match = date_pattern.search(details)
-            if date_match:
-                date_text = date_match.group(0)
-                date_text = date_text.replace("Sept", "Sep")
-                try:
-                    transaction_date = datetime.strptime(date_text, '%d %b %Y, %H:%M:%S')
-                    print("td", transaction_date)
-                    if not (start_date <= transaction_date <= end_date):
-                        continue
-
-                    # Determine transaction type
-                    if "Received" in details:
-                        transaction_type = "income"
-                    elif "Paid" in details or "Sent" in details:
-                        transaction_type = "expense"
-                    else:
-                        transaction_type = "unknown"
-
-                    # Extract amount
-                    amount_match = amount_pattern.search(details)
-                    amount = float(amount_match.group(1).replace(',', '')) if amount_match else 0.0
-
-                    # Extract recipient or source
-                    if transaction_type == "income":
-                        recipient = "Received from"
-                    elif "to" in details:
-                        recipient = details.split(' to ')[1].split('\n')[0].strip()
-                    elif "using" in details:
-                        recipient = details.split(' using ')[0].split(' ')[-1].strip()
-                    else:
-                        recipient = "Unknown"
-
-                    recipient = recipient[:MAX_LENGTH]
-                    description = details[:MAX_LENGTH]
-
-                    print("amount", amount)
-
-                    duplicate_exists = False
-                    
-                    # Filter transactions based on exclude_gt and exclude_lt
-                    if exclude_lt <= amount <= exclude_gt:
-                        if transaction_type == "income":
-                            duplicate_exists = Income.objects.filter(
-                                user=user,
-                                amount=amount,
-                                date=transaction_date,
-                                income_source=recipient,
-                                description=details
-                            ).exists()
-                            if not duplicate_exists:
-                                Income.objects.create(
-                                    user=user,
-                                    amount=amount,
-                                    date=transaction_date,
-                                    income_source=recipient,
-                                    description=details
-                                )
-                        elif transaction_type == "expense":
-                            duplicate_exists = Expense.objects.filter(
-                                user=user,
-                                amount=amount,
-                                date=transaction_date,
-                                recipient=recipient,
-                                description=details
-                            ).exists()
-                            if not duplicate_exists:
-                                Expense.objects.create(
-                                    user=user,
-                                    amount=amount,
-                                    date=transaction_date,
-                                    recipient=recipient,
-                                    description=details
-                                )
-                except ValueError:
-                    continue
-
-
-class GPayTransactionUploadView(APIView):
+from celery.result import AsyncResult
+from celery.utils import uuid
+from .models import ImportJob
+from .serializers import ImportJobSerializer
+from .tasks import import_statement, shard_progress
+
+
+class TransactionUploadView(APIView):
+    permission_classes = [IsAuthenticated]
+
     def post(self, request, *args, **kwargs):
-        serializer = GPayTransactionUploadSerializer(data=request.data)
+        serializer = TransactionUploadSerializer(data=request.data)
         if serializer.is_valid():
-            file = serializer.validated_data['file']
-            start_date = serializer.validated_data['start_date']
-            end_date = serializer.validated_data['end_date']
-            exclude_gt = serializer.validated_data.get('exclude_gt')  # Default to None if not provided
-            exclude_lt = serializer.validated_data.get('exclude_lt')  # Default to None if not provided
+            # Store the upload and hand it to a worker; the client polls the job for progress
+            job = ImportJob.objects.create(
+                user=request.user,
+                file=serializer.validated_data['file'],
+                format=serializer.validated_data['format'],
+                start_date=serializer.validated_data['start_date'],
+                end_date=serializer.validated_data['end_date'],
+                exclude_gt=serializer.validated_data.get('exclude_gt'),  # Default to None if not provided
+                exclude_lt=serializer.validated_data.get('exclude_lt'),  # Default to None if not provided
+                task_id=uuid(),
+            )
+            transaction.on_commit(
+                lambda: import_statement.apply_async(args=[job.id], task_id=job.task_id)
+            )
+
+            return Response({"job_id": job.id, "status": job.status}, status=status.HTTP_202_ACCEPTED)
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class ImportJobDetailAPIView(generics.RetrieveAPIView):
+    serializer_class = ImportJobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return ImportJob.objects.filter(user=self.request.user)
+
+    def get_object(self):
+        job = super().get_object()
+        if job.status != "running":
+            return job
+        if job.shards > 1:
+            # The row holds the committed shards' counters; add what the running ones have reported
+            for key, value in shard_progress(job).items():
+                field = ImportJob.COUNTER_FIELDS[key]
+                setattr(job, field, getattr(job, field) + value)
+        elif job.task_id:
+            # Live counters published by import_statement while it runs
+            result = AsyncResult(job.task_id)
+            if result.state == "PROGRESS" and isinstance(result.info, dict):
+                for key, field in ImportJob.COUNTER_FIELDS.items():
+                    setattr(job, field, result.info.get(key, 0))
+        return job
+
+
+from rest_framework.permissions import IsAdminUser
+from .dbpool import pool_stats
+from .instrumentation import histograms
+
+
+class DatabasePoolAPIView(APIView):
+    """Connection reuse and pool statistics of the process serving the request, for staff."""
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(pool_stats())
+
+
+class RequestMetricsAPIView(APIView):
+    """
+    Request histograms collected by RequestMetricsMiddleware in the process serving the request, for staff.
+
+    DELETE clears them, e.g. before a load test.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response({"pid": os.getpid(), "endpoints": histograms.snapshot()})
+
+    def delete(self, request):
+        histograms.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+from asgiref.sync import sync_to_async
+from django.views import View
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+from .renderers import FastJSONRenderer
+from .summary import aget_summary
+
+
+class AsyncReadView(View):
+    """
+    Base for the read-only endpoints under ``async/``, which run natively under ASGI.
+
+    DRF views are synchronous, so these are plain Django async views that reuse
+    DRF's authentication classes and the JSON renderer. Authentication loads
+    the user through the ORM and so runs on a thread; the rest of the request
+    awaits the async ORM and cache APIs, leaving the event loop free to serve
+    other requests while Postgres and Redis answer.
+    """
+    http_method_names = ["get", "head", "options"]
+
+    async def dispatch(self, request, *args, **kwargs):
+        request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+        try:
+            user = await sync_to_async(lambda: request.user)()
+            if not user.is_authenticated:
+                raise NotAuthenticated()
+            return await super().dispatch(request, *args, **kwargs)
+        except APIException as exc:
+            return self.error_response(request, exc)
+
+    def error_response(self, request, exc):
+        data = exc.detail if isinstance(exc.detail, (list, dict)) else {"detail": exc.detail}
+        response = self.json_response(data, status=exc.status_code)
+        if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+            # As APIView does: a 401 challenge when the authenticator has one, else a 403
+            header = request.authenticators[0].authenticate_header(request) if request.authenticators else None
+            if header:
+                response["WWW-Authenticate"] = header
+            else:
+                response.status_code = status.HTTP_403_FORBIDDEN
+        return response
+
+    @staticmethod
+    def json_response(data, status=status.HTTP_200_OK):
+        return HttpResponse(FastJSONRenderer().render(data), content_type="application/json", status=status)
+
+
+class AsyncListView(AsyncReadView):
+    """
+    The GET side of ``list_view`` (a ValuesListMixin view), with the same queryset, pages and body.
+
+    The queryset, serializer and paginator come from an instance of the sync
+    view, so the two cannot drift apart.
+    """
+    list_view = None
+
+    async def get(self, request, *args, **kwargs):
+        view = self.list_view(request=request, args=args, kwargs=kwargs, format_kwarg=None)
+        formatter = formatter_for(view.get_serializer_class())
+        queryset = view.filter_queryset(view.get_queryset()).values(*formatter.columns)
+        rows = await view.paginator.apaginate_queryset(queryset, request)
+        data = await formatter.aformat(rows, view.get_serializer_context())
+        return self.json_response(view.paginator.get_paginated_data(data))
+
+
+class AsyncIncomeListView(AsyncListView):
+    list_view = IncomeListCreateAPIView
+
+
+class AsyncExpenseListView(AsyncListView):
+    list_view = ExpenseListCreateAPIView
+
+
+class AsyncTransactionListView(AsyncListView):
+    list_view = TransactionListCreateAPIView
 
-            file_content = file.read().decode('utf-8')
-            parse_gpay_html(file_content, start_date, end_date, request.user,exclude_gt,exclude_lt)
 
-            return Response({"message": "Transactions added successfully."}, status=status.HTTP_201_CREATED)
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+class AsyncSummaryView(AsyncReadView):
+    async def get(self, request, *args, **kwargs):
+        return self.json_response(await aget_summary(request.user, *summary_range(request)))
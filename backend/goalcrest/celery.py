@@ -4,6 +4,7 @@ import os
 from celery import Celery
 from django.conf import settings
 from celery.schedules import crontab
+from celery.signals import worker_process_shutdown
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "goalcrest.settings")
 
@@ -13,14 +14,36 @@ app.config_from_object("django.conf:settings", namespace="CELERY")
 app.autodiscover_tasks()
 
 
+@worker_process_shutdown.connect
+def close_database_pools(**kwargs):
+    # Celery's Django fixup recycles connections around each task; a pool also has to be shut down with the child
+    from django.db import connections
+    for connection in connections.all(initialized_only=True):
+        if getattr(connection, "pool", None) is not None:
+            connection.close_pool()
+
+
 @app.task(bind=True)
 def debug_task(self):
     print("Request: {0!r}".format(self.request))
 
 
 app.conf.beat_schedule = {
-    'add-recurring-income-daily-midnight': {
-        'task': 'finance.tasks.add_recurring_income',
-        'schedule': crontab(hour=10, minute=0),  
+    'run-recurrence-daily': {
+        'task': 'finance.tasks.run_recurrence',
+        'schedule': crontab(hour=10, minute=0),
+    },
+    'evaluate-budget-alerts-hourly': {
+        'task': 'finance.tasks.evaluate_budget_alerts',
+        'schedule': crontab(minute=30),
+    },
+    # Catches messages whose flush gave up while the mail server was down
+    'flush-email-outbox': {
+        'task': 'finance.tasks.flush_email_outbox',
+        'schedule': crontab(minute='*/5'),
+    },
+    'prune-sync-tombstones-daily': {
+        'task': 'finance.tasks.prune_tombstones',
+        'schedule': crontab(hour=3, minute=0),
     },
 }
\ No newline at end of file
@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 from dotenv import load_dotenv
 from datetime import timedelta
 
@@ -28,6 +29,9 @@ SECRET_KEY = "django-insecure-o&0^#)dnx&+ks9a0hc8*2e$^70*fx@dz0$(&=cx6ocamh1x10u
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# Running under manage.py test
+TESTING = sys.argv[1:2] == ["test"]
+
 ALLOWED_HOSTS = ['*']
 
 
@@ -50,6 +54,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    # First, so its timings cover every other middleware
+    "finance.instrumentation.RequestMetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -100,9 +106,26 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        # Seconds a connection is reused across requests (0 closes it after each one), pinged before reuse.
+        # Celery's Django fixup applies the same policy around every task.
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", "60")),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
+        "OPTIONS": {},
     }
 }
 
+# psycopg connection pool, one per process, instead of persistent connections (needs psycopg-pool).
+# Suits threaded or async web servers; prefork Celery children run one task at a time and gain little.
+if os.getenv("DB_POOL") == "True":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # Django returns connections to the pool instead
+    DATABASES["default"]["OPTIONS"]["pool"] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),  # Seconds a request waits for a free connection
+        "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", "3600")),
+        "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "600")),
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -125,8 +148,17 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework_simplejwt.authentication.JWTAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "finance.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    # Rows per page on the cursor-paginated finance lists (clients may ask for up to 1000 via ?page_size=)
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", "100")),
 }
 
+# PAGE_SIZE is read by the per-view DateIdCursorPagination, not by a global DEFAULT_PAGINATION_CLASS
+SILENCED_SYSTEM_CHECKS = ["rest_framework.W001"]
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.1/topics/i18n/
@@ -145,6 +177,10 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Uploaded files (GPay exports waiting for the import worker, attachments)
+MEDIA_URL = "media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
@@ -158,6 +194,13 @@ EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER")
 EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD")
 EMAIL_PORT = int(os.getenv("EMAIL_PORT", "587"))  # Default to 587 if not set
 EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS") == "True"  # Convert to boolean
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "30"))  # Seconds before a stalled SMTP server fails the batch
+
+# finance.outbox: messages queued within EMAIL_BATCH_DELAY seconds of each other go out as one batch of up to
+# EMAIL_BATCH_SIZE over a single SMTP connection. A message is given up on after EMAIL_MAX_ATTEMPTS failed flushes.
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "100"))
+EMAIL_BATCH_DELAY = int(os.getenv("EMAIL_BATCH_DELAY", "5"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "10"))
 
 ACCOUNT_EMAIL_VERIFICATION = os.getenv("ACCOUNT_EMAIL_VERIFICATION", "mandatory")
 ACCOUNT_EMAIL_CONFIRMATION_EXPIRE_DAYS = int(
@@ -199,9 +242,89 @@ DJOSER = {
     },
      'EMAIL': {
         'activation': 'finance.email.CustomActivationEmail',  # Use your custom email class
+        # The rest go through the outbox too, rather than over SMTP inside the request
+        'confirmation': 'finance.email.ConfirmationEmail',
+        'password_reset': 'finance.email.PasswordResetEmail',
+        'password_changed_confirmation': 'finance.email.PasswordChangedConfirmationEmail',
+        'username_changed_confirmation': 'finance.email.UsernameChangedConfirmationEmail',
+        'username_reset': 'finance.email.UsernameResetEmail',
     },
 }
 
+# Cache on the Redis instance that also serves as the Celery broker (separate database)
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_REDIS_URL", "redis://redis:6379/1"),
+    }
+}
+
+# Celery task counters and histograms (finance.taskmetrics), shared by every worker process
+TASK_METRICS_ENABLED = os.getenv("TASK_METRICS_ENABLED", str(not TESTING)) == "True"
+TASK_METRICS_REDIS_URL = os.getenv("TASK_METRICS_REDIS_URL", CACHES["default"]["LOCATION"])
+# Port on which each worker's main process serves them as Prometheus text at /metrics (unset: not served)
+TASK_METRICS_PORT = int(os.getenv("TASK_METRICS_PORT", "0"))
+
+# Upper bound on how long a /summary/ response is served from cache; writes clear it sooner
+SUMMARY_CACHE_TIMEOUT = int(os.getenv("SUMMARY_CACHE_TIMEOUT", "3600"))
+
+# /sync/ tokens step back this far so rows committed late by a slow transaction are still picked up
+SYNC_OVERLAP_SECONDS = int(os.getenv("SYNC_OVERLAP_SECONDS", "60"))
+# Deletions are remembered this long; clients with an older token must do a full sync
+SYNC_TOMBSTONE_RETENTION_DAYS = int(os.getenv("SYNC_TOMBSTONE_RETENTION_DAYS", "90"))
+
 # settings.py
 CELERY_BROKER_URL = "redis://redis:6379/0"  # Redis broker
 CELERY_RESULT_BACKEND = "redis://redis:6379/0"
+# Email goes through its own queue and worker (celery-email in docker-compose), so a burst of it never
+# holds up imports and recurrence, and a slow mail server only slows email
+CELERY_TASK_ROUTES = {
+    "finance.tasks.send_email_async": {"queue": "email"},
+    "finance.tasks.flush_email_outbox": {"queue": "email"},
+}
+
+# Split GPay exports into this many shards parsed and written by separate workers (1 = import serially)
+GPAY_IMPORT_SHARDS = int(os.getenv("GPAY_IMPORT_SHARDS", "1"))
+
+# Number of due recurring rules handled by each parallel recurrence task
+RECURRENCE_PARTITION_SIZE = int(os.getenv("RECURRENCE_PARTITION_SIZE", "5000"))
+
+# Percentages of a budget's amount at which its owner is emailed, once per level
+BUDGET_ALERT_THRESHOLDS = [int(level) for level in os.getenv("BUDGET_ALERT_THRESHOLDS", "80,100").split(",")]
+
+# Limits checked by finance.instrumentation.RequestMetricsMiddleware after every request, keyed by
+# "<METHOD> <url name>" or just "<url name>". Metrics: wall_ms, queries, db_ms, serialize_ms, render_ms, bytes.
+# Query counts include the JWT user lookup and a cold category catalogue.
+PERF_BUDGETS = {
+    "GET income-list-create": {"queries": 4},
+    "GET expense-list-create": {"queries": 4},
+    "GET transaction-list-create": {"queries": 4},
+    "GET budget-list-create": {"queries": 3},
+    "GET category-list": {"queries": 2},
+    "GET income-detail": {"queries": 3},
+    "GET expense-detail": {"queries": 3},
+    "GET summary": {"queries": 2},
+    "GET async-income-list": {"queries": 4},
+    "GET async-expense-list": {"queries": 4},
+    "GET async-transaction-list": {"queries": 4},
+    "GET async-summary": {"queries": 2},
+    "GET sync": {"queries": 6},
+}
+# "log" writes a warning for a request over budget; "raise" fails it, which is the default under manage.py test
+PERF_BUDGET_ACTION = os.getenv("PERF_BUDGET_ACTION", "raise" if TESTING else "log")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        # One JSON line per request from RequestMetricsMiddleware
+        "finance.requests": {
+            "handlers": ["console"],
+            "level": os.getenv("REQUEST_LOG_LEVEL", "WARNING" if TESTING else "INFO"),
+            "propagate": False,
+        },
+    },
+}
@@ -23,6 +23,7 @@ const IncomeExpenseCalendar = () => {
     expenses,
     selectedDateIncomes = [],
     selectedDateExpenses = [],
+    summary,
     loading 
   } = useSelector((state) => state.finance);
   
@@ -120,23 +121,14 @@ const IncomeExpenseCalendar = () => {
     }
   };
 
+  // Month totals come from the summary; only the newest page of rows is loaded
   const monthlyTotals = useMemo(() => {
     const totals = {};
-    
-    incomes.forEach(income => {
-      const monthKey = formatMonthKey(income.date);
-      if (!totals[monthKey]) totals[monthKey] = { income: 0, expense: 0 };
-      totals[monthKey].income += Number(income.amount);
-    });
-
-    expenses.forEach(expense => {
-      const monthKey = formatMonthKey(expense.date);
-      if (!totals[monthKey]) totals[monthKey] = { income: 0, expense: 0 };
-      totals[monthKey].expense += Number(expense.amount);
+    (summary?.by_month || []).forEach(({ month, income, expense }) => {
+      totals[month] = { income: Number(income), expense: Number(expense) };
     });
-
     return totals;
-  }, [incomes, expenses]);
+  }, [summary]);
 
   const tileContent = ({ date, view }) => {
     if (view === 'year') {
@@ -7,13 +7,25 @@ import axios from 'axios';
 
 const API_URL = `http://${window.location.hostname}:8000`
 
-// Async thunk for fetching incomes
-export const fetchIncomes = createAsyncThunk('finance/fetchIncomes', async (_, thunkAPI) => {
+// List endpoints are cursor-paginated: load one page and keep its `next` link for loading more on request
+const fetchPage = async (url, accessToken) => {
+  const response = await axios.get(url, {
+    headers: {
+      Authorization: `Bearer ${accessToken}`,
+    },
+  });
+  return { results: response.data.results, next: response.data.next };
+};
+
+// Dashboard totals cover every row, not just the pages loaded so far
+const SUMMARY_ALL_TIME = 'start_date=1900-01-01&end_date=2999-12-31';
+
+export const fetchSummary = createAsyncThunk('finance/fetchSummary', async (_, thunkAPI) => {
   try {
     const state = thunkAPI.getState();
     const accessToken = state.auth.accessToken;
 
-    const response = await axios.get(`${API_URL}/incomes/`, {
+    const response = await axios.get(`${API_URL}/summary/?${SUMMARY_ALL_TIME}`, {
       headers: {
         Authorization: `Bearer ${accessToken}`,
       },
@@ -24,6 +36,32 @@ export const fetchIncomes = createAsyncThunk('finance/fetchIncomes', async (_, t
   }
 });
 
+// Async thunk for fetching the first page of incomes
+export const fetchIncomes = createAsyncThunk('finance/fetchIncomes', async (_, thunkAPI) => {
+  try {
+    const state = thunkAPI.getState();
+    const accessToken = state.auth.accessToken;
+
+    return await fetchPage(`${API_URL}/incomes/`, accessToken);
+  } catch (error) {
+    return thunkAPI.rejectWithValue(error.response.data);
+  }
+});
+
+// Async thunk for appending the next page of incomes
+export const fetchMoreIncomes = createAsyncThunk('finance/fetchMoreIncomes', async (_, thunkAPI) => {
+  try {
+    const state = thunkAPI.getState();
+    const accessToken = state.auth.accessToken;
+
+    return await fetchPage(state.finance.incomesNext, accessToken);
+  } catch (error) {
+    return thunkAPI.rejectWithValue(error.response.data);
+  }
+}, {
+  condition: (_, { getState }) => Boolean(getState().finance.incomesNext) && !getState().finance.loadingMore,
+});
+
 // Async thunk for adding income
 export const addIncome = createAsyncThunk('finance/addIncome', async (incomeData, thunkAPI) => {
   try {
@@ -36,29 +74,39 @@ export const addIncome = createAsyncThunk('finance/addIncome', async (incomeData
       },
     });
     console.log("nm",response.data)
+    thunkAPI.dispatch(fetchSummary());
     return response.data;
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
   }
 });
 
-// Async thunk for fetching expenses
+// Async thunk for fetching the first page of expenses
 export const fetchExpenses = createAsyncThunk('finance/fetchExpenses', async (_, thunkAPI) => {
   try {
     const state = thunkAPI.getState();
     const accessToken = state.auth.accessToken;
 
-    const response = await axios.get(`${API_URL}/expenses/`, {
-      headers: {
-        Authorization: `Bearer ${accessToken}`,
-      },
-    });
-    return response.data;
+    return await fetchPage(`${API_URL}/expenses/`, accessToken);
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
   }
 });
 
+// Async thunk for appending the next page of expenses
+export const fetchMoreExpenses = createAsyncThunk('finance/fetchMoreExpenses', async (_, thunkAPI) => {
+  try {
+    const state = thunkAPI.getState();
+    const accessToken = state.auth.accessToken;
+
+    return await fetchPage(state.finance.expensesNext, accessToken);
+  } catch (error) {
+    return thunkAPI.rejectWithValue(error.response.data);
+  }
+}, {
+  condition: (_, { getState }) => Boolean(getState().finance.expensesNext) && !getState().finance.loadingMore,
+});
+
 // Async thunk for adding expense
 export const addExpense = createAsyncThunk('finance/addExpense', async (expenseData, thunkAPI) => {
   try {
@@ -70,6 +118,7 @@ export const addExpense = createAsyncThunk('finance/addExpense', async (expenseD
         Authorization: `Bearer ${accessToken}`,
       },
     });
+    thunkAPI.dispatch(fetchSummary());
     return response.data;
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
@@ -102,12 +151,9 @@ export const fetchIncomesByDate = createAsyncThunk('finance/fetchIncomesByDate',
     const state = thunkAPI.getState();
     const accessToken = state.auth.accessToken;
 
-    const response = await axios.get(`${API_URL}/incomes/?date=${date}`, {
-      headers: {
-        Authorization: `Bearer ${accessToken}`,
-      },
-    });
-    return response.data;
+    // A single day fits in one page
+    const { results } = await fetchPage(`${API_URL}/incomes/?date=${date}&page_size=1000`, accessToken);
+    return results;
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
   }
@@ -119,12 +165,8 @@ export const fetchExpensesByDate = createAsyncThunk('finance/fetchExpensesByDate
     const state = thunkAPI.getState();
     const accessToken = state.auth.accessToken;
 
-    const response = await axios.get(`${API_URL}/expenses/?date=${date}`, {
-      headers: {
-        Authorization: `Bearer ${accessToken}`,
-      },
-    });
-    return response.data;
+    const { results } = await fetchPage(`${API_URL}/expenses/?date=${date}&page_size=1000`, accessToken);
+    return results;
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
   }
@@ -142,6 +184,7 @@ export const updateIncome = createAsyncThunk('finance/updateIncome', async ({ id
         Authorization: `Bearer ${accessToken}`,
       },
     });
+    thunkAPI.dispatch(fetchSummary());
     return response.data;
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
@@ -159,6 +202,7 @@ export const deleteIncome = createAsyncThunk('finance/deleteIncome', async (id,
         Authorization: `Bearer ${accessToken}`,
       },
     });
+    thunkAPI.dispatch(fetchSummary());
     return id;
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
@@ -177,6 +221,7 @@ export const updateExpense = createAsyncThunk('finance/updateExpense', async ({
       },
     });
     console.log("dsfkjhfkgs",response)
+    thunkAPI.dispatch(fetchSummary());
     return response.data;
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
@@ -194,6 +239,7 @@ export const deleteExpense = createAsyncThunk('finance/deleteExpense', async (id
         Authorization: `Bearer ${accessToken}`,
       },
     });
+    thunkAPI.dispatch(fetchSummary());
     return id;
   } catch (error) {
     return thunkAPI.rejectWithValue(error.response.data);
@@ -207,7 +253,11 @@ const financeSlice = createSlice({
   initialState: {
     incomes: [],
     expenses: [],
+    incomesNext: null,
+    expensesNext: null,
+    summary: null,
     loading: false,
+    loadingMore: false,
     error: null,
   },
   extraReducers: (builder) => {
@@ -225,32 +275,68 @@ const financeSlice = createSlice({
       state.error = action.payload;
     });
 
- // Handle fetching all incomes
+ // Handle fetching the first page of incomes
  builder.addCase(fetchIncomes.pending, (state) => {
   state.loading = true;
 });
 builder.addCase(fetchIncomes.fulfilled, (state, action) => {
   state.loading = false;
-  state.incomes = action.payload;
+  state.incomes = action.payload.results;
+  state.incomesNext = action.payload.next;
 });
 builder.addCase(fetchIncomes.rejected, (state, action) => {
   state.loading = false;
   state.error = action.payload;
 });
 
-// Handle fetching all expenses
+// Handle fetching the first page of expenses
 builder.addCase(fetchExpenses.pending, (state) => {
   state.loading = true;
 });
 builder.addCase(fetchExpenses.fulfilled, (state, action) => {
   state.loading = false;
-  state.expenses = action.payload;
+  state.expenses = action.payload.results;
+  state.expensesNext = action.payload.next;
 });
 builder.addCase(fetchExpenses.rejected, (state, action) => {
   state.loading = false;
   state.error = action.payload;
 });
 
+// Handle loading more incomes and expenses
+builder.addCase(fetchMoreIncomes.pending, (state) => {
+  state.loadingMore = true;
+});
+builder.addCase(fetchMoreIncomes.fulfilled, (state, action) => {
+  state.loadingMore = false;
+  state.incomes = state.incomes.concat(action.payload.results);
+  state.incomesNext = action.payload.next;
+});
+builder.addCase(fetchMoreIncomes.rejected, (state, action) => {
+  state.loadingMore = false;
+  state.error = action.payload;
+});
+builder.addCase(fetchMoreExpenses.pending, (state) => {
+  state.loadingMore = true;
+});
+builder.addCase(fetchMoreExpenses.fulfilled, (state, action) => {
+  state.loadingMore = false;
+  state.expenses = state.expenses.concat(action.payload.results);
+  state.expensesNext = action.payload.next;
+});
+builder.addCase(fetchMoreExpenses.rejected, (state, action) => {
+  state.loadingMore = false;
+  state.error = action.payload;
+});
+
+// Handle fetching the dashboard summary
+builder.addCase(fetchSummary.fulfilled, (state, action) => {
+  state.summary = action.payload;
+});
+builder.addCase(fetchSummary.rejected, (state, action) => {
+  state.error = action.payload;
+});
+
 // Handle fetching incomes by date
 builder.addCase(fetchIncomesByDate.pending, (state) => {
   state.loading = true;
@@ -1,6 +1,6 @@
 import React, { useEffect, useState } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
-import { fetchIncomes, fetchExpenses } from '../features/finance/financeSlice';
+import { fetchIncomes, fetchExpenses, fetchSummary } from '../features/finance/financeSlice';
 import IncomeExpenseCalendar from '../components/IncomeExpenseCalendar';
 import IncomeExpenseList from '../components/IncomeExpenseList'; // Import the new component
 import {
@@ -14,16 +14,18 @@ import {
 
 const Dashboard = () => {
   const dispatch = useDispatch();
-  const { incomes, expenses, loading, error } = useSelector(state => state.finance);
+  const { incomes, expenses, summary, loading, error } = useSelector(state => state.finance);
   const [selectedMonth, setSelectedMonth] = useState(new Date());
 
   useEffect(() => {
     dispatch(fetchIncomes());
     dispatch(fetchExpenses());
+    dispatch(fetchSummary());
   }, [dispatch]);
 
-  const totalIncome = incomes.reduce((acc, income) => acc + parseFloat(income.amount), 0);
-  const totalExpenses = expenses.reduce((acc, expense) => acc + parseFloat(expense.amount), 0);
+  // Only the newest page of rows is loaded, so the totals come from the server
+  const totalIncome = summary ? parseFloat(summary.totals.income) : 0;
+  const totalExpenses = summary ? parseFloat(summary.totals.expense) : 0;
   const balance = totalIncome - totalExpenses;
 
   const filteredIncomes = incomes.filter(
@@ -1,15 +1,26 @@
-import React, { useEffect } from 'react';
+import React, { useEffect, useRef } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
-import { fetchExpenses } from '../features/finance/financeSlice';
+import { fetchExpenses, fetchMoreExpenses } from '../features/finance/financeSlice';
 
 const ExpenseList = () => {
   const dispatch = useDispatch();
-  const { expenses, loading, error } = useSelector(state => state.finance);
+  const { expenses, expensesNext, loading, loadingMore, error } = useSelector(state => state.finance);
+  const sentinel = useRef(null);
 
   useEffect(() => {
     dispatch(fetchExpenses());
   }, [dispatch]);
 
+  // Load the next page when the end of the list scrolls into view
+  useEffect(() => {
+    if (!sentinel.current || !expensesNext) return undefined;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) dispatch(fetchMoreExpenses());
+    });
+    observer.observe(sentinel.current);
+    return () => observer.disconnect();
+  }, [dispatch, expensesNext, loading]);
+
   if (loading) return <p>Loading...</p>;
   if (error) return <p>Error: {error}</p>;
 
@@ -21,6 +32,13 @@ const ExpenseList = () => {
           <li key={expense.id}>{expense.amount} - {expense.category}</li>
         ))}
       </ul>
+      {expensesNext && (
+        <div ref={sentinel}>
+          <button onClick={() => dispatch(fetchMoreExpenses())} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };
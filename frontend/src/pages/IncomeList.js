@@ -1,15 +1,26 @@
-import React, { useEffect } from 'react';
+import React, { useEffect, useRef } from 'react';
 import { useDispatch, useSelector } from 'react-redux';
-import { fetchIncomes } from '../features/finance/financeSlice';
+import { fetchIncomes, fetchMoreIncomes } from '../features/finance/financeSlice';
 
 const IncomeList = () => {
   const dispatch = useDispatch();
-  const { incomes, loading, error } = useSelector(state => state.finance);
+  const { incomes, incomesNext, loading, loadingMore, error } = useSelector(state => state.finance);
+  const sentinel = useRef(null);
 
   useEffect(() => {
     dispatch(fetchIncomes());
   }, [dispatch]);
 
+  // Load the next page when the end of the list scrolls into view
+  useEffect(() => {
+    if (!sentinel.current || !incomesNext) return undefined;
+    const observer = new IntersectionObserver((entries) => {
+      if (entries[0].isIntersecting) dispatch(fetchMoreIncomes());
+    });
+    observer.observe(sentinel.current);
+    return () => observer.disconnect();
+  }, [dispatch, incomesNext, loading]);
+
   if (loading) return <p>Loading...</p>;
   if (error) return <p>Error: {error}</p>;
 
@@ -21,6 +32,13 @@ const IncomeList = () => {
           <li key={income.id}>{income.amount} - {income.category}</li>
         ))}
       </ul>
+      {incomesNext && (
+        <div ref={sentinel}>
+          <button onClick={() => dispatch(fetchMoreIncomes())} disabled={loadingMore}>
+            {loadingMore ? 'Loading...' : 'Load more'}
+          </button>
+        </div>
+      )}
     </div>
   );
 };